@@ -0,0 +1,25 @@
+# Domain model of the Sakura Airlines reservation system. Importing this package
+# pulls in no UI or data-science libraries; the Streamlit front end is sakura.py.
+from .aircraft import AIRCRAFT_LAYOUTS, DEFAULT_AIRCRAFT, AircraftLayout, Cabin
+from .flight import Flight, HoldScheduler, SeatHold
+from .ids import IdGenerator
+from .payment import Payment
+from .reservation import Passenger, Reservation, ReservationStore
+from .search_index import SortedKeyIndex
+from .seats import (SEAT_TYPES, BusinessClassSeat, EconomyClassSeat, FirstClass, RevisionClock, Seat,
+                    SeatInventory, SeatMap)
+from .storage import (FLIGHT_COLUMNS, FLIGHT_SORTS, MANIFEST_COLUMNS, SQLiteStorage, StorageBackend,
+                      StorageConflict)
+from .system import AVAILABILITY_COLUMNS, SEAT_HOLD_TTL, AirlineSystem
+from .views import CabinSummary, FlightSummary, FlightViews, ViewCache
+from .waitlist import FARE_CLASSES, LOYALTY_TIERS, Waitlist, WaitlistEntry
+
+__all__ = [
+    "AIRCRAFT_LAYOUTS", "AVAILABILITY_COLUMNS", "DEFAULT_AIRCRAFT", "FARE_CLASSES", "FLIGHT_COLUMNS",
+    "FLIGHT_SORTS", "LOYALTY_TIERS", "MANIFEST_COLUMNS", "SEAT_HOLD_TTL", "SEAT_TYPES",
+    "AircraftLayout", "AirlineSystem", "BusinessClassSeat", "Cabin", "CabinSummary", "EconomyClassSeat",
+    "FirstClass", "Flight", "FlightSummary", "FlightViews", "HoldScheduler", "IdGenerator", "Passenger",
+    "Payment", "Reservation", "ReservationStore", "RevisionClock", "SQLiteStorage", "Seat", "SeatHold",
+    "SeatInventory", "SeatMap", "SortedKeyIndex", "StorageBackend", "StorageConflict", "ViewCache",
+    "Waitlist", "WaitlistEntry",
+]
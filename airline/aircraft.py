@@ -0,0 +1,98 @@
+from collections import namedtuple
+from types import MappingProxyType
+
+# One cabin of an aircraft: rows first_row..last_row, each with the given seat columns
+Cabin = namedtuple("Cabin", ["seat_class", "first_row", "last_row", "columns", "price", "amenities"])
+
+
+class AircraftLayout:
+    # Immutable seat geometry, prices and amenities for one aircraft type. Layouts are
+    # built once at import and shared by every Flight of that type, so a flight only
+    # has to carry its own occupancy state.
+    __slots__ = ("aircraft_type", "cabins", "rows", "columns", "seat_numbers",
+                 "seat_classes", "seat_index", "seats_per_class", "row_ranges", "seat_rows",
+                 "rows_by_class", "_cabins_by_class")
+
+    def __init__(self, aircraft_type, cabins):
+        seat_numbers = []
+        seat_classes = []
+        # Seats are numbered row by row, so each row is one contiguous slice of positions
+        row_ranges = []
+        seat_rows = []
+        rows_by_class = {}
+        for cabin in cabins:
+            for row in range(cabin.first_row, cabin.last_row + 1):
+                rows_by_class.setdefault(cabin.seat_class, []).append(len(row_ranges))
+                seat_rows.extend([len(row_ranges)] * len(cabin.columns))
+                row_ranges.append((len(seat_numbers), len(seat_numbers) + len(cabin.columns)))
+                for col in cabin.columns:
+                    seat_numbers.append(f"{row}{col}")
+                    seat_classes.append(cabin.seat_class)
+
+        columns = []
+        for cabin in cabins:
+            columns.extend(col for col in cabin.columns if col not in columns)
+
+        set_ = object.__setattr__
+        set_(self, "aircraft_type", aircraft_type)
+        set_(self, "cabins", tuple(cabins))
+        set_(self, "rows", max(cabin.last_row for cabin in cabins))
+        set_(self, "columns", tuple(sorted(columns)))
+        set_(self, "seat_numbers", tuple(seat_numbers))
+        set_(self, "seat_classes", tuple(seat_classes))
+        set_(self, "seat_index", MappingProxyType({seat: i for i, seat in enumerate(seat_numbers)}))
+        set_(self, "seats_per_class", MappingProxyType(
+            {cabin.seat_class: seat_classes.count(cabin.seat_class) for cabin in cabins}))
+        set_(self, "row_ranges", tuple(row_ranges))
+        set_(self, "seat_rows", tuple(seat_rows))
+        set_(self, "rows_by_class", MappingProxyType(
+            {seat_class: tuple(rows) for seat_class, rows in rows_by_class.items()}))
+        set_(self, "_cabins_by_class", MappingProxyType({cabin.seat_class: cabin for cabin in cabins}))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("AircraftLayout is immutable")
+
+    def __repr__(self):
+        return f"AircraftLayout({self.aircraft_type!r}, {len(self.seat_numbers)} seats)"
+
+    def __reduce__(self):
+        return _restore_layout, (self.aircraft_type, self.cabins)
+
+    def get_cabin(self, seat_class):
+        return self._cabins_by_class[seat_class]
+
+    def get_seat_class(self, seat_number):
+        index = self.seat_index.get(seat_number)
+        return None if index is None else self.seat_classes[index]
+
+    def get_seat_count(self):
+        return len(self.seat_numbers)
+
+
+def _restore_layout(aircraft_type, cabins):
+    # Unpickled flights share the registered layout instead of building their own
+    layout = AIRCRAFT_LAYOUTS.get(aircraft_type)
+    if layout is not None and layout.cabins == cabins:
+        return layout
+    return AircraftLayout(aircraft_type, cabins)
+
+
+FIRST_CLASS_AMENITIES = ("15kg Luggage", "Premium Meals", "Private Line", "Private Restroom")
+BUSINESS_CLASS_AMENITIES = ("10kg Luggage", "Business Meals", "Priority Boarding")
+ECONOMY_CLASS_AMENITIES = ("2kg Luggage", "Standard Seat", "Basic Meal")
+
+NARROW_BODY = AircraftLayout("A321", [
+    Cabin("First", 1, 2, ("A", "B", "E", "F"), 10000000.0, FIRST_CLASS_AMENITIES),
+    Cabin("Business", 3, 7, ("A", "B", "E", "F"), 5000000.0, BUSINESS_CLASS_AMENITIES),
+    Cabin("Economy", 8, 30, ("A", "B", "C", "D", "E", "F"), 1000000.0, ECONOMY_CLASS_AMENITIES),
+])
+
+WIDE_BODY = AircraftLayout("B787", [
+    Cabin("First", 1, 2, ("A", "D", "G", "K"), 12000000.0, FIRST_CLASS_AMENITIES),
+    Cabin("Business", 3, 8, ("A", "C", "D", "G", "H", "K"), 6000000.0, BUSINESS_CLASS_AMENITIES),
+    Cabin("Economy", 9, 40, ("A", "B", "C", "D", "E", "G", "H", "J", "K"), 1200000.0,
+          ECONOMY_CLASS_AMENITIES),
+])
+
+AIRCRAFT_LAYOUTS = MappingProxyType({layout.aircraft_type: layout for layout in (NARROW_BODY, WIDE_BODY)})
+DEFAULT_AIRCRAFT = NARROW_BODY.aircraft_type
@@ -0,0 +1,242 @@
+import datetime
+import threading
+
+import numpy as np
+import pandas as pd
+
+from .aircraft import AIRCRAFT_LAYOUTS
+
+CONFIRMED = 1
+CANCELLED = 2
+
+_EPOCH = datetime.date(1970, 1, 1)
+
+
+class _Codes:
+    # Interns strings to dense integer codes so columns stay numeric
+    def __init__(self):
+        self.names = []
+        self._codes = {}
+
+    def code(self, name):
+        code = self._codes.get(name)
+        if code is None:
+            code = len(self.names)
+            self._codes[name] = code
+            self.names.append(name)
+        return code
+
+    def get(self, name):
+        return self._codes.get(name)
+
+    def labels(self, codes):
+        return np.asarray(self.names, dtype=object)[codes] if len(codes) else np.array([], dtype=object)
+
+
+class _Columns:
+    # Growable struct-of-arrays table; appends are amortised O(1)
+    def __init__(self, dtypes, capacity=1024):
+        self.size = 0
+        self._data = {name: np.zeros(capacity, dtype) for name, dtype in dtypes.items()}
+
+    def _reserve(self, extra):
+        capacity = len(next(iter(self._data.values())))
+        if self.size + extra <= capacity:
+            return
+        while capacity < self.size + extra:
+            capacity *= 2
+        for name, column in self._data.items():
+            grown = np.zeros(capacity, column.dtype)
+            grown[:self.size] = column[:self.size]
+            self._data[name] = grown
+
+    def append(self, **values):
+        self._reserve(1)
+        row = self.size
+        for name, value in values.items():
+            self._data[name][row] = value
+        self.size += 1
+        return row
+
+    def set(self, row, name, value):
+        self._data[name][row] = value
+
+    def __getitem__(self, name):
+        return self._data[name][:self.size]
+
+
+class FleetAnalytics:
+    # Columnar snapshot of flights and reservations kept current through
+    # AirlineSystem listener callbacks. One row per (flight, cabin) holds the
+    # capacity; one row per reservation points at its (flight, cabin) row.
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights = _Codes()
+        self._cabins = _Codes()
+        self._methods = _Codes()
+        self._flight_cabins = {}
+        self._reservation_rows = {}
+        self._capacity = _Columns({"flight": np.int32, "date": np.int32, "cabin": np.int8,
+                                   "capacity": np.int32})
+        self._bookings = _Columns({"flight_cabin": np.int32, "amount": np.float64,
+                                   "method": np.int16, "status": np.int8, "refunded": np.bool_})
+
+    @classmethod
+    def from_system(cls, airline_system):
+        analytics = cls()
+        # Subscribe first so nothing booked during the initial load is missed
+        airline_system.add_listener(analytics)
+        storage = airline_system._storage
+        if storage.persistent:
+            for rows in storage.iter_flight_rows():
+                analytics.flights_added(rows)
+            for rows in storage.iter_reservation_rows():
+                for row in rows:
+                    analytics._add_booking(*row)
+        else:
+            analytics.flights_added([(flight.get_flight_number(), flight.get_flight_date(),
+                                      flight.get_aircraft_type()) for flight in list(airline_system.flights)])
+            for reservation in list(airline_system.reservations):
+                analytics.reservation_created(reservation)
+        return analytics
+
+    # Listener callbacks
+
+    def flights_added(self, rows):
+        # rows start with flight_number, flight_date; aircraft_type is the last column
+        with self._lock:
+            for row in rows:
+                self._add_flight(row[0], row[1], row[-1])
+
+    def reservation_created(self, reservation):
+        payment = reservation._payment
+        flight = reservation._flight
+        with self._lock:
+            if flight.get_flight_number() not in self._flight_cabins:
+                self._add_flight(flight.get_flight_number(), flight.get_flight_date(),
+                                 flight.get_aircraft_type())
+        self._add_booking(
+            reservation._reservation_id,
+            flight.get_flight_number(),
+            reservation._seat_number,
+            reservation.status,
+            payment.get_amount() if payment else 0.0,
+            payment.get_payment() if payment else "",
+            payment.get_status() if payment else "",
+        )
+
+    def reservation_cancelled(self, reservation):
+        payment = reservation._payment
+        with self._lock:
+            row = self._reservation_rows.get(reservation._reservation_id)
+            if row is None:
+                return
+            self._bookings.set(row, "status", CANCELLED)
+            self._bookings.set(row, "refunded", payment is not None and payment.get_status() == "Refunded")
+
+    def _add_flight(self, flight_number, flight_date, aircraft_type):
+        if flight_number in self._flight_cabins:
+            return
+        flight = self._flights.code(flight_number)
+        date = (datetime.date.fromisoformat(flight_date) - _EPOCH).days
+        layout = AIRCRAFT_LAYOUTS[aircraft_type]
+        rows = {}
+        for seat_class, capacity in layout.seats_per_class.items():
+            cabin = self._cabins.code(seat_class)
+            rows[seat_class] = self._capacity.append(flight=flight, date=date, cabin=cabin,
+                                                     capacity=capacity)
+        self._flight_cabins[flight_number] = (layout, rows)
+
+    def _add_booking(self, reservation_id, flight_number, seat_number, status, amount,
+                     payment_method, payment_status):
+        with self._lock:
+            if reservation_id in self._reservation_rows or flight_number not in self._flight_cabins:
+                return
+            layout, rows = self._flight_cabins[flight_number]
+            self._reservation_rows[reservation_id] = self._bookings.append(
+                flight_cabin=rows[layout.get_seat_class(seat_number)],
+                amount=amount or 0.0,
+                method=self._methods.code(payment_method or ""),
+                status=CONFIRMED if status == "Confirmed" else CANCELLED,
+                refunded=payment_status == "Refunded",
+            )
+
+    # Reports
+
+    def _capacity_frame(self):
+        with self._lock:
+            size = self._capacity.size
+            flight_cabin = self._bookings["flight_cabin"].copy()
+            status = self._bookings["status"].copy()
+            frame = pd.DataFrame({
+                "Flight": self._flights.labels(self._capacity["flight"]),
+                "Date": pd.to_datetime(self._capacity["date"], unit="D"),
+                "Cabin": self._cabins.labels(self._capacity["cabin"]),
+                "Capacity": self._capacity["capacity"].copy(),
+            })
+        frame["Sold"] = np.bincount(flight_cabin[status == CONFIRMED], minlength=size)[:size]
+        return frame
+
+    def load_factor(self, by="Flight"):
+        # by is any of "Flight", "Cabin", "Date" or a list of them
+        frame = self._capacity_frame()
+        grouped = frame.groupby(by, sort=True)[["Capacity", "Sold"]].sum().reset_index()
+        grouped["Load Factor"] = grouped["Sold"] / grouped["Capacity"].where(grouped["Capacity"] > 0)
+        return grouped
+
+    def _booking_frame(self):
+        with self._lock:
+            return pd.DataFrame({
+                "Method": self._methods.labels(self._bookings["method"]),
+                "Amount": self._bookings["amount"].copy(),
+                "Status": self._bookings["status"].copy(),
+                "Refunded": self._bookings["refunded"].copy(),
+            })
+
+    def revenue_by_payment_method(self):
+        frame = self._booking_frame()
+        confirmed = frame[frame["Status"] == CONFIRMED]
+        return (confirmed.groupby("Method")["Amount"].agg(["sum", "count"])
+                .rename(columns={"sum": "Revenue", "count": "Bookings"})
+                .sort_values("Revenue", ascending=False).reset_index())
+
+    def refund_totals(self):
+        frame = self._booking_frame()
+        refunded = frame[frame["Refunded"]]
+        return (refunded.groupby("Method")["Amount"].agg(["sum", "count"])
+                .rename(columns={"sum": "Refunded", "count": "Refunds"})
+                .sort_values("Refunded", ascending=False).reset_index())
+
+    def cancellation_rate(self, by=None):
+        with self._lock:
+            flight_cabin = self._bookings["flight_cabin"].copy()
+            cancelled = self._bookings["status"] == CANCELLED
+            flight = self._capacity["flight"].copy()
+            date = self._capacity["date"].copy()
+        if by is None:
+            total = len(cancelled)
+            return float(cancelled.sum()) / total if total else 0.0
+        keys = {"Flight": flight, "Date": date}[by][flight_cabin]
+        frame = pd.DataFrame({by: keys, "Cancelled": cancelled})
+        rates = frame.groupby(by)["Cancelled"].agg(["sum", "count"])
+        rates = rates.rename(columns={"sum": "Cancelled", "count": "Bookings"}).reset_index()
+        rates["Cancellation Rate"] = rates["Cancelled"] / rates["Bookings"]
+        if by == "Flight":
+            rates["Flight"] = self._flights.labels(rates["Flight"].to_numpy())
+        else:
+            rates["Date"] = pd.to_datetime(rates["Date"], unit="D")
+        return rates
+
+    def summary(self):
+        frame = self._booking_frame()
+        capacity = self._capacity_frame()
+        confirmed = frame["Status"] == CONFIRMED
+        return {
+            "flights": len(self._flight_cabins),
+            "bookings": int(confirmed.sum()),
+            "revenue": float(frame.loc[confirmed, "Amount"].sum()),
+            "refunds": float(frame.loc[frame["Refunded"], "Amount"].sum()),
+            "cancellation_rate": self.cancellation_rate(),
+            "load_factor": float(capacity["Sold"].sum() / capacity["Capacity"].sum())
+            if len(capacity) else 0.0,
+        }
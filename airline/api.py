@@ -0,0 +1,529 @@
+import argparse
+import asyncio
+import concurrent.futures
+import datetime
+import http
+import json
+import os
+import re
+import sys
+import threading
+import time
+from urllib.parse import parse_qs, urlsplit
+
+from . import ids
+from .metrics import API_SECONDS, REGISTRY
+from .reservation import Passenger
+from .views import FlightViews
+
+MAX_BODY = 1024 * 1024
+MAX_HEADER = 64 * 1024
+MAX_BATCH = 1000
+IDLE_TIMEOUT = 30.0
+
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _json_body(body):
+    if not body:
+        raise ApiError(400, "Request body must be a JSON object")
+    try:
+        data = json.loads(body)
+    except ValueError:
+        raise ApiError(400, "Request body is not valid JSON")
+    if not isinstance(data, dict):
+        raise ApiError(400, "Request body must be a JSON object")
+    return data
+
+
+def _encode(payload):
+    return json.dumps(payload, separators=(",", ":")).encode()
+
+
+def _passenger(data):
+    if not isinstance(data, dict):
+        raise ApiError(400, "passenger must be an object")
+    missing = [field for field in ("passport_number", "first_name", "last_name") if not data.get(field)]
+    if missing:
+        raise ApiError(400, f"passenger is missing {', '.join(missing)}")
+    age = data.get("age", 0)
+    if not isinstance(age, int) or not 0 <= age <= 150:
+        raise ApiError(400, "passenger age must be an integer between 0 and 150")
+    return Passenger(str(data["passport_number"]), str(data["first_name"]), str(data["last_name"]),
+                     age, data.get("email"), data.get("phone"))
+
+
+def _reservation(reservation):
+    payment = reservation._payment
+    return {
+        "reservation_id": reservation._reservation_id,
+        "status": reservation.status,
+        "flight_number": reservation._flight.get_flight_number(),
+        "seat_number": reservation._seat_number,
+        "reservation_date": reservation.get_reservation_date().isoformat(),
+        "passenger": reservation._passenger.get_full_name(),
+        "passport_number": reservation._passenger._passport_number,
+        "amount": payment.get_amount() if payment else None,
+        "payment_method": payment.get_payment() if payment else None,
+        "payment_status": payment.get_status() if payment else None,
+    }
+
+
+def _waitlist_entry(entry, position=None):
+    return {
+        "entry_id": entry._entry_id,
+        "status": entry.status,
+        "flight_number": entry._flight_number,
+        "seat_class": entry._seat_class,
+        "fare_class": entry._fare_class,
+        "loyalty_tier": entry._loyalty_tier,
+        "passenger": entry._passenger.get_full_name(),
+        "passport_number": entry._passenger._passport_number,
+        "joined_at": entry.get_joined_at().isoformat(),
+        "position": position,
+        "reservation_id": entry._reservation._reservation_id if entry._reservation else None,
+    }
+
+
+class AirlineApi:
+    # JSON over HTTP/1.1 on asyncio streams, no framework. Connections are kept alive
+    # and requests on one connection are answered in order. Bookings and cancellations
+    # block on payments and storage, and searches and lookups may load from storage, so
+    # they run on a thread pool. Health, metrics and the in-memory waitlists are answered
+    # on the event loop.
+    def __init__(self, airline_system, workers=32):
+        from .sharding import ShardedAirlineSystem
+
+        self._system = airline_system
+        # A sharded system answers every call over a pipe to a shard, so nothing it does
+        # may run on the event loop
+        self._sharded = isinstance(airline_system, ShardedAirlineSystem)
+        self._views = FlightViews(airline_system)
+        self._executor = concurrent.futures.ThreadPoolExecutor(workers, thread_name_prefix="api")
+        self._connections = set()
+        # (method, pattern, handler, runs on the thread pool)
+        self._routes = [
+            ("GET", re.compile(r"/health"), self.health, False),
+            ("GET", re.compile(r"/metrics"), self.metrics, False),
+            ("GET", re.compile(r"/flights"), self.search_flights, True),
+            ("GET", re.compile(r"/flights/(?P<flight_number>[^/]+)"), self.flight_details, True),
+            ("GET", re.compile(r"/flights/(?P<flight_number>[^/]+)/waitlist"), self.flight_waitlist, True),
+            ("GET", re.compile(r"/destinations"), self.suggest_destinations, True),
+            ("POST", re.compile(r"/availability"), self.availability, True),
+            ("POST", re.compile(r"/bookings"), self.book, True),
+            ("POST", re.compile(r"/group-bookings"), self.group_book, True),
+            ("GET", re.compile(r"/bookings"), self.recent_bookings, True),
+            ("GET", re.compile(r"/bookings/(?P<reservation_id>[^/]+)"), self.get_booking, True),
+            ("DELETE", re.compile(r"/bookings/(?P<reservation_id>[^/]+)"), self.cancel, True),
+            ("POST", re.compile(r"/waitlist"), self.join_waitlist, True),
+            ("GET", re.compile(r"/waitlist"), self.find_waitlist_entries, False),
+            ("DELETE", re.compile(r"/waitlist/(?P<flight_number>[^/]+)/(?P<entry_id>[^/]+)"),
+             self.leave_waitlist, False),
+            ("POST", re.compile(r"/batch"), None, False),
+        ]
+
+    # Handlers take (params, query, body) and return (status, payload)
+
+    def health(self, params, query, body):
+        return 200, {"status": "ok", "revision": self._system.get_revision()}
+
+    def metrics(self, params, query, body):
+        return 200, REGISTRY.exposition()
+
+    def _flight(self, flight_number):
+        flight = self._system.get_flight(flight_number)
+        if flight is None:
+            raise ApiError(404, f"Flight {flight_number} not found")
+        return flight
+
+    def search_flights(self, params, query, body):
+        # Always one page of results, the first 25 unless page and page_size say otherwise
+        destination = query.get("destination")
+        prefix = query.get("prefix") in ("1", "true")
+        page, page_size = int(query.get("page", 0)), int(query.get("page_size", 25))
+        if page < 0 or not 1 <= page_size <= MAX_BATCH:
+            raise ApiError(400, f"page must be >= 0 and page_size between 1 and {MAX_BATCH}")
+        if "date_from" in query or "date_to" in query:
+            frame = self._views.search_availability(destination, query.get("date_from"),
+                                                     query.get("date_to"), query.get("cabin"),
+                                                     int(query.get("min_free", 0)))
+            return 200, {"total": len(frame), "page": page, "page_size": page_size,
+                         "flights": frame.iloc[page * page_size:(page + 1) * page_size].to_dict("records")}
+        total, flights = self._views.flight_page(destination, query.get("date"), query.get("sort", "departure"),
+                                                 query.get("descending") in ("1", "true"), page, page_size,
+                                                 prefix)
+        return 200, {"total": total, "page": page, "page_size": page_size,
+                     "flights": [flight._asdict() for flight in flights]}
+
+    def suggest_destinations(self, params, query, body):
+        # Type-ahead: destinations starting with prefix, or near spellings if none do
+        limit = int(query.get("limit", 8))
+        if not 1 <= limit <= MAX_BATCH:
+            raise ApiError(400, f"limit must be between 1 and {MAX_BATCH}")
+        return 200, {"destinations": list(self._views.suggest_destinations(query.get("prefix", ""), limit))}
+
+    def flight_details(self, params, query, body):
+        # The encoded document is cached per flight revision: the seat map dominates the cost
+        flight = self._flight(params["flight_number"])
+        key = ("api_flight", flight.get_flight_number(), flight.get_revision())
+        return 200, self._views.cache.get(key, lambda: _encode(self._flight_document(flight)))
+
+    def _flight_document(self, flight):
+        layout = flight.get_layout()
+        return {
+            "flight_number": flight.get_flight_number(),
+            "destination": flight.get_destination(),
+            "flight_date": flight.get_flight_date(),
+            "departure_time": flight.get_departure_time(),
+            "arrival_time": flight.get_arrival_time(),
+            "gate_number": flight.get_gate_number(),
+            "aircraft_type": flight.get_aircraft_type(),
+            "revision": flight.get_revision(),
+            "available_seats": flight.count_available_seats(),
+            "cabins": [cabin._asdict() for cabin in self._views.cabin_summaries(flight)],
+            "rows": layout.rows,
+            "columns": layout.columns,
+            "seats": [{"seat_number": seat_number, "seat_class": seat_class, "status": status}
+                      for seat_number, seat_class, status in self._views.seat_map(flight)],
+        }
+
+    def availability(self, params, query, body):
+        # Batch: free-seat counts for many flights in one round trip
+        data = _json_body(body)
+        flight_numbers = data.get("flights")
+        if not isinstance(flight_numbers, list) or len(flight_numbers) > MAX_BATCH:
+            raise ApiError(400, f"flights must be a list of at most {MAX_BATCH} flight numbers")
+        include_seats = bool(data.get("include_seats"))
+        results = {}
+        for flight_number in flight_numbers:
+            flight = self._system.get_flight(str(flight_number))
+            if flight is None:
+                results[flight_number] = None
+                continue
+            result = {"available_seats": flight.count_available_seats(), "revision": flight.get_revision(),
+                      "cabins": {cabin.seat_class: cabin.available_seats
+                                 for cabin in self._views.cabin_summaries(flight)}}
+            if include_seats:
+                result["seat_numbers"] = list(self._views.available_seat_numbers(flight))
+            results[flight_number] = result
+        return 200, {"results": results}
+
+    def book(self, params, query, body):
+        data = _json_body(body)
+        flight = self._flight(str(data.get("flight_number", "")))
+        seat_number = str(data.get("seat_number", ""))
+        if seat_number not in flight.get_layout().seat_index:
+            raise ApiError(400, f"Seat {seat_number} does not exist on this aircraft")
+        passenger = _passenger(data.get("passenger"))
+        if flight._inventory.is_occupied(seat_number):
+            raise ApiError(409, f"Seat {seat_number} is not available")
+        reservation = self._system.create_reservation(
+            passenger, flight, seat_number, str(data.get("payment_method", "credit card")).lower())
+        if reservation is None:
+            if flight._inventory.is_occupied(seat_number):
+                raise ApiError(409, f"Seat {seat_number} is not available")
+            raise ApiError(402, "Payment failed")
+        return 201, _reservation(reservation)
+
+    def group_book(self, params, query, body):
+        data = _json_body(body)
+        flight = self._flight(str(data.get("flight_number", "")))
+        seat_class = data.get("seat_class")
+        if seat_class not in flight.get_layout().seats_per_class:
+            raise ApiError(400, "seat_class must be one of " + ", ".join(flight.get_layout().seats_per_class))
+        passengers = data.get("passengers")
+        if not isinstance(passengers, list) or not passengers:
+            raise ApiError(400, "passengers must be a non-empty list")
+        passengers = [_passenger(passenger) for passenger in passengers]
+        if flight.count_available_seats(seat_class) < len(passengers):
+            raise ApiError(409, f"Not enough free {seat_class} seats")
+        reservations = self._system.create_group_reservation(
+            passengers, flight, seat_class, str(data.get("payment_method", "credit card")).lower())
+        if reservations is None:
+            if flight.count_available_seats(seat_class) < len(passengers):
+                raise ApiError(409, f"Not enough free {seat_class} seats")
+            raise ApiError(402, "Payment failed for at least one passenger; nothing was booked")
+        return 201, {"reservations": [_reservation(reservation) for reservation in reservations]}
+
+    def _reservation_or_404(self, reservation_id):
+        reservation = self._system.get_reservation(reservation_id)
+        if reservation is None:
+            raise ApiError(404, f"Reservation {reservation_id} not found")
+        return reservation
+
+    def get_booking(self, params, query, body):
+        return 200, _reservation(self._reservation_or_404(params["reservation_id"]))
+
+    def recent_bookings(self, params, query, body):
+        # Bookings made between since (default an hour ago) and until, as ISO datetimes,
+        # newest first. A full page carries next_before, the before of the next page.
+        try:
+            since = datetime.datetime.fromisoformat(query["since"]) if "since" in query else (
+                datetime.datetime.now() - datetime.timedelta(hours=1))
+            until = datetime.datetime.fromisoformat(query["until"]) if "until" in query else None
+        except ValueError:
+            raise ApiError(400, "since and until must be ISO 8601 datetimes")
+        page_size = int(query.get("page_size", 100))
+        if not 1 <= page_size <= MAX_BATCH:
+            raise ApiError(400, f"page_size must be between 1 and {MAX_BATCH}")
+        before = query.get("before")
+        if before is not None and not (before.isdigit() and len(before) == ids.ID_DIGITS):
+            raise ApiError(400, "before must be a reservation ID from a previous page")
+        reservations = self._system.find_reservations_between(
+            since, until, query.get("include_cancelled") in ("1", "true"), page_size, before)
+        next_before = reservations[-1]._reservation_id if len(reservations) == page_size else None
+        return 200, {"reservations": [_reservation(reservation) for reservation in reservations],
+                     "next_before": next_before}
+
+    def cancel(self, params, query, body):
+        reservation = self._reservation_or_404(params["reservation_id"])
+        cancelled = self._system.cancel_reservation(params["reservation_id"])
+        if cancelled is None:
+            raise ApiError(409, f"Reservation is {reservation.status.lower()}, not confirmed")
+        return 200, _reservation(cancelled)
+
+    def join_waitlist(self, params, query, body):
+        data = _json_body(body)
+        flight = self._flight(str(data.get("flight_number", "")))
+        seat_class = data.get("seat_class")
+        if seat_class not in flight.get_layout().seats_per_class:
+            raise ApiError(400, "seat_class must be one of " + ", ".join(flight.get_layout().seats_per_class))
+        passenger = _passenger(data.get("passenger"))
+        try:
+            entry = self._system.join_waitlist(
+                passenger, flight, seat_class, str(data.get("payment_method", "credit card")).lower(),
+                data.get("fare_class", "Standard"), data.get("loyalty_tier", "Member"))
+        except ValueError as e:
+            raise ApiError(400, str(e))
+        if entry is None:
+            raise ApiError(409, f"{seat_class} still has free seats; book one instead")
+        return 201, _waitlist_entry(entry)
+
+    def find_waitlist_entries(self, params, query, body):
+        passport_number = query.get("passport_number")
+        if not passport_number:
+            raise ApiError(400, "passport_number is required")
+        return 200, {"entries": [_waitlist_entry(entry, position) for entry, position
+                                 in self._system.find_waitlist_entries(passport_number)]}
+
+    def flight_waitlist(self, params, query, body):
+        flight = self._flight(params["flight_number"])
+        # Best placed first; positions count within each cabin's queue
+        places = {}
+        entries = []
+        for entry in self._system.get_waitlist(flight.get_flight_number(), query.get("seat_class")):
+            places[entry._seat_class] = places.get(entry._seat_class, 0) + 1
+            entries.append(_waitlist_entry(entry, places[entry._seat_class]))
+        return 200, {"entries": entries}
+
+    def leave_waitlist(self, params, query, body):
+        if not self._system.leave_waitlist(params["flight_number"], params["entry_id"]):
+            raise ApiError(404, f"No waiting entry {params['entry_id']} on flight {params['flight_number']}")
+        return 200, {"entry_id": params["entry_id"], "status": "Left"}
+
+    # Dispatch
+
+    def _route(self, method, path):
+        allowed = False
+        for route_method, pattern, handler, blocking in self._routes:
+            match = pattern.fullmatch(path)
+            if match is None:
+                continue
+            if route_method == method:
+                return pattern.pattern, handler, blocking or self._sharded, match.groupdict()
+            allowed = True
+        raise ApiError(405 if allowed else 404, "Method not allowed" if allowed else "Not found")
+
+    async def _call(self, handler, blocking, params, query, body):
+        try:
+            if blocking:
+                return await asyncio.get_running_loop().run_in_executor(
+                    self._executor, handler, params, query, body)
+            return handler(params, query, body)
+        except ApiError as e:
+            return e.status, {"error": str(e)}
+        except (ValueError, TypeError) as e:
+            return 400, {"error": str(e)}
+
+    async def _batch(self, body):
+        # Runs sub-requests {"method", "path", "body"} concurrently and answers in order
+        requests = _json_body(body).get("requests")
+        if not isinstance(requests, list) or len(requests) > MAX_BATCH:
+            raise ApiError(400, f"requests must be a list of at most {MAX_BATCH} requests")
+
+        async def run(request):
+            if not isinstance(request, dict):
+                return {"status": 400, "body": {"error": "Each request must be an object"}}
+            status, payload = await self.dispatch(
+                str(request.get("method", "GET")).upper(), str(request.get("path", "")),
+                json.dumps(request["body"]).encode() if "body" in request else b"", nested=True)
+            return {"status": status, "body": json.loads(payload) if isinstance(payload, bytes) else payload}
+
+        return 200, {"responses": await asyncio.gather(*(run(request) for request in requests))}
+
+    async def dispatch(self, method, target, body, nested=False):
+        url = urlsplit(target)
+        started = time.perf_counter()
+        route = "unmatched"
+        try:
+            route, handler, blocking, params = self._route(method, url.path.rstrip("/") or "/")
+            if handler is None:
+                if nested:
+                    raise ApiError(400, "Batches cannot be nested")
+                status, payload = await self._batch(body)
+            else:
+                query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+                status, payload = await self._call(handler, blocking, params, query, body)
+        except ApiError as e:
+            status, payload = e.status, {"error": str(e)}
+        except Exception as e:
+            status, payload = 500, {"error": f"{type(e).__name__}: {e}"}
+        API_SECONDS.labels(f"{method} {route}", str(status)).observe(time.perf_counter() - started)
+        return status, payload
+
+    # HTTP/1.1
+
+    def _response(self, status, payload, keep_alive):
+        # Payloads are JSON documents, pre-encoded JSON (bytes) or plain text
+        if isinstance(payload, str):
+            body = payload.encode()
+            content_type = "text/plain; version=0.0.4; charset=utf-8"
+        else:
+            body = payload if isinstance(payload, bytes) else _encode(payload)
+            content_type = "application/json"
+        head = (f"HTTP/1.1 {status} {http.HTTPStatus(status).phrase}\r\n"
+                f"Content-Type: {content_type}\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        return head.encode("latin-1") + body
+
+    async def handle_connection(self, reader, writer):
+        self._connections.add(asyncio.current_task())
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), IDLE_TIMEOUT)
+                except asyncio.LimitOverrunError:
+                    writer.write(self._response(431, {"error": "Request headers too large"}, False))
+                    break
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+                    break
+                request_line, *header_lines = head.decode("latin-1").split("\r\n")
+                try:
+                    method, target, version = request_line.split(" ")
+                except ValueError:
+                    writer.write(self._response(400, {"error": "Malformed request line"}, False))
+                    break
+                headers = {}
+                for line in header_lines:
+                    name, _, value = line.partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                if "transfer-encoding" in headers:
+                    writer.write(self._response(501, {"error": "Chunked requests are not supported"}, False))
+                    break
+                length = headers.get("content-length") or "0"
+                if not length.isdigit():
+                    writer.write(self._response(400, {"error": "Malformed Content-Length"}, False))
+                    break
+                length = int(length)
+                if length > MAX_BODY:
+                    writer.write(self._response(413, {"error": "Request body too large"}, False))
+                    break
+                body = await reader.readexactly(length) if length else b""
+                connection = headers.get("connection", "").lower()
+                keep_alive = connection == "keep-alive" if version == "HTTP/1.0" else connection != "close"
+
+                status, payload = await self.dispatch(method, target, body)
+                writer.write(self._response(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except asyncio.CancelledError:
+            # Shutdown; finishing normally keeps asyncio from logging the cancelled task
+            pass
+        finally:
+            self._connections.discard(asyncio.current_task())
+            writer.close()
+
+    async def start(self, host, port):
+        return await asyncio.start_server(self.handle_connection, host, port, limit=MAX_HEADER,
+                                          backlog=1024)
+
+    async def serve(self, host, port):
+        async with await self.start(host, port) as server:
+            await server.serve_forever()
+
+    async def shutdown(self, server):
+        # Stop accepting, then drop idle keep-alive connections
+        server.close()
+        connections = list(self._connections)
+        for connection in connections:
+            connection.cancel()
+        await asyncio.gather(*connections, return_exceptions=True)
+        await server.wait_closed()
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+
+
+class ApiServer:
+    # Runs an AirlineApi on its own event-loop thread, e.g. inside the Streamlit process
+    def __init__(self, airline_system, host="127.0.0.1", port=0, workers=32):
+        self.api = AirlineApi(airline_system, workers)
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="airline-api", daemon=True)
+        self._thread.start()
+        self._server = asyncio.run_coroutine_threadsafe(self.api.start(host, port), self._loop).result()
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    def close(self):
+        asyncio.run_coroutine_threadsafe(self.api.shutdown(self._server), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+        self.api.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the booking core as a JSON HTTP API")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=int(os.environ.get("SAKURA_API_PORT", 8081)))
+    parser.add_argument("--db", default=os.environ.get("SAKURA_DB", "sakura.db"),
+                        help="SQLite database (default: $SAKURA_DB or sakura.db); ':memory:' keeps "
+                             "everything in this process. Seat state lives in memory, so a database "
+                             "the UI also books into would show stale availability: set "
+                             "SAKURA_API_PORT for the UI to serve the API from its process instead")
+    parser.add_argument("--workers", type=int, default=32, help="threads for bookings and cancellations")
+    parser.add_argument("--shards", type=int, default=int(os.environ.get("SAKURA_SHARDS", 0)),
+                        help="run the booking core in this many worker processes (default: in process)")
+    args = parser.parse_args(argv)
+
+    if args.shards > 1:
+        from .sharding import ShardedAirlineSystem
+
+        airline_system = ShardedAirlineSystem(args.shards, None if args.db == ":memory:" else args.db)
+    else:
+        from .storage import SQLiteStorage, StorageBackend
+        from .system import AirlineSystem
+
+        airline_system = AirlineSystem(StorageBackend() if args.db == ":memory:" else SQLiteStorage(args.db))
+    api = AirlineApi(airline_system, args.workers)
+    print(f"Serving the airline API on http://{args.host}:{args.port}")
+    try:
+        asyncio.run(api.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        api.close()
+        airline_system.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,200 @@
+import heapq
+import itertools
+import threading
+import time
+
+from .aircraft import AIRCRAFT_LAYOUTS, DEFAULT_AIRCRAFT
+from .metrics import OPERATION_SECONDS, timed
+from .seats import SeatInventory, SeatMap
+
+
+class Flight:
+    def __init__(self, flight_number, flight_date, destination, 
+                 departure_time, arrival_time, gate_number, aircraft_type=DEFAULT_AIRCRAFT):
+        self._flight_number = flight_number
+        self._flight_date = flight_date
+        self._destination = destination
+        self._departure_time = departure_time
+        self._arrival_time = arrival_time
+        self._gate_number = gate_number
+        self._layout = AIRCRAFT_LAYOUTS[aircraft_type]
+        self._passengers = []
+        self._holds = {}
+        # Guards seat changes on this flight; other flights never contend for it
+        self._lock = threading.RLock()
+        self._initialize_seats()
+
+    def __getstate__(self):
+        # Pickles a consistent snapshot for another process. Holds and the lock stay
+        # behind: a hold only means something to the process whose timer expires it.
+        with self._lock:
+            state = self.__dict__.copy()
+            state["_inventory"] = self._inventory.snapshot()
+            state["_passengers"] = list(self._passengers)
+        state["_holds"] = {}
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.RLock()
+
+    def get_flight_number(self):
+        return self._flight_number
+    
+    def get_flight_date(self):
+        return self._flight_date
+    
+    def get_destination(self):
+        return self._destination
+    
+    def get_departure_time(self):
+        return self._departure_time
+    
+    def get_arrival_time(self):
+        return self._arrival_time
+    
+    def get_gate_number(self):
+        return self._gate_number
+    
+    def get_aircraft_type(self):
+        return self._layout.aircraft_type
+
+    def get_layout(self):
+        return self._layout
+    
+    def get_seats(self):
+        return self._seats
+
+    @property
+    def _seats(self):
+        # Seat objects are views built on demand; the flight itself stores only occupancy
+        return SeatMap(self._inventory)
+
+    def _initialize_seats(self):
+        self._inventory = SeatInventory(self._layout)
+
+    @timed(OPERATION_SECONDS, "get_available_seats")
+    def get_available_seats(self):
+        return [self._seats[seat_number] for seat_number in self._inventory.available_seat_numbers()]
+
+    def get_available_seat_numbers(self, seat_class=None):
+        return self._inventory.available_seat_numbers(seat_class)
+
+    def count_available_seats(self, seat_class=None):
+        return self._inventory.count_available(seat_class)
+
+    def get_revision(self):
+        return self._inventory.revision
+
+    def assign_seat(self, seat_number, passenger, hold=None):
+        with self._lock:
+            if hold is not None and self._holds.get(seat_number) is hold and not hold.is_expired():
+                # The holder converts its own hold; nobody else can take a held seat
+                del self._holds[seat_number]
+                self._inventory.convert_hold(seat_number)
+            elif not self._inventory.occupy(seat_number):
+                return False
+            self._passengers.append(passenger)
+            return True
+
+    def hold_seat(self, seat_number, ttl):
+        with self._lock:
+            if not self._inventory.hold(seat_number):
+                return None
+            hold = SeatHold(self, seat_number, time.monotonic() + ttl)
+            self._holds[seat_number] = hold
+            return hold
+
+    def release_hold(self, hold):
+        with self._lock:
+            if self._holds.get(hold.seat_number) is not hold:
+                return False
+            del self._holds[hold.seat_number]
+            self._inventory.release(hold.seat_number)
+            return True
+
+    def assign_seat_block(self, passengers, seat_class):
+        # Seats the whole group in one cabin or nobody; returns the seat numbers
+        with self._lock:
+            seat_numbers = self._inventory.find_block(len(passengers), seat_class)
+            if seat_numbers is None:
+                return None
+            for seat_number in seat_numbers:
+                self._inventory.occupy(seat_number)
+            self._passengers.extend(passengers)
+            return seat_numbers
+
+    def release_seat(self, seat_number, passenger=None):
+        with self._lock:
+            if not self._inventory.release(seat_number):
+                return False
+            if passenger is not None and passenger in self._passengers:
+                self._passengers.remove(passenger)
+            return True
+
+class SeatHold:
+    __slots__ = ("flight", "seat_number", "expires_at")
+
+    def __init__(self, flight, seat_number, expires_at):
+        self.flight = flight
+        self.seat_number = seat_number
+        # time.monotonic() deadline
+        self.expires_at = expires_at
+
+    def is_expired(self):
+        return time.monotonic() >= self.expires_at
+
+    def remaining(self):
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def is_active(self):
+        return self.flight._holds.get(self.seat_number) is self and not self.is_expired()
+
+class HoldScheduler:
+    # Min-heap of hold deadlines drained by one timer thread. Scheduling and expiring
+    # are O(log n); holds confirmed or released early are skipped when they surface.
+    def __init__(self, on_release=None):
+        # Called with each hold the timer releases
+        self._on_release = on_release
+        self._heap = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._thread = None
+
+    def __len__(self):
+        return len(self._heap)
+
+    def schedule(self, hold):
+        with self._condition:
+            heapq.heappush(self._heap, (hold.expires_at, next(self._sequence), hold))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="seat-holds", daemon=True)
+                self._thread.start()
+            if self._heap[0][2] is hold:
+                self._condition.notify()
+
+    def reap(self, now=None):
+        now = time.monotonic() if now is None else now
+        expired = []
+        with self._condition:
+            while self._heap and self._heap[0][0] <= now:
+                expired.append(heapq.heappop(self._heap)[2])
+        released = 0
+        for hold in expired:
+            if hold.flight.release_hold(hold):
+                released += 1
+                if self._on_release is not None:
+                    self._on_release(hold)
+        return released
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._heap:
+                    self._condition.wait()
+                delay = self._heap[0][0] - time.monotonic()
+                if delay > 0:
+                    self._condition.wait(delay)
+                    continue
+            self.reap()
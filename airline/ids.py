@@ -0,0 +1,152 @@
+import os
+import socket
+import threading
+import time
+import uuid
+
+from . import timestamps
+
+# Snowflake layout of a 63-bit ID: milliseconds since EPOCH_MS, then the worker that
+# issued it, then a per-millisecond sequence. One worker's IDs only ever increase and
+# every worker's sort by creation time, so a range of IDs is a range of time.
+EPOCH_MS = 1704067200000  # 2024-01-01 UTC
+WORKER_BITS = 10
+SEQUENCE_BITS = 12
+MAX_WORKER_ID = (1 << WORKER_BITS) - 1
+MAX_ID = (1 << 63) - 1
+_SEQUENCE_MASK = (1 << SEQUENCE_BITS) - 1
+_TIME_SHIFT = WORKER_BITS + SEQUENCE_BITS
+
+# IDs kept as text are zero-padded to the digits of the largest one, so they sort as numbers
+ID_DIGITS = 19
+
+
+class IdGenerator:
+    def __init__(self, worker_id):
+        if not 0 <= worker_id <= MAX_WORKER_ID:
+            raise ValueError(f"worker_id must be between 0 and {MAX_WORKER_ID}")
+        self.worker_id = worker_id
+        self._millis = 0
+        self._sequence = 0
+        self._revoked = False
+        self._lock = threading.Lock()
+
+    def revoke(self):
+        # Another process now holds this worker; issuing more IDs could duplicate theirs
+        self._revoked = True
+
+    def next_id(self):
+        with self._lock:
+            if self._revoked:
+                raise RuntimeError(f"ID worker {self.worker_id} was claimed by another process")
+            millis = time.time_ns() // 1000000 - EPOCH_MS
+            if millis > self._millis:
+                self._millis = millis
+                self._sequence = 0
+            else:
+                # Same millisecond, or the clock stepped back: keep counting on from the
+                # last ID, borrowing the next millisecond when the sequence runs out
+                self._sequence = (self._sequence + 1) & _SEQUENCE_MASK
+                if not self._sequence:
+                    self._millis += 1
+            return self._millis << _TIME_SHIFT | self.worker_id << SEQUENCE_BITS | self._sequence
+
+
+def _process_worker_id():
+    return os.getpid() & MAX_WORKER_ID
+
+
+def _new_owner():
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+# Until configured or claimed, a process issues IDs as a worker derived from its process
+# ID. That only tells apart processes that never share a database: ones that do claim
+# their worker in it, see claim.
+_generator = IdGenerator(_process_worker_id())
+_configured = False
+_claimed = False
+_owner = _new_owner()
+_claim_lock = threading.Lock()
+
+
+def configure(worker_id):
+    # Fixes this process's worker, e.g. from SAKURA_WORKER_ID; None goes back to the
+    # process default, letting the first database claimed choose
+    global _generator, _configured, _claimed
+    with _claim_lock:
+        _configured = worker_id is not None
+        _claimed = False
+        _generator = IdGenerator(_process_worker_id() if worker_id is None else worker_id)
+
+
+def claim(storage):
+    # Registers this process's worker with a database it issues IDs into, so no other
+    # live process can issue the same ones. An unconfigured process takes the first free
+    # worker of the first database it claims in. StorageConflict means the worker is
+    # already held by another process.
+    global _generator, _claimed
+    with _claim_lock:
+        if _configured or _claimed:
+            storage.claim_worker_id(_generator.worker_id, _owner, _lost)
+            return
+        claimed = storage.claim_worker_id(None, _owner, _lost)
+        if claimed is not None:
+            _generator = IdGenerator(claimed)
+            _claimed = True
+
+
+def _lost(worker_id):
+    if _generator.worker_id == worker_id:
+        _generator.revoke()
+
+
+def worker_id():
+    return _generator.worker_id
+
+
+def next_id():
+    return _generator.next_id()
+
+
+def next_text_id():
+    return id_text(_generator.next_id())
+
+
+def id_text(value):
+    return f"{value:0{ID_DIGITS}d}"
+
+
+def worker_of(value):
+    return value >> SEQUENCE_BITS & MAX_WORKER_ID
+
+
+def id_timestamp(value):
+    # When an ID was issued, in integer microseconds (see timestamps)
+    return ((value >> _TIME_SHIFT) + EPOCH_MS) * 1000
+
+
+def first_id_at(timestamp):
+    # The smallest ID issued at or after timestamp, in integer microseconds
+    return max(timestamp // 1000 - EPOCH_MS, 0) << _TIME_SHIFT
+
+
+def id_range(start=None, end=None):
+    # Inclusive (first, last) text IDs issued from datetime start up to, not including,
+    # end; None leaves that end open
+    first = id_text(first_id_at(timestamps.from_datetime(start))) if start else id_text(0)
+    last = id_text(max(first_id_at(timestamps.from_datetime(end)) - 1, 0)) if end else id_text(MAX_ID)
+    return first, last
+
+
+def _after_fork():
+    # A forked child must not carry on issuing its parent's IDs or hold its claims
+    global _owner, _claim_lock
+    _owner = _new_owner()
+    _claim_lock = threading.Lock()
+    configure(None)
+
+
+os.register_at_fork(after_in_child=_after_fork)
+if os.environ.get("SAKURA_WORKER_ID"):
+    configure(int(os.environ["SAKURA_WORKER_ID"]))
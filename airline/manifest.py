@@ -0,0 +1,168 @@
+import argparse
+import csv
+import json
+import os
+import sys
+
+from .storage import MANIFEST_COLUMNS
+
+BOARDING_COLUMNS = ("flight_number", "flight_date", "departure_time", "gate_number", "boarding_group",
+                    "seat_number", "seat_class", "passenger", "passport_number")
+EXPORT_FORMATS = ("csv", "jsonl", "parquet")
+
+_INTEGER_COLUMNS = frozenset({"age", "boarding_group"})
+# Flights fetched per search page while walking a day's departures
+_DEPARTURE_PAGE = 200
+
+
+def boarding_group(layout, seat_number):
+    # Premium cabins board in cabin order; the last cabin follows in three groups of
+    # rows, back to front
+    seat_class = layout.get_seat_class(seat_number)
+    cabins = [cabin.seat_class for cabin in layout.cabins]
+    number = cabins.index(seat_class)
+    if number < len(cabins) - 1:
+        return number + 1
+    rows = layout.rows_by_class[seat_class]
+    position = layout.seat_rows[layout.seat_index[seat_number]] - rows[0]
+    return len(cabins) + 2 - position * 3 // len(rows)
+
+
+def departure_flight_numbers(airline_system, date):
+    # Flight numbers departing on date in departure order, fetched a page at a time
+    offset = 0
+    while True:
+        total, flights = airline_system.find_flights_page(date=date, offset=offset, limit=_DEPARTURE_PAGE)
+        for flight in flights:
+            yield flight.get_flight_number()
+        offset += len(flights)
+        if not flights or offset >= total:
+            return
+
+
+def iter_manifest(airline_system, flight_numbers):
+    # MANIFEST_COLUMNS rows, one flight at a time, so memory is bounded by the
+    # largest aircraft rather than the number of flights
+    for flight_number in flight_numbers:
+        yield from airline_system.get_manifest(flight_number) or ()
+
+
+def iter_boarding_list(airline_system, flight_numbers):
+    # BOARDING_COLUMNS rows in boarding order for each flight
+    for flight_number in flight_numbers:
+        flight = airline_system.get_flight(flight_number)
+        if flight is None:
+            continue
+        layout = flight.get_layout()
+        boarding = []
+        for (_, flight_date, seat_number, seat_class, _, first_name, last_name, passport_number,
+             *_) in airline_system.get_manifest(flight_number):
+            boarding.append((flight_number, flight_date, flight.get_departure_time(), flight.get_gate_number(),
+                             boarding_group(layout, seat_number), seat_number, seat_class,
+                             f"{first_name} {last_name}", passport_number))
+        boarding.sort(key=lambda row: (row[4], layout.seat_index[row[5]]))
+        yield from boarding
+
+
+def write_csv(rows, file, columns=MANIFEST_COLUMNS):
+    writer = csv.writer(file)
+    writer.writerow(columns)
+    written = 0
+    for row in rows:
+        writer.writerow(row)
+        written += 1
+    return written
+
+
+def write_jsonl(rows, file, columns=MANIFEST_COLUMNS):
+    written = 0
+    for row in rows:
+        file.write(json.dumps(dict(zip(columns, row)), ensure_ascii=False))
+        file.write("\n")
+        written += 1
+    return written
+
+
+def write_parquet(rows, file, columns=MANIFEST_COLUMNS, batch_size=10000):
+    # Written one row group per batch, so only batch_size rows are held at a time.
+    # pyarrow comes with Streamlit and is only imported by callers that export Parquet.
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([(column, pa.int64() if column in _INTEGER_COLUMNS else pa.string())
+                        for column in columns])
+
+    def write_batch(batch):
+        writer.write_table(pa.Table.from_arrays(
+            [pa.array(values, type=field.type) for values, field in zip(zip(*batch), schema)],
+            schema=schema))
+
+    written = 0
+    with pq.ParquetWriter(file, schema) as writer:
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= batch_size:
+                write_batch(batch)
+                written += len(batch)
+                batch = []
+        if batch:
+            write_batch(batch)
+            written += len(batch)
+    return written
+
+
+WRITERS = {"csv": write_csv, "jsonl": write_jsonl, "parquet": write_parquet}
+
+
+def export_manifest(airline_system, flight_numbers, fmt, file, boarding=False):
+    # Streams the manifests (or boarding lists) of the flights into file, which must be
+    # binary for Parquet and text otherwise; returns the number of rows written
+    if fmt not in WRITERS:
+        raise ValueError(f"fmt must be one of {', '.join(EXPORT_FORMATS)}")
+    if boarding:
+        return WRITERS[fmt](iter_boarding_list(airline_system, flight_numbers), file, BOARDING_COLUMNS)
+    return WRITERS[fmt](iter_manifest(airline_system, flight_numbers), file, MANIFEST_COLUMNS)
+
+
+def export_departures(airline_system, date, fmt, file, boarding=False):
+    # Every flight departing on date, in departure order, in one file
+    return export_manifest(airline_system, departure_flight_numbers(airline_system, date), fmt, file, boarding)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export passenger manifests or boarding lists")
+    parser.add_argument("--db", default=os.environ.get("SAKURA_DB", "sakura.db"),
+                        help="SQLite database (default: $SAKURA_DB or sakura.db)")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--date", help="every flight departing on this YYYY-MM-DD date")
+    target.add_argument("--flight", action="append", help="a flight number; may be repeated")
+    parser.add_argument("--format", choices=EXPORT_FORMATS, default="csv")
+    parser.add_argument("--boarding", action="store_true", help="boarding lists instead of manifests")
+    parser.add_argument("--output", "-o", help="file to write (default: stdout, except for Parquet)")
+    args = parser.parse_args(argv)
+    if args.format == "parquet" and not args.output:
+        parser.error("Parquet needs --output")
+
+    from .storage import SQLiteStorage
+    from .system import AirlineSystem
+
+    airline_system = AirlineSystem(SQLiteStorage(args.db))
+    flight_numbers = (departure_flight_numbers(airline_system, args.date) if args.date
+                      else args.flight)
+    try:
+        if args.format == "parquet":
+            written = export_manifest(airline_system, flight_numbers, args.format, args.output, args.boarding)
+        elif args.output:
+            with open(args.output, "w", newline="", encoding="utf-8") as file:
+                written = export_manifest(airline_system, flight_numbers, args.format, file, args.boarding)
+        else:
+            written = export_manifest(airline_system, flight_numbers, args.format, sys.stdout, args.boarding)
+    finally:
+        airline_system.close()
+    print(f"Exported {written} rows", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,369 @@
+import bisect
+import collections
+import functools
+import math
+import os
+import sys
+import threading
+import time
+
+# Instrumentation is decided when functions are decorated: with SAKURA_METRICS=0 the
+# decorators hand back the original function, so the disabled path costs nothing.
+ENABLED = os.environ.get("SAKURA_METRICS", "1") != "0"
+
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _CounterChild:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+
+class _HistogramChild:
+    __slots__ = ("buckets", "counts", "count", "sum", "_lock")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += value
+
+    def quantile(self, fraction):
+        # Upper bound of the bucket holding the given fraction of observations
+        with self._lock:
+            counts = list(self.counts)
+            count = self.count
+        if not count:
+            return None
+        rank = fraction * count
+        seen = 0
+        for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+            seen += bucket_count
+            if seen >= rank:
+                return bound
+        return math.inf
+
+
+class _Family:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values):
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def children(self):
+        with self._lock:
+            return list(self._children.items())
+
+
+class Counter(_Family):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+    def samples(self):
+        for values, child in self.children():
+            yield self.name + "_total", _format_labels(self.labelnames, values), child.value
+
+
+class Histogram(_Family):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value):
+        self.labels().observe(value)
+
+    def samples(self):
+        for values, child in self.children():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), child.counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames + ("le",), values + (_format_value(bound),))
+                yield self.name + "_bucket", labels, cumulative
+            labels = _format_labels(self.labelnames, values)
+            yield self.name + "_count", labels, child.count
+            yield self.name + "_sum", labels, child.sum
+
+
+class Gauge(_Family):
+    # Values are read from callbacks at scrape time, so keeping them current is free
+    kind = "gauge"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._callbacks = {}
+
+    def set_function(self, function, *values):
+        with self._lock:
+            self._callbacks[values] = function
+
+    def samples(self):
+        with self._lock:
+            callbacks = list(self._callbacks.items())
+        for values, function in callbacks:
+            try:
+                value = function()
+            except Exception:
+                continue
+            yield self.name, _format_labels(self.labelnames, values), value
+
+
+class Registry:
+    def __init__(self):
+        self._families = {}
+        self._lock = threading.Lock()
+
+    def _family(self, cls, name, *args, **kwargs):
+        with self._lock:
+            family = self._families.get(name)
+            if family is None:
+                family = cls(name, *args, **kwargs)
+                self._families[name] = family
+            return family
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._family(Counter, name, documentation, labelnames)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._family(Histogram, name, documentation, labelnames, buckets)
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._family(Gauge, name, documentation, labelnames)
+
+    def families(self):
+        with self._lock:
+            return list(self._families.values())
+
+    def exposition(self):
+        # Prometheus text format 0.0.4
+        lines = []
+        for family in self.families():
+            lines.append(f"# HELP {family.name} {family.documentation}")
+            lines.append(f"# TYPE {family.name} {family.kind}")
+            for name, labels, value in family.samples():
+                lines.append(f"{name}{labels} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+OPERATION_SECONDS = REGISTRY.histogram(
+    "sakura_operation_seconds", "Latency of booking core operations", ["operation"])
+PAGE_SECONDS = REGISTRY.histogram(
+    "sakura_page_render_seconds", "Time to render each Streamlit page", ["page"])
+SCRIPT_SECONDS = REGISTRY.histogram(
+    "sakura_script_run_seconds", "Time for one full Streamlit script rerun")
+API_SECONDS = REGISTRY.histogram(
+    "sakura_api_request_seconds", "Latency of JSON API requests", ["route", "status"])
+SEATS_SOLD = REGISTRY.counter("sakura_seats_sold", "Seats sold")
+SEATS_CANCELLED = REGISTRY.counter("sakura_seats_cancelled", "Seats released by cancellations")
+FLIGHTS_ADDED = REGISTRY.counter("sakura_flights_added", "Flights added to the schedule")
+INDEX_ENTRIES = REGISTRY.gauge(
+    "sakura_index_entries", "Entries in the in-memory indexes", ["index"])
+
+
+def timed(family, *labels):
+    def decorate(function):
+        if not ENABLED:
+            return function
+        child = family.labels(*labels)
+        perf_counter = time.perf_counter
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            started = perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                child.observe(perf_counter() - started)
+        return wrapper
+    return decorate
+
+
+class SystemMetrics:
+    # AirlineSystem listener counting sales and cancellations, plus index-size
+    # gauges that are only evaluated when metrics are scraped
+    def __init__(self, airline_system):
+        self._system = airline_system
+        for index in ("flights", "routes", "dates", "reservations", "seat_holds", "waitlist"):
+            INDEX_ENTRIES.set_function(lambda index=index: airline_system.index_sizes()[index], index)
+        airline_system.add_listener(self)
+
+    def flights_added(self, rows):
+        FLIGHTS_ADDED.inc(len(rows))
+
+    def reservation_created(self, reservation):
+        SEATS_SOLD.inc()
+
+    def reservation_cancelled(self, reservation):
+        SEATS_CANCELLED.inc()
+
+
+def watch_system(airline_system):
+    if ENABLED:
+        return SystemMetrics(airline_system)
+    return None
+
+
+def serve(port, host="0.0.0.0", registry=REGISTRY):
+    # Serves GET /metrics from a daemon thread; returns the server so callers can stop it.
+    # http.server is only imported here so importing the core stays cheap.
+    import http.server
+
+    class MetricsHandler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.exposition().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
+
+
+class SamplingProfiler:
+    # Opt-in statistical profiler: a background thread snapshots every other thread's
+    # stack at a fixed interval. Costs nothing until started.
+    def __init__(self, interval=0.005, max_depth=64):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.samples = 0
+        self._stacks = collections.Counter()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.is_running():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def reset(self):
+        with self._lock:
+            self._stacks.clear()
+            self.samples = 0
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            stacks = []
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < self.max_depth:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                stacks.append(tuple(reversed(stack)))
+            with self._lock:
+                self._stacks.update(stacks)
+                self.samples += 1
+
+    def top(self, limit=20):
+        # (function, self samples, total samples) ordered by self samples
+        own = collections.Counter()
+        total = collections.Counter()
+        with self._lock:
+            stacks = list(self._stacks.items())
+        for stack, count in stacks:
+            if not stack:
+                continue
+            own[stack[-1]] += count
+            for function in set(stack):
+                total[function] += count
+        return [(function, count, total[function]) for function, count in own.most_common(limit)]
+
+    def collapsed(self):
+        # Brendan Gregg's folded format, ready for flamegraph.pl or speedscope
+        with self._lock:
+            stacks = list(self._stacks.items())
+        return "\n".join(f"{';'.join(stack)} {count}" for stack, count in stacks if stack)
+
+
+_profiler = None
+_profiler_lock = threading.Lock()
+
+
+def get_profiler():
+    global _profiler
+    with _profiler_lock:
+        if _profiler is None:
+            _profiler = SamplingProfiler()
+            if os.environ.get("SAKURA_PROFILE") == "1":
+                _profiler.start()
+        return _profiler
@@ -0,0 +1,74 @@
+import sys
+
+from . import ids, timestamps
+
+
+def _dispatcher():
+    # Imported on the first charge: the gateway's asyncio machinery is the most
+    # expensive import in the core, and most callers never take a payment
+    from .payment_gateway import get_default_dispatcher
+
+    return get_default_dispatcher()
+
+
+class Payment:
+    # Slotted: one of these stays resident for every booking
+    __slots__ = ("_payment_id", "_amount", "_payment_method", "_status", "_timestamp")
+
+    def __init__(self, amount, payment_method, payment_id=None, status="Pending", timestamp=None):
+        # Stored payments pass their ID, status and time back in
+        self._payment_id = ids.next_text_id() if payment_id is None else payment_id
+        self._amount = amount
+        self._payment_method = sys.intern(payment_method)
+        self._status = sys.intern(status)
+        # Integer microseconds, see timestamps
+        self._timestamp = timestamps.now() if timestamp is None else timestamp
+
+    def get_amount(self):
+        return self._amount
+    
+    def get_payment(self):
+        return self._payment_method
+    
+    def get_status(self):
+        return self._status
+
+    def get_timestamp(self):
+        return timestamps.to_datetime(self._timestamp)
+    
+    def _submit_charge(self):
+        self._status = "Processing"
+        # The payment ID doubles as the idempotency key, so gateway retries never double charge
+        return _dispatcher().submit_charge(
+            self._payment_id, self._amount, self._payment_method)
+
+    def _settle(self, done):
+        charged = not done.cancelled() and done.exception() is None and bool(done.result())
+        self._status = "Completed" if charged else "Failed"
+        return charged
+
+    def process_payment(self):
+        import concurrent.futures
+
+        future = self._submit_charge()
+        concurrent.futures.wait([future])
+        return self._settle(future)
+
+    def process_payment_async(self):
+        # Non-blocking variant: returns a concurrent.futures.Future resolving to True/False.
+        # Callers that wait on it should settle() it themselves, as the callback may lag.
+        future = self._submit_charge()
+        future.add_done_callback(self._settle)
+        return future
+    
+    def refund_payment(self):
+        if self.get_status() == "Completed":
+            try:
+                refunded = _dispatcher().submit_refund(
+                    self._payment_id, self._amount, self._payment_method).result()
+            except Exception:
+                refunded = False
+            # A refund the gateway turned down is recorded, so the money owed stays visible
+            self._status = "Refunded" if refunded else "Refund Failed"
+            return refunded
+        return False
@@ -0,0 +1,225 @@
+import asyncio
+import random
+import threading
+
+
+class PaymentError(Exception):
+    pass
+
+
+class TransientPaymentError(PaymentError):
+    # Network blips, gateway 5xx responses and timeouts: safe to retry with the same key
+    pass
+
+
+class PaymentGateway:
+    # Provider interface. Implementations are driven from the dispatcher's event loop;
+    # every call carries an idempotency key so a retried request is applied at most once.
+    max_connections = 10
+
+    async def connect(self):
+        return None
+
+    async def close_connection(self, connection):
+        pass
+
+    async def charge(self, connection, idempotency_key, amount, payment_method):
+        raise NotImplementedError
+
+    async def refund_batch(self, connection, refunds):
+        # refunds is a list of (idempotency_key, amount); returns {idempotency_key: bool}
+        raise NotImplementedError
+
+
+class StubGateway(PaymentGateway):
+    # Local stand-in for Momo/VNPay/ZaloPay/card gateways with configurable latency and failures
+    def __init__(self, latency=0.0, jitter=0.0, failure_rate=0.0, decline_rate=0.0,
+                 max_connections=10, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.decline_rate = decline_rate
+        self.max_connections = max_connections
+        self._random = random.Random(seed)
+        self._charges = {}
+        self._refunds = {}
+        self.calls = 0
+
+    async def _round_trip(self):
+        self.calls += 1
+        delay = self.latency + self._random.uniform(0, self.jitter)
+        if delay:
+            await asyncio.sleep(delay)
+        if self._random.random() < self.failure_rate:
+            raise TransientPaymentError("Gateway unavailable")
+
+    async def charge(self, connection, idempotency_key, amount, payment_method):
+        await self._round_trip()
+        if idempotency_key not in self._charges:
+            self._charges[idempotency_key] = self._random.random() >= self.decline_rate
+        return self._charges[idempotency_key]
+
+    async def refund_batch(self, connection, refunds):
+        await self._round_trip()
+        results = {}
+        for idempotency_key, amount in refunds:
+            if idempotency_key not in self._refunds:
+                self._refunds[idempotency_key] = self._charges.get(idempotency_key, True)
+            results[idempotency_key] = self._refunds[idempotency_key]
+        return results
+
+
+class _Provider:
+    def __init__(self, gateway, max_concurrency):
+        self.gateway = gateway
+        self.slots = asyncio.Semaphore(max_concurrency)
+        self.idle = []
+        self.open_connections = 0
+        self.connection_freed = asyncio.Condition()
+        self.pending_refunds = []
+        self.refund_flush = None
+
+    async def acquire(self):
+        async with self.connection_freed:
+            while not self.idle and self.open_connections >= self.gateway.max_connections:
+                await self.connection_freed.wait()
+            if self.idle:
+                return self.idle.pop()
+            self.open_connections += 1
+        try:
+            return await self.gateway.connect()
+        except BaseException:
+            async with self.connection_freed:
+                self.open_connections -= 1
+                self.connection_freed.notify()
+            raise
+
+    async def release(self, connection, broken=False):
+        async with self.connection_freed:
+            if broken:
+                self.open_connections -= 1
+            else:
+                self.idle.append(connection)
+            self.connection_freed.notify()
+        if broken:
+            await self.gateway.close_connection(connection)
+
+
+class PaymentDispatcher:
+    # Runs gateway I/O on one background asyncio loop. Each provider gets a pooled set
+    # of connections and a concurrency cap; calls time out, retry with backoff under the
+    # same idempotency key, and refunds are coalesced into batches.
+    def __init__(self, gateways=None, default_gateway=None, max_concurrency=50, timeout=10.0,
+                 retries=3, backoff=0.05, refund_batch_size=50, refund_batch_wait=0.01):
+        self._gateways = dict(gateways or {})
+        self._default_gateway = default_gateway or StubGateway()
+        self._max_concurrency = max_concurrency
+        self._timeout = timeout
+        self._retries = retries
+        self._backoff = backoff
+        self._refund_batch_size = refund_batch_size
+        self._refund_batch_wait = refund_batch_wait
+        self._providers = {}
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="payment-dispatcher",
+                                        daemon=True)
+        self._thread.start()
+
+    def _provider(self, payment_method):
+        gateway = self._gateways.get(payment_method, self._default_gateway)
+        provider = self._providers.get(id(gateway))
+        if provider is None:
+            provider = _Provider(gateway, self._max_concurrency)
+            self._providers[id(gateway)] = provider
+        return provider
+
+    async def _call(self, provider, request):
+        # request(connection) -> awaitable; retried on transient errors and timeouts
+        attempt = 0
+        while True:
+            async with provider.slots:
+                connection = await provider.acquire()
+                broken = False
+                try:
+                    return await asyncio.wait_for(request(connection), self._timeout)
+                except (TransientPaymentError, asyncio.TimeoutError):
+                    broken = True
+                    if attempt >= self._retries:
+                        raise
+                finally:
+                    await provider.release(connection, broken)
+            await asyncio.sleep(self._backoff * (2 ** attempt))
+            attempt += 1
+
+    async def _charge(self, idempotency_key, amount, payment_method):
+        provider = self._provider(payment_method)
+        return await self._call(provider, lambda connection: provider.gateway.charge(
+            connection, idempotency_key, amount, payment_method))
+
+    async def _refund(self, idempotency_key, amount, payment_method):
+        provider = self._provider(payment_method)
+        result = self._loop.create_future()
+        provider.pending_refunds.append((idempotency_key, amount, result))
+        if len(provider.pending_refunds) >= self._refund_batch_size:
+            self._flush_refunds(provider)
+        elif provider.refund_flush is None:
+            provider.refund_flush = self._loop.call_later(
+                self._refund_batch_wait, self._flush_refunds, provider)
+        return await result
+
+    def _flush_refunds(self, provider):
+        if provider.refund_flush is not None:
+            provider.refund_flush.cancel()
+            provider.refund_flush = None
+        batch = provider.pending_refunds[:self._refund_batch_size]
+        del provider.pending_refunds[:self._refund_batch_size]
+        if provider.pending_refunds:
+            provider.refund_flush = self._loop.call_soon(self._flush_refunds, provider)
+        if batch:
+            self._loop.create_task(self._submit_refunds(provider, batch))
+
+    async def _submit_refunds(self, provider, batch):
+        refunds = [(key, amount) for key, amount, _ in batch]
+        try:
+            results = await self._call(provider, lambda connection: provider.gateway.refund_batch(
+                connection, refunds))
+        except Exception as e:
+            for _, _, result in batch:
+                if not result.done():
+                    result.set_exception(e)
+            return
+        for key, _, result in batch:
+            if not result.done():
+                result.set_result(bool(results.get(key)))
+
+    def submit_charge(self, idempotency_key, amount, payment_method):
+        # Returns a concurrent.futures.Future; await it from asyncio with asyncio.wrap_future
+        return asyncio.run_coroutine_threadsafe(
+            self._charge(idempotency_key, amount, payment_method), self._loop)
+
+    def submit_refund(self, idempotency_key, amount, payment_method):
+        return asyncio.run_coroutine_threadsafe(
+            self._refund(idempotency_key, amount, payment_method), self._loop)
+
+    def close(self):
+        if self._loop.is_running():
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+
+
+_default_dispatcher = None
+_default_lock = threading.Lock()
+
+
+def get_default_dispatcher():
+    global _default_dispatcher
+    with _default_lock:
+        if _default_dispatcher is None:
+            _default_dispatcher = PaymentDispatcher()
+        return _default_dispatcher
+
+
+def set_default_dispatcher(dispatcher):
+    global _default_dispatcher
+    with _default_lock:
+        _default_dispatcher = dispatcher
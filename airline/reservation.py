@@ -0,0 +1,199 @@
+import bisect
+import sys
+import threading
+
+from . import ids, timestamps
+from .payment import Payment
+from .storage import StorageBackend
+
+
+class Passenger:
+    # Slotted, with the strings many passengers share interned: millions of these can
+    # stay resident
+    __slots__ = ("_passenger_id", "_passport_number", "_first_name", "_last_name", "_age", "_email",
+                 "_phone")
+
+    def __init__(self, passport_number, first_name, last_name, age, email=None, phone=None,
+                 passenger_id=None):
+        # A stored passenger keeps its ID; only new ones draw from the generator
+        self._passenger_id = ids.next_id() if passenger_id is None else passenger_id
+        self._passport_number = passport_number
+        self._first_name = sys.intern(first_name)
+        self._last_name = sys.intern(last_name)
+        self._age = age
+        self._email = email
+        self._phone = phone
+
+    def get_full_name(self):
+        return f"{self._first_name} {self._last_name}"
+
+class Reservation:
+    __slots__ = ("_reservation_id", "_passenger", "_flight", "_seat_number", "_reservation_date",
+                 "status", "_payment", "_store")
+
+    def __init__(self, passenger, flight, seat_number, reservation_id=None, reservation_date=None,
+                 status="Pending"):
+        # Time-ordered, see ids: a range of reservation IDs is the bookings made in a time range
+        self._reservation_id = ids.next_text_id() if reservation_id is None else reservation_id
+        self._passenger = passenger
+        self._flight = flight
+        self._seat_number = sys.intern(seat_number)
+        # Integer microseconds, see timestamps
+        self._reservation_date = timestamps.now() if reservation_date is None else reservation_date
+        self.status = sys.intern(status)
+        self._payment = None
+        self._store = None
+    
+    def __getstate__(self):
+        # A pickled copy is detached from the store that persists and indexes it
+        state = {name: getattr(self, name) for name in self.__slots__}
+        state["_store"] = None
+        return state
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
+
+    def get_reservation_date(self):
+        return timestamps.to_datetime(self._reservation_date)
+
+    def confirm_reservation(self, payment_method, hold=None):
+        # Take the seat before charging so two sessions can never pay for the same seat
+        if not self._flight.assign_seat(self._seat_number, self._passenger, hold):
+            return False
+        payment = self._new_payment(payment_method)
+        
+        if payment.process_payment():
+            self._payment = payment
+            self.status = "Confirmed"
+            return True
+        self._flight.release_seat(self._seat_number, self._passenger)
+        return False
+
+    def _new_payment(self, payment_method):
+        seat = self._flight._seats[self._seat_number]
+        return Payment(seat.get_price(), payment_method)
+    
+    def cancel_reservation(self):
+        if not self._begin_cancellation():
+            return False
+        self._release()
+        self._settle_cancellation()
+        return True
+
+    def _begin_cancellation(self):
+        # Marks a confirmed booking cancelled and records that before its seat is freed,
+        # so storage never refuses someone rebooking the seat
+        with self._flight._lock:
+            if self.status != "Confirmed":
+                return False
+            self.status = "Cancelled"
+        if self._store is not None:
+            self._store.on_cancelling(self)
+        return True
+
+    def _release(self):
+        self._flight.release_seat(self._seat_number, self._passenger)
+
+    def _settle_cancellation(self):
+        # Refunds a released booking and records the outcome, outside the flight's lock
+        if self._payment:
+            self._payment.refund_payment()
+        if self._store is not None:
+            self._store.on_cancelled(self)
+
+    def _roll_back(self):
+        # Undoes a confirmation that storage refused: the charge is refunded and the seat freed
+        with self._flight._lock:
+            self.status = "Pending"
+            self._flight.release_seat(self._seat_number, self._passenger)
+        if self._payment:
+            self._payment.refund_payment()
+
+class ReservationStore:
+    def __init__(self, storage=None, listeners=None):
+        self._storage = storage or StorageBackend()
+        self._listeners = listeners if listeners is not None else []
+        self._lock = threading.Lock()
+        self._by_id = {}
+        # Reservation IDs in order, for range scans. A persistent backend scans its own
+        # primary key instead, so only reservations that live nowhere else are listed.
+        self._ids = []
+        # Secondary indexes hold every reservation; the active one only confirmed bookings,
+        # keyed by seat number, which is the flight's manifest. A passenger has a handful of
+        # bookings at most, so theirs are a tuple filtered on read rather than two dicts.
+        self._by_passport = {}
+        self._by_flight = {}
+        self._active_by_seat = {}
+
+    def __iter__(self):
+        return iter(self._by_id.values())
+
+    def __len__(self):
+        return len(self._by_id)
+
+    def add(self, reservation, persist=True):
+        if persist:
+            self._storage.save_reservation(reservation)
+        reservation_id = reservation._reservation_id
+        passport_number = reservation._passenger._passport_number
+        flight_number = reservation._flight.get_flight_number()
+        with self._lock:
+            if self._by_id.get(reservation_id, reservation) is not reservation:
+                raise ValueError(f"Reservation ID {reservation_id} is already in use")
+            self._by_id[reservation_id] = reservation
+            if not self._storage.persistent:
+                # IDs arrive almost in order, so this inserts at or near the end
+                bisect.insort(self._ids, reservation_id)
+            self._by_passport[passport_number] = self._by_passport.get(passport_number, ()) + (reservation,)
+            self._by_flight.setdefault(flight_number, {})[reservation_id] = reservation
+            if reservation.status == "Confirmed":
+                self._active_by_seat.setdefault(flight_number, {})[reservation._seat_number] = reservation
+            reservation._store = self
+        if persist:
+            for listener in self._listeners:
+                listener.reservation_created(reservation)
+
+    def on_cancelling(self, reservation):
+        self._storage.save_cancellation(reservation)
+
+    def on_cancelled(self, reservation):
+        # Records the refund too, which follows the cancellation
+        self._storage.save_cancellation(reservation)
+        with self._lock:
+            seats = self._active_by_seat.get(reservation._flight.get_flight_number(), {})
+            # The seat may already have been rebooked by the time the cancellation lands
+            if seats.get(reservation._seat_number) is reservation:
+                del seats[reservation._seat_number]
+        for listener in self._listeners:
+            listener.reservation_cancelled(reservation)
+
+    def get(self, reservation_id):
+        return self._by_id.get(reservation_id)
+
+    def find_by_passport(self, passport_number, include_cancelled=False):
+        reservations = self._by_passport.get(passport_number, ())
+        if include_cancelled:
+            return list(reservations)
+        return [reservation for reservation in reservations if reservation.status == "Confirmed"]
+
+    def find_between(self, first_id=None, last_id=None, include_cancelled=False, limit=None):
+        # Up to limit reservations with IDs from first_id to last_id inclusive, newest first
+        start = 0 if first_id is None else bisect.bisect_left(self._ids, first_id)
+        stop = len(self._ids) if last_id is None else bisect.bisect_right(self._ids, last_id)
+        reservations = []
+        for index in range(stop - 1, start - 1, -1):
+            if len(reservations) == limit:
+                break
+            reservation = self._by_id[self._ids[index]]
+            if include_cancelled or reservation.status == "Confirmed":
+                reservations.append(reservation)
+        return reservations
+
+    def find_by_flight(self, flight_number, include_cancelled=False):
+        index = self._by_flight if include_cancelled else self._active_by_seat
+        return list(index.get(flight_number, {}).values())
+
+    def seat_map(self, flight_number):
+        # Seat number -> confirmed reservation for one flight
+        return dict(self._active_by_seat.get(flight_number, {}))
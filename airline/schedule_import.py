@@ -0,0 +1,158 @@
+import argparse
+import os
+import sys
+
+import pandas as pd
+
+from .aircraft import AIRCRAFT_LAYOUTS, DEFAULT_AIRCRAFT
+from .storage import FLIGHT_COLUMNS
+
+DEFAULT_CHUNK_SIZE = 50000
+MAX_KEPT_REJECTS = 10000
+
+
+class ImportReport:
+    def __init__(self, max_rejects=MAX_KEPT_REJECTS):
+        self.accepted = 0
+        self.rejected = 0
+        self._max_rejects = max_rejects
+        self._rejects = []
+
+    def add_rejects(self, rows):
+        self.rejected += len(rows)
+        kept = sum(len(frame) for frame in self._rejects)
+        if kept < self._max_rejects and len(rows):
+            self._rejects.append(rows.head(self._max_rejects - kept))
+
+    def get_rejected_rows(self):
+        if not self._rejects:
+            return pd.DataFrame(columns=[*FLIGHT_COLUMNS, "reason"])
+        return pd.concat(self._rejects, ignore_index=True)
+
+
+def _source_name(source):
+    return str(getattr(source, "name", source)).lower()
+
+
+def iter_schedule_chunks(source, chunk_size=DEFAULT_CHUNK_SIZE):
+    # Streams a CSV or Parquet schedule as DataFrames of at most chunk_size rows
+    if _source_name(source).endswith(".parquet"):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Parquet schedules need pyarrow: pip install pyarrow")
+        for batch in pq.ParquetFile(source).iter_batches(batch_size=chunk_size):
+            # Nulls become "", as in a CSV, so they are caught as missing fields
+            yield batch.to_pandas().fillna("").astype(str)
+    else:
+        yield from pd.read_csv(source, dtype=str, keep_default_na=False, skipinitialspace=True,
+                               chunksize=chunk_size)
+
+
+def _parse(values, *formats):
+    parsed = pd.to_datetime(values, format=formats[0], errors="coerce")
+    for fmt in formats[1:]:
+        parsed = parsed.fillna(pd.to_datetime(values, format=fmt, errors="coerce"))
+    # Stray whitespace is rare, so only values that failed to parse are stripped and retried
+    failed = parsed.isna() & (values != "")
+    if failed.any():
+        stripped = values[failed].str.strip()
+        retried = pd.to_datetime(stripped, format=formats[0], errors="coerce")
+        for fmt in formats[1:]:
+            retried = retried.fillna(pd.to_datetime(stripped, format=fmt, errors="coerce"))
+        parsed[failed] = retried
+    return parsed
+
+
+def _normalise(rows, column, parsed, valid, fmt, width):
+    # Only values not already in canonical form go through the (slow) strftime
+    values = rows[column]
+    lengths = values.str.len()
+    if width == 5:
+        seconds = valid & (lengths == 8) & (values.str[2] == ":")
+        rows.loc[seconds, column] = values[seconds].str[:5]
+        lengths = lengths.mask(seconds, 5)
+    reformat = valid & (lengths != width)
+    if reformat.any():
+        rows.loc[reformat, column] = parsed[reformat].dt.strftime(fmt)
+
+
+def validate_chunk(chunk):
+    # Returns (valid rows normalised to FLIGHT_COLUMNS, rejected rows with a reason)
+    if "aircraft_type" not in chunk.columns:
+        chunk = chunk.assign(aircraft_type=DEFAULT_AIRCRAFT)
+    missing_columns = [column for column in FLIGHT_COLUMNS if column not in chunk.columns]
+    if missing_columns:
+        raise ValueError(f"Schedule is missing columns: {', '.join(missing_columns)}")
+
+    rows = chunk[list(FLIGHT_COLUMNS)].copy()
+    rows["aircraft_type"] = rows["aircraft_type"].replace("", DEFAULT_AIRCRAFT)
+    reason = pd.Series("", index=rows.index)
+
+    def reject(mask, message):
+        reason.mask((reason == "") & mask, message, inplace=True)
+
+    reject((rows == "").any(axis=1), "missing required field")
+    dates = _parse(rows["flight_date"], "%Y-%m-%d")
+    reject(dates.isna(), "invalid flight date")
+    # HH:MM:SS is what most Parquet exporters write for times
+    departures = _parse(rows["departure_time"], "%H:%M", "%H:%M:%S")
+    arrivals = _parse(rows["arrival_time"], "%H:%M", "%H:%M:%S")
+    reject(departures.isna() | arrivals.isna(), "invalid time")
+    reject(arrivals <= departures, "arrival time must be after departure time")
+    reject(~rows["aircraft_type"].isin(list(AIRCRAFT_LAYOUTS)), "unknown aircraft type")
+    reject(rows["flight_number"].duplicated(), "duplicate flight number in file")
+
+    valid = reason == ""
+    _normalise(rows, "flight_date", dates, valid, "%Y-%m-%d", 10)
+    _normalise(rows, "departure_time", departures, valid, "%H:%M", 5)
+    _normalise(rows, "arrival_time", arrivals, valid, "%H:%M", 5)
+    rejected = rows[~valid].assign(reason=reason[~valid])
+    return rows[valid], rejected
+
+
+def import_schedule(airline_system, source, chunk_size=DEFAULT_CHUNK_SIZE, report=None):
+    report = report or ImportReport()
+    for chunk in iter_schedule_chunks(source, chunk_size):
+        valid, rejected = validate_chunk(chunk)
+        report.add_rejects(rejected)
+        if valid.empty:
+            continue
+        # Flight numbers seen in earlier chunks or already scheduled come back as duplicates
+        duplicates = set(airline_system.add_flights(list(valid.itertuples(index=False, name=None))))
+        if duplicates:
+            is_duplicate = valid["flight_number"].isin(duplicates)
+            report.add_rejects(valid[is_duplicate].assign(reason="flight number already exists"))
+            report.accepted += len(valid) - int(is_duplicate.sum())
+        else:
+            report.accepted += len(valid)
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk import a flight schedule (CSV or Parquet)")
+    parser.add_argument("schedule", help="path to a .csv or .parquet schedule file")
+    parser.add_argument("--db", default=os.environ.get("SAKURA_DB", "sakura.db"),
+                        help="SQLite database to import into (default: $SAKURA_DB or sakura.db)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--rejects", help="write rejected rows to this CSV file")
+    args = parser.parse_args(argv)
+
+    from .storage import SQLiteStorage
+    from .system import AirlineSystem
+
+    storage = SQLiteStorage(args.db)
+    try:
+        report = import_schedule(AirlineSystem(storage), args.schedule, args.chunk_size)
+    finally:
+        storage.close()
+
+    print(f"Imported {report.accepted} flights, rejected {report.rejected} rows")
+    if args.rejects and report.rejected:
+        report.get_rejected_rows().to_csv(args.rejects, index=False)
+        print(f"Rejected rows written to {args.rejects}")
+    return 0 if report.accepted or not report.rejected else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
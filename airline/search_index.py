@@ -0,0 +1,52 @@
+import bisect
+import difflib
+
+
+class SortedKeyIndex:
+    # Values bucketed under distinct keys, with the keys also kept in a sorted list.
+    # Exact lookups are dict lookups; ranges and prefixes bisect the key list, so they
+    # cost O(log k) plus the matches. A new key is an O(k) list insert, which is cheap
+    # for keys such as dates or destinations that number in the thousands at most.
+    def __init__(self):
+        self._keys = []
+        self._buckets = {}
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, key):
+        return key in self._buckets
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def get(self, key, default=()):
+        return self._buckets.get(key, default)
+
+    def add(self, key, value):
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bisect.insort(self._keys, key)
+            bucket = self._buckets[key] = []
+        bucket.append(value)
+
+    def keys_between(self, low=None, high=None):
+        # Inclusive at both ends; either may be left open
+        start = 0 if low is None else bisect.bisect_left(self._keys, low)
+        stop = len(self._keys) if high is None else bisect.bisect_right(self._keys, high)
+        return self._keys[start:stop]
+
+    def keys_with_prefix(self, prefix, limit=None):
+        keys = []
+        for index in range(bisect.bisect_left(self._keys, prefix), len(self._keys)):
+            key = self._keys[index]
+            if not key.startswith(prefix) or len(keys) == limit:
+                break
+            keys.append(key)
+        return keys
+
+    def close_keys(self, key, limit=5, cutoff=0.6):
+        # Nearest spellings, for suggestions when nothing matches. Keys sharing the first
+        # character are tried before all of them, as that is the one least often mistyped.
+        keys = difflib.get_close_matches(key, self.keys_with_prefix(key[:1]), limit, cutoff)
+        return keys or difflib.get_close_matches(key, self._keys, limit, cutoff)
@@ -0,0 +1,278 @@
+import threading
+
+from .aircraft import NARROW_BODY
+
+
+class Seat:
+    def __init__(self, seat_number, inventory=None):
+        self.seat_number = seat_number
+        self._inventory = inventory
+        self._occupied = False
+        self.seat_class = self.get_seat_class()
+
+    def _get_layout(self):
+        return NARROW_BODY if self._inventory is None else self._inventory.layout
+
+    def get_seat_class(self):
+        return self._get_layout().get_seat_class(self.seat_number)
+
+    def get_price(self):
+        return self._get_layout().get_cabin(self.seat_class).price
+    
+    def get_amenities(self):
+        return list(self._get_layout().get_cabin(self.seat_class).amenities)
+
+    @property
+    def is_occupied(self):
+        if self._inventory is None:
+            return self._occupied
+        return self._inventory.is_occupied(self.seat_number)
+
+    @property
+    def is_held(self):
+        return self._inventory is not None and self._inventory.is_held(self.seat_number)
+
+    def occupy(self):
+        if self._inventory is None:
+            self._occupied = True
+        else:
+            self._inventory.occupy(self.seat_number)
+        
+    def empty(self):
+        if self._inventory is None:
+            self._occupied = False
+        else:
+            self._inventory.release(self.seat_number)
+
+# Prices and amenities come from the flight's AircraftLayout; the subclasses
+# only tag which cabin a seat belongs to
+class FirstClass(Seat):
+    pass
+
+class BusinessClassSeat(Seat):
+    pass
+
+class EconomyClassSeat(Seat):
+    pass
+
+SEAT_TYPES = {
+    'First': FirstClass,
+    'Business': BusinessClassSeat,
+    'Economy': EconomyClassSeat,
+}
+
+class RevisionClock:
+    # Monotonic change counter. Every flight of an AirlineSystem shares the system's
+    # clock: a flight's revision is the clock value at its last seat change and the
+    # clock's current value is the system revision, so views can key on either.
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def tick(self):
+        with self._lock:
+            self.value += 1
+            return self.value
+
+    def advance_to(self, value):
+        with self._lock:
+            if value > self.value:
+                self.value = value
+
+    def __reduce__(self):
+        # A pickled copy is a detached clock at the same value
+        return RevisionClock, (), self.value
+
+    def __setstate__(self, value):
+        self.value = value
+
+class SeatInventory:
+    FREE = 0
+    OCCUPIED = 1
+    HELD = 2
+
+    def __init__(self, layout=NARROW_BODY, clock=None):
+        # One byte per seat position plus running free-seat counters; the
+        # positions themselves belong to the shared layout
+        self.layout = layout
+        self._states = bytearray(layout.get_seat_count())
+        self._free_by_class = dict(layout.seats_per_class)
+        self._free_total = layout.get_seat_count()
+        # Per row: free seats and the longest run of adjacent free seats, kept
+        # current on every change so group allocation never scans seat by seat
+        self._row_free = bytearray(stop - start for start, stop in layout.row_ranges)
+        self._row_runs = bytearray(self._row_free)
+        # Moved forward on every seat change so renderers can cache per revision
+        self.clock = clock or RevisionClock()
+        self.revision = 0
+
+    def snapshot(self):
+        # Independent copy of the seat state, e.g. to send to another process
+        copy = object.__new__(SeatInventory)
+        copy.__dict__.update(self.__dict__)
+        copy._states = bytearray(self._states)
+        copy._free_by_class = dict(self._free_by_class)
+        copy._row_free = bytearray(self._row_free)
+        copy._row_runs = bytearray(self._row_runs)
+        return copy
+
+    def attach_clock(self, clock):
+        # Revisions stay monotonic when a flight moves onto a shared clock
+        clock.advance_to(self.revision)
+        self.clock = clock
+
+    def __contains__(self, seat_number):
+        return seat_number in self.layout.seat_index
+
+    def is_occupied(self, seat_number):
+        return self._states[self.layout.seat_index[seat_number]] != self.FREE
+
+    def is_held(self, seat_number):
+        return self._states[self.layout.seat_index[seat_number]] == self.HELD
+
+    def occupy(self, seat_number, state=OCCUPIED):
+        index = self.layout.seat_index.get(seat_number)
+        if index is None or self._states[index] != self.FREE:
+            return False
+        self._states[index] = state
+        self._free_by_class[self.layout.seat_classes[index]] -= 1
+        self._free_total -= 1
+        self._update_row(index)
+        self.revision = self.clock.tick()
+        return True
+
+    def hold(self, seat_number):
+        # Held seats already count as taken, so availability never offers them
+        return self.occupy(seat_number, self.HELD)
+
+    def convert_hold(self, seat_number):
+        index = self.layout.seat_index.get(seat_number)
+        if index is None or self._states[index] != self.HELD:
+            return False
+        self._states[index] = self.OCCUPIED
+        self.revision = self.clock.tick()
+        return True
+
+    def release(self, seat_number):
+        index = self.layout.seat_index.get(seat_number)
+        if index is None or self._states[index] == self.FREE:
+            return False
+        self._states[index] = self.FREE
+        self._free_by_class[self.layout.seat_classes[index]] += 1
+        self._free_total += 1
+        self._update_row(index)
+        self.revision = self.clock.tick()
+        return True
+
+    def _free_runs(self, row):
+        # (start, length) of each run of adjacent free seats in the row
+        start, stop = self.layout.row_ranges[row]
+        runs = []
+        run_start = None
+        for index in range(start, stop + 1):
+            if index < stop and self._states[index] == self.FREE:
+                if run_start is None:
+                    run_start = index
+            elif run_start is not None:
+                runs.append((run_start, index - run_start))
+                run_start = None
+        return runs
+
+    def _update_row(self, index):
+        row = self.layout.seat_rows[index]
+        runs = self._free_runs(row)
+        self._row_free[row] = sum(length for _, length in runs)
+        self._row_runs[row] = max((length for _, length in runs), default=0)
+
+    def find_block(self, count, seat_class):
+        # Seat numbers for a group of count in one cabin, or None if it does not fit.
+        # Prefers a single row (the tightest run that fits, so long runs stay free for
+        # bigger groups), then the fewest adjacent rows, filling the longest runs first.
+        rows = self.layout.rows_by_class.get(seat_class)
+        if not rows or count <= 0 or self._free_by_class[seat_class] < count:
+            return None
+        seat_numbers = self.layout.seat_numbers
+
+        best = None
+        for row in rows:
+            run = self._row_runs[row]
+            if run >= count and (best is None or run < self._row_runs[best]):
+                best = row
+        if best is not None:
+            start = min((run for run in self._free_runs(best) if run[1] >= count),
+                        key=lambda run: run[1])[0]
+            return [seat_numbers[index] for index in range(start, start + count)]
+
+        # Shortest window of consecutive rows holding enough free seats
+        window = None
+        free = 0
+        first = 0
+        for last in range(len(rows)):
+            free += self._row_free[rows[last]]
+            while free - self._row_free[rows[first]] >= count:
+                free -= self._row_free[rows[first]]
+                first += 1
+            if free >= count and (window is None or last - first < window[1] - window[0]):
+                window = (first, last)
+        block = []
+        for row in rows[window[0]:window[1] + 1]:
+            for start, length in sorted(self._free_runs(row), key=lambda run: -run[1]):
+                take = min(length, count - len(block))
+                block.extend(seat_numbers[index] for index in range(start, start + take))
+        return block
+
+    def count_available(self, seat_class=None):
+        if seat_class is None:
+            return self._free_total
+        return self._free_by_class.get(seat_class, 0)
+
+    def available_seat_numbers(self, seat_class=None):
+        seat_numbers = self.layout.seat_numbers
+        seat_classes = self.layout.seat_classes
+        available = []
+        index = self._states.find(self.FREE)
+        while index != -1:
+            if seat_class is None or seat_classes[index] == seat_class:
+                available.append(seat_numbers[index])
+            index = self._states.find(self.FREE, index + 1)
+        return available
+
+class SeatMap:
+    # Read-only mapping of seat number -> Seat view over a flight's inventory
+    def __init__(self, inventory):
+        self._inventory = inventory
+        self._layout = inventory.layout
+
+    def _view(self, seat_number):
+        seat_class = self._layout.get_seat_class(seat_number)
+        return SEAT_TYPES[seat_class](seat_number, self._inventory)
+
+    def __getitem__(self, seat_number):
+        if seat_number not in self._layout.seat_index:
+            raise KeyError(seat_number)
+        return self._view(seat_number)
+
+    def get(self, seat_number, default=None):
+        if seat_number not in self._layout.seat_index:
+            return default
+        return self._view(seat_number)
+
+    def __contains__(self, seat_number):
+        return seat_number in self._layout.seat_index
+
+    def __iter__(self):
+        return iter(self._layout.seat_numbers)
+
+    def __len__(self):
+        return self._layout.get_seat_count()
+
+    def keys(self):
+        return list(self._layout.seat_numbers)
+
+    def values(self):
+        return [self._view(seat_number) for seat_number in self._layout.seat_numbers]
+
+    def items(self):
+        return [(seat_number, self._view(seat_number)) for seat_number in self._layout.seat_numbers]
@@ -0,0 +1,562 @@
+import concurrent.futures
+import difflib
+import itertools
+import multiprocessing
+import multiprocessing.connection
+import os
+import pickle
+import threading
+import zlib
+
+from . import ids
+from .metrics import OPERATION_SECONDS, timed
+from .seats import RevisionClock
+from .storage import FLIGHT_SORTS, SQLiteStorage, StorageBackend
+from .system import SEAT_HOLD_TTL, AirlineSystem, availability_frame, sort_flights
+
+
+def shard_of(flight_number, shards):
+    # crc32 rather than hash(): string hashes are salted per process
+    return zlib.crc32(flight_number.encode()) % shards
+
+
+def shard_path(db_path, index):
+    root, extension = os.path.splitext(db_path)
+    return f"{root}.shard{index}{extension}"
+
+
+class _PublishedClock(RevisionClock):
+    # A shard's revision clock that also writes its value to shared memory, so the
+    # router can read the overall revision without a round trip
+    __slots__ = ("_revisions", "_index")
+
+    def __init__(self, revisions, index):
+        super().__init__()
+        self._revisions = revisions
+        self._index = index
+
+    def tick(self):
+        with self._lock:
+            self.value += 1
+            self._revisions[self._index] = self.value
+            return self.value
+
+    def advance_to(self, value):
+        with self._lock:
+            if value > self.value:
+                self.value = value
+                self._revisions[self._index] = value
+
+
+class _Channel:
+    # One end of a shard's pipe. Any thread may send; one thread receives.
+    def __init__(self, connection):
+        self.connection = connection
+        self._lock = threading.Lock()
+
+    def send(self, message):
+        self.send_bytes(pickle.dumps(message, pickle.HIGHEST_PROTOCOL))
+
+    def send_bytes(self, payload):
+        with self._lock:
+            self.connection.send_bytes(payload)
+
+
+class _EventForwarder:
+    # Listener in a shard that replays AirlineSystem callbacks in the router process
+    def __init__(self, channel):
+        self._channel = channel
+
+    def _forward(self, name, payload):
+        self._channel.send((None, name, payload))
+
+    def flights_added(self, rows):
+        self._forward("flights_added", list(rows))
+
+    def reservation_created(self, reservation):
+        self._forward("reservation_created", reservation)
+
+    def reservation_cancelled(self, reservation):
+        self._forward("reservation_cancelled", reservation)
+
+
+class _Shard:
+    # Runs commands from the router against this process's AirlineSystem. Flights
+    # arrive as flight numbers and holds as (seat number, deadline); results go back
+    # pickled, so the router only ever sees snapshots.
+
+    # Commands that can wait on payments or storage writes; the rest answer from
+    # memory and run straight on the receiving thread. Releasing a hold can promote
+    # from the waitlist, which charges the promoted passengers.
+    BLOCKING = frozenset({"add_flight", "add_flights", "release_hold", "create_reservation",
+                          "create_group_reservation", "cancel_reservation", "join_waitlist",
+                          "promote_waitlist", "flight_rows", "reservation_rows"})
+
+    def __init__(self, airline_system, channel):
+        self._system = airline_system
+        self._channel = channel
+
+    def handle(self, request_id, command, args):
+        try:
+            reply = (request_id, True, getattr(self, command)(*args))
+            payload = pickle.dumps(reply, pickle.HIGHEST_PROTOCOL)
+        except Exception as e:
+            try:
+                payload = pickle.dumps((request_id, False, e), pickle.HIGHEST_PROTOCOL)
+            except Exception:
+                payload = pickle.dumps((request_id, False, RuntimeError(repr(e))), pickle.HIGHEST_PROTOCOL)
+        self._channel.send_bytes(payload)
+
+    def _live_hold(self, flight, hold_key):
+        if hold_key is None:
+            return None
+        seat_number, expires_at = hold_key
+        hold = flight._holds.get(seat_number)
+        return hold if hold is not None and hold.expires_at == expires_at else None
+
+    def add_flight(self, flight):
+        return self._system.add_flight(flight)
+
+    def add_flights(self, rows):
+        return self._system.add_flights(rows)
+
+    def has_flights(self):
+        return self._system.has_flights()
+
+    def get_flight(self, flight_number):
+        return self._system.get_flight(flight_number)
+
+    def find_flights(self, destination, date, prefix):
+        return self._system.find_flights(destination, date, prefix)
+
+    def find_flights_page(self, destination, date, sort, descending, limit, prefix):
+        return self._system.find_flights_page(destination, date, sort, descending, 0, limit, prefix)
+
+    def find_flights_between(self, destination, date_from, date_to):
+        return self._system.find_flights_between(destination, date_from, date_to)
+
+    def suggest_destinations(self, text, limit):
+        return self._system.suggest_destinations(text, limit)
+
+    def availability_records(self, destination, date_from, date_to, cabin, min_free):
+        return self._system.availability_records(destination, date_from, date_to, cabin, min_free)
+
+    def hold_seat(self, flight_number, seat_number, ttl):
+        flight = self._system.get_flight(flight_number)
+        return None if flight is None else self._system.hold_seat(flight, seat_number, ttl)
+
+    def release_hold(self, flight_number, hold_key):
+        flight = self._system.get_flight(flight_number)
+        hold = flight and self._live_hold(flight, hold_key)
+        return bool(hold) and self._system.release_hold(hold)
+
+    def is_hold_active(self, flight_number, hold_key):
+        flight = self._system.get_flight(flight_number)
+        hold = flight and self._live_hold(flight, hold_key)
+        return bool(hold) and self._system.is_hold_active(hold)
+
+    def create_reservation(self, passenger, flight_number, seat_number, payment_method, hold_key):
+        flight = self._system.get_flight(flight_number)
+        if flight is None:
+            return None
+        hold = self._live_hold(flight, hold_key)
+        if hold_key is not None and hold is None:
+            # Expired or released: the seat goes to whoever holds it now, if anyone
+            return None
+        return self._system.create_reservation(passenger, flight, seat_number, payment_method, hold)
+
+    def create_group_reservation(self, passengers, flight_number, seat_class, payment_method):
+        flight = self._system.get_flight(flight_number)
+        if flight is None:
+            return None
+        return self._system.create_group_reservation(passengers, flight, seat_class, payment_method)
+
+    def cancel_reservation(self, reservation_id):
+        return self._system.cancel_reservation(reservation_id)
+
+    def get_reservation(self, reservation_id):
+        return self._system.get_reservation(reservation_id)
+
+    def find_reservations_between(self, start, end, include_cancelled, limit, before):
+        return self._system.find_reservations_between(start, end, include_cancelled, limit, before)
+
+    def join_waitlist(self, passenger, flight_number, seat_class, payment_method, fare_class, loyalty_tier):
+        flight = self._system.get_flight(flight_number)
+        if flight is None:
+            return None
+        return self._system.join_waitlist(passenger, flight, seat_class, payment_method, fare_class,
+                                          loyalty_tier)
+
+    def leave_waitlist(self, flight_number, entry_id):
+        return self._system.leave_waitlist(flight_number, entry_id)
+
+    def get_waitlist(self, flight_number, seat_class):
+        return self._system.get_waitlist(flight_number, seat_class)
+
+    def find_waitlist_entries(self, passport_number):
+        return self._system.find_waitlist_entries(passport_number)
+
+    def promote_waitlist(self, flight_number, seat_class):
+        flight = self._system.get_flight(flight_number)
+        return [] if flight is None else self._system.promote_waitlist(flight, seat_class)
+
+    def find_bookings(self, passport_number, include_cancelled):
+        return self._system.find_bookings(passport_number, include_cancelled)
+
+    def get_flight_reservations(self, flight_number, include_cancelled):
+        return self._system.get_flight_reservations(flight_number, include_cancelled)
+
+    def get_manifest(self, flight_number):
+        return self._system.get_manifest(flight_number)
+
+    def index_sizes(self):
+        return self._system.index_sizes()
+
+    def worker_id(self):
+        return ids.worker_id()
+
+    def flight_rows(self):
+        # Same shape as StorageBackend.iter_flight_rows, for FleetAnalytics
+        storage = self._system._storage
+        if storage.persistent:
+            return [row for rows in storage.iter_flight_rows() for row in rows]
+        return [(flight.get_flight_number(), flight.get_flight_date(), flight.get_destination(),
+                 flight.get_departure_time(), flight.get_arrival_time(), flight.get_gate_number(),
+                 flight.get_aircraft_type()) for flight in list(self._system.flights)]
+
+    def reservation_rows(self):
+        storage = self._system._storage
+        if storage.persistent:
+            return [row for rows in storage.iter_reservation_rows() for row in rows]
+        rows = []
+        for reservation in list(self._system.reservations):
+            payment = reservation._payment
+            rows.append((reservation._reservation_id, reservation._flight.get_flight_number(),
+                         reservation._seat_number, reservation.status,
+                         payment.get_amount() if payment else 0.0,
+                         payment.get_payment() if payment else "",
+                         payment.get_status() if payment else ""))
+        return rows
+
+
+def _serve_shard(index, db_path, connection, revisions, threads, worker_id, initializer, initargs):
+    # Each shard of an engine issues IDs as a different worker, which a shard with a
+    # database also claims in it
+    ids.configure(worker_id)
+    if initializer is not None:
+        initializer(*initargs)
+    storage = SQLiteStorage(shard_path(db_path, index)) if db_path else StorageBackend()
+    airline_system = AirlineSystem(storage, clock=_PublishedClock(revisions, index))
+    channel = _Channel(connection)
+    airline_system.add_listener(_EventForwarder(channel))
+    shard = _Shard(airline_system, channel)
+    # Bookings wait on payments and storage, so each shard runs several at once
+    executor = concurrent.futures.ThreadPoolExecutor(threads, thread_name_prefix=f"shard{index}")
+    try:
+        while True:
+            try:
+                message = pickle.loads(connection.recv_bytes())
+            except EOFError:
+                break
+            if message is None:
+                break
+            if message[1] in shard.BLOCKING:
+                executor.submit(shard.handle, *message)
+            else:
+                shard.handle(*message)
+    finally:
+        executor.shutdown()
+        airline_system.close()
+        connection.close()
+
+
+class _ShardedStorage:
+    # The slice of StorageBackend that FleetAnalytics.from_system reads, gathered
+    # from every shard
+    persistent = True
+
+    def __init__(self, engine):
+        self._engine = engine
+
+    def iter_flight_rows(self, batch_size=50000):
+        return iter(self._engine._scatter("flight_rows"))
+
+    def iter_reservation_rows(self, batch_size=50000):
+        return iter(self._engine._scatter("reservation_rows"))
+
+
+class ShardedAirlineSystem:
+    # Drop-in AirlineSystem whose flights live in worker processes, one AirlineSystem
+    # per shard, chosen by crc32 of the flight number. Commands for one flight go to
+    # its shard; searches are scattered to every shard and the results merged.
+    # Flights and reservations handed back are snapshots: change them through the
+    # system's methods, never directly.
+    def __init__(self, shards=None, db_path=None, threads=16, initializer=None, initargs=()):
+        # spawn: forking a process that already runs threads is unsafe
+        context = multiprocessing.get_context("spawn")
+        self.shards = shards or os.cpu_count() or 1
+        self._revisions = context.RawArray("q", self.shards)
+        # Shards issue IDs as the workers after this process's own
+        self._worker_id = ids.worker_id()
+        self._channels = []
+        self._processes = []
+        for index in range(self.shards):
+            router_end, shard_end = context.Pipe()
+            process = context.Process(target=_serve_shard, name=f"airline-shard-{index}", daemon=True,
+                                      args=(index, db_path, shard_end, self._revisions, threads,
+                                            (self._worker_id + 1 + index) & ids.MAX_WORKER_ID,
+                                            initializer, initargs))
+            process.start()
+            shard_end.close()
+            self._channels.append(_Channel(router_end))
+            self._processes.append(process)
+        self._listeners = []
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+        self._request_ids = itertools.count()
+        self._storage = _ShardedStorage(self)
+        self._receiver = threading.Thread(target=self._receive, name="airline-shards", daemon=True)
+        self._receiver.start()
+        # Worker ID -> shard, so an ID names the shard holding its booking
+        self._shard_workers = {worker_id: index for index, worker_id in enumerate(self._scatter("worker_id"))}
+
+    # Transport
+
+    def _submit(self, index, command, *args):
+        future = concurrent.futures.Future()
+        with self._pending_lock:
+            request_id = next(self._request_ids)
+            self._pending[request_id] = future
+        self._channels[index].send((request_id, command, args))
+        return future
+
+    def _call(self, flight_number, command, *args):
+        return self._submit(shard_of(flight_number, self.shards), command, *args).result()
+
+    def _scatter(self, command, *args):
+        futures = [self._submit(index, command, *args) for index in range(self.shards)]
+        return [future.result() for future in futures]
+
+    def _receive(self):
+        # Replies from every shard arrive on this one thread
+        connections = [channel.connection for channel in self._channels]
+        while connections:
+            for connection in multiprocessing.connection.wait(connections):
+                try:
+                    request_id, ok, result = pickle.loads(connection.recv_bytes())
+                except (EOFError, OSError):
+                    # A shard that died, e.g. on startup, may reset the pipe instead of closing it
+                    connections.remove(connection)
+                    self._fail_pending(RuntimeError("A booking shard exited"))
+                    continue
+                if request_id is None:
+                    # A forwarded listener callback
+                    for listener in self._listeners:
+                        getattr(listener, ok)(result)
+                    continue
+                with self._pending_lock:
+                    future = self._pending.pop(request_id, None)
+                if future is None:
+                    continue
+                if ok:
+                    future.set_result(result)
+                else:
+                    future.set_exception(result)
+
+    def _fail_pending(self, error):
+        with self._pending_lock:
+            pending, self._pending = self._pending, {}
+        for future in pending.values():
+            future.set_exception(error)
+
+    def close(self):
+        for channel in self._channels:
+            channel.send(None)
+        for process in self._processes:
+            process.join(10)
+        self._receiver.join()
+        for channel in self._channels:
+            channel.connection.close()
+
+    # AirlineSystem interface
+
+    def add_listener(self, listener):
+        self._listeners.append(listener)
+
+    def get_revision(self):
+        # Each shard's clock only moves forward, so the sum does too and changes
+        # whenever anything changes on any shard
+        return sum(self._revisions)
+
+    def index_sizes(self):
+        totals = {}
+        for sizes in self._scatter("index_sizes"):
+            for name, size in sizes.items():
+                totals[name] = totals.get(name, 0) + size
+        return totals
+
+    @timed(OPERATION_SECONDS, "add_flight")
+    def add_flight(self, flight):
+        return self._call(flight.get_flight_number(), "add_flight", flight)
+
+    @timed(OPERATION_SECONDS, "add_flights")
+    def add_flights(self, rows):
+        by_shard = {}
+        for row in rows:
+            by_shard.setdefault(shard_of(row[0], self.shards), []).append(row)
+        futures = [self._submit(index, "add_flights", shard_rows) for index, shard_rows in by_shard.items()]
+        return [number for future in futures for number in future.result()]
+
+    def has_flights(self):
+        return any(self._scatter("has_flights"))
+
+    @timed(OPERATION_SECONDS, "get_flight")
+    def get_flight(self, flight_number):
+        return self._call(flight_number, "get_flight", flight_number)
+
+    @timed(OPERATION_SECONDS, "find_flights")
+    def find_flights(self, destination=None, date=None, prefix=False):
+        return [flight for flights in self._scatter("find_flights", destination, date, prefix)
+                for flight in flights]
+
+    @timed(OPERATION_SECONDS, "find_flights_page")
+    def find_flights_page(self, destination=None, date=None, sort="departure", descending=False,
+                          offset=0, limit=20, prefix=False):
+        # Every shard returns its own first offset + limit matches in order; the page
+        # is the same slice of their merge
+        if sort not in FLIGHT_SORTS:
+            raise ValueError(f"sort must be one of {', '.join(FLIGHT_SORTS)}")
+        pages = self._scatter("find_flights_page", destination, date, sort, descending, offset + limit,
+                              prefix)
+        merged = sort_flights([flight for _, flights in pages for flight in flights], sort, descending)
+        return sum(total for total, _ in pages), merged[offset:offset + limit]
+
+    @timed(OPERATION_SECONDS, "find_flights_between")
+    def find_flights_between(self, destination=None, date_from=None, date_to=None):
+        return sort_flights([flight for flights in self._scatter("find_flights_between", destination,
+                                                                 date_from, date_to)
+                             for flight in flights])
+
+    def suggest_destinations(self, text, limit=8):
+        # A shard with no prefix match answers with near spellings, so those are only
+        # used when no shard found a prefix match
+        names = {}
+        for found in self._scatter("suggest_destinations", text, limit):
+            for name in found:
+                names.setdefault(name.lower(), name)
+        key = text.strip().lower()
+        keys = sorted(name for name in names if name.startswith(key))[:limit]
+        if not keys:
+            keys = difflib.get_close_matches(key, list(names), limit, 0)
+        return [names[name] for name in keys]
+
+    @timed(OPERATION_SECONDS, "search_availability")
+    def search_availability(self, destination=None, date_from=None, date_to=None,
+                            cabin=None, min_free=1):
+        return availability_frame(self.availability_records(destination, date_from, date_to,
+                                                            cabin, min_free))
+
+    def availability_records(self, destination=None, date_from=None, date_to=None,
+                             cabin=None, min_free=1):
+        return [record for records in self._scatter("availability_records", destination, date_from,
+                                                     date_to, cabin, min_free)
+                for record in records]
+
+    @timed(OPERATION_SECONDS, "hold_seat")
+    def hold_seat(self, flight, seat_number, ttl=SEAT_HOLD_TTL):
+        flight_number = flight.get_flight_number()
+        return self._call(flight_number, "hold_seat", flight_number, seat_number, ttl)
+
+    def release_hold(self, hold):
+        flight_number = hold.flight.get_flight_number()
+        return self._call(flight_number, "release_hold", flight_number, (hold.seat_number, hold.expires_at))
+
+    def is_hold_active(self, hold):
+        if hold.is_expired():
+            return False
+        flight_number = hold.flight.get_flight_number()
+        return self._call(flight_number, "is_hold_active", flight_number, (hold.seat_number, hold.expires_at))
+
+    @timed(OPERATION_SECONDS, "create_reservation")
+    def create_reservation(self, passenger, flight, seat_number, payment_method, hold=None):
+        flight_number = flight.get_flight_number()
+        hold_key = None if hold is None else (hold.seat_number, hold.expires_at)
+        return self._call(flight_number, "create_reservation", passenger, flight_number, seat_number,
+                          payment_method, hold_key)
+
+    @timed(OPERATION_SECONDS, "create_group_reservation")
+    def create_group_reservation(self, passengers, flight, seat_class, payment_method):
+        flight_number = flight.get_flight_number()
+        return self._call(flight_number, "create_group_reservation", passengers, flight_number,
+                          seat_class, payment_method)
+
+    def _issuing_shard(self, reservation_id):
+        # The shard that issued a reservation ID holds the booking. IDs issued by a worker
+        # no shard holds now, e.g. before a restart, are scattered.
+        if len(reservation_id) != ids.ID_DIGITS or not reservation_id.isdigit():
+            return None
+        return self._shard_workers.get(ids.worker_of(int(reservation_id)))
+
+    def _find_reservation(self, command, reservation_id):
+        index = self._issuing_shard(reservation_id)
+        if index is not None:
+            reservation = self._submit(index, command, reservation_id).result()
+            if reservation is not None:
+                return reservation
+        return next((reservation for reservation in self._scatter(command, reservation_id)
+                     if reservation is not None), None)
+
+    @timed(OPERATION_SECONDS, "cancel_reservation")
+    def cancel_reservation(self, reservation_id):
+        return self._find_reservation("cancel_reservation", reservation_id)
+
+    @timed(OPERATION_SECONDS, "get_reservation")
+    def get_reservation(self, reservation_id):
+        return self._find_reservation("get_reservation", reservation_id)
+
+    @timed(OPERATION_SECONDS, "find_reservations_between")
+    def find_reservations_between(self, start=None, end=None, include_cancelled=False, limit=None,
+                                  before=None):
+        # Each shard sends its newest limit; the newest limit of their merge is the answer
+        merged = sorted((reservation for reservations in self._scatter(
+                            "find_reservations_between", start, end, include_cancelled, limit, before)
+                         for reservation in reservations),
+                        key=lambda reservation: reservation._reservation_id, reverse=True)
+        return merged[:limit]
+
+    @timed(OPERATION_SECONDS, "find_bookings")
+    def find_bookings(self, passport_number, include_cancelled=False):
+        return [reservation
+                for reservations in self._scatter("find_bookings", passport_number, include_cancelled)
+                for reservation in reservations]
+
+    @timed(OPERATION_SECONDS, "get_flight_reservations")
+    def get_flight_reservations(self, flight_number, include_cancelled=False):
+        return self._call(flight_number, "get_flight_reservations", flight_number, include_cancelled)
+
+    @timed(OPERATION_SECONDS, "get_manifest")
+    def get_manifest(self, flight_number):
+        return self._call(flight_number, "get_manifest", flight_number)
+
+    @timed(OPERATION_SECONDS, "join_waitlist")
+    def join_waitlist(self, passenger, flight, seat_class, payment_method, fare_class="Standard",
+                      loyalty_tier="Member"):
+        flight_number = flight.get_flight_number()
+        return self._call(flight_number, "join_waitlist", passenger, flight_number, seat_class,
+                          payment_method, fare_class, loyalty_tier)
+
+    def leave_waitlist(self, flight_number, entry_id):
+        return self._call(flight_number, "leave_waitlist", flight_number, entry_id)
+
+    def get_waitlist(self, flight_number, seat_class=None):
+        return self._call(flight_number, "get_waitlist", flight_number, seat_class)
+
+    @timed(OPERATION_SECONDS, "find_waitlist_entries")
+    def find_waitlist_entries(self, passport_number):
+        return [found for entries in self._scatter("find_waitlist_entries", passport_number)
+                for found in entries]
+
+    @timed(OPERATION_SECONDS, "promote_waitlist")
+    def promote_waitlist(self, flight, seat_class=None):
+        flight_number = flight.get_flight_number()
+        return self._call(flight_number, "promote_waitlist", flight_number, seat_class)
@@ -0,0 +1,551 @@
+import queue
+import sqlite3
+import threading
+import time
+
+from .ids import ID_DIGITS, MAX_WORKER_ID
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS flights (
+    flight_number TEXT PRIMARY KEY,
+    flight_date TEXT NOT NULL,
+    destination TEXT NOT NULL,
+    destination_key TEXT NOT NULL,
+    departure_time TEXT NOT NULL,
+    arrival_time TEXT NOT NULL,
+    gate_number TEXT NOT NULL,
+    aircraft_type TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS flights_route ON flights (destination_key, flight_date);
+CREATE INDEX IF NOT EXISTS flights_date ON flights (flight_date);
+CREATE INDEX IF NOT EXISTS flights_departure ON flights (flight_date, departure_time);
+CREATE TABLE IF NOT EXISTS reservations (
+    reservation_id TEXT PRIMARY KEY,
+    flight_number TEXT NOT NULL,
+    seat_number TEXT NOT NULL,
+    status TEXT NOT NULL,
+    reservation_date TEXT NOT NULL,
+    passenger_id TEXT NOT NULL,
+    passport_number TEXT NOT NULL,
+    first_name TEXT NOT NULL,
+    last_name TEXT NOT NULL,
+    age INTEGER,
+    email TEXT,
+    phone TEXT,
+    payment_id TEXT,
+    amount REAL,
+    payment_method TEXT,
+    payment_status TEXT,
+    payment_date TEXT
+);
+CREATE INDEX IF NOT EXISTS reservations_flight ON reservations (flight_number, status);
+CREATE INDEX IF NOT EXISTS reservations_passport ON reservations (passport_number, status);
+CREATE TABLE IF NOT EXISTS id_workers (
+    worker_id INTEGER PRIMARY KEY,
+    owner TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+"""
+
+FLIGHT_COLUMNS = ("flight_number", "flight_date", "destination", "departure_time",
+                  "arrival_time", "gate_number", "aircraft_type")
+
+# One confirmed passenger of a flight; the reservation columns are stored, the rest
+# come from the flight and its layout
+MANIFEST_COLUMNS = ("flight_number", "flight_date", "seat_number", "seat_class", "reservation_id",
+                    "first_name", "last_name", "passport_number", "age", "email", "phone")
+_MANIFEST_STORED = MANIFEST_COLUMNS[4:]
+
+# Seconds an ID worker claim lasts unless renewed; a crashed process frees its worker
+# this long after its last renewal
+WORKER_LEASE = 60.0
+
+# SQLite caps the number of bound parameters per statement
+_IN_CHUNK = 500
+
+# Sort keys for paged flight searches. Ties fall back to departure and then flight
+# number, so a page boundary never splits or repeats a flight.
+FLIGHT_SORTS = {
+    "departure": ("flight_date", "departure_time"),
+    "destination": ("destination_key",),
+    "free_seats": ("free_seats",),
+}
+_FLIGHT_TIEBREAK = ("flight_date", "departure_time", "flight_number")
+
+# Sorts after any character, so key < prefix + _KEY_END holds for every key with the prefix
+_KEY_END = "\U0010ffff"
+
+
+class StorageConflict(Exception):
+    # The write contradicts committed data, e.g. another process already confirmed the seat
+    pass
+
+
+class StorageBackend:
+    # Persistence interface used by AirlineSystem; the base class stores nothing
+    persistent = False
+
+    def save_flights(self, rows):
+        pass
+
+    def flight_exists(self, flight_number):
+        return False
+
+    def existing_flight_numbers(self, flight_numbers):
+        return set()
+
+    def count_flights(self):
+        return 0
+
+    def load_flights(self, flight_numbers):
+        return []
+
+    def find_flight_numbers(self, destination=None, date=None, date_to=None, prefix=False):
+        return []
+
+    def find_flight_page(self, destination=None, date=None, sort="departure", descending=False,
+                         offset=0, limit=20, capacities=None, prefix=False):
+        return 0, []
+
+    def destination_names(self):
+        return []
+
+    def save_reservation(self, reservation):
+        pass
+
+    def save_cancellation(self, reservation):
+        pass
+
+    def load_reservations(self, reservation_ids):
+        return []
+
+    def find_reservation_ids(self, passport_number=None, flight_number=None, include_cancelled=False,
+                             first_id=None, last_id=None, limit=None):
+        return []
+
+    def load_manifest(self, flight_number):
+        return {}
+
+    def claim_worker_id(self, worker_id, owner, on_lost):
+        # Nothing else issues IDs into storage that keeps nothing
+        return worker_id
+
+    def iter_flight_rows(self, batch_size=50000):
+        return iter(())
+
+    def iter_reservation_rows(self, batch_size=50000):
+        return iter(())
+
+    def close(self):
+        pass
+
+
+class _WriteRequest:
+    def __init__(self, statements):
+        self.statements = statements
+        self.done = threading.Event()
+        self.error = None
+
+
+class SQLiteStorage(StorageBackend):
+    persistent = True
+
+    def __init__(self, path, batch_size=512, batch_wait=0.002, synchronous="FULL"):
+        self._path = path
+        self._batch_size = batch_size
+        self._batch_wait = batch_wait
+        self._synchronous = synchronous
+        self._readers = threading.local()
+        self._queue = queue.Queue()
+        self._closed = False
+        # (worker ID, owner, on_lost) of every ID worker claimed here, renewed until close
+        self._leases = []
+        self._renewer = None
+        self._stop_renewing = threading.Event()
+
+        connection = self._connect()
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.executescript(SCHEMA)
+        self._migrate(connection)
+        connection.close()
+
+        self._writer = threading.Thread(target=self._write_loop, name="sqlite-writer", daemon=True)
+        self._writer.start()
+
+    def _migrate(self, connection):
+        # Databases created before aircraft layouts existed only held narrow-body flights
+        columns = {row["name"] for row in connection.execute("PRAGMA table_info(flights)")}
+        if "aircraft_type" not in columns:
+            connection.execute(
+                "ALTER TABLE flights ADD COLUMN aircraft_type TEXT NOT NULL DEFAULT 'A321'")
+        # Several processes (UI, API) may book against one database; each keeps its own
+        # seat inventory, so the database is what stops two of them selling one seat
+        try:
+            connection.execute(
+                "CREATE UNIQUE INDEX IF NOT EXISTS reservations_seat "
+                "ON reservations (flight_number, seat_number) WHERE status = 'Confirmed'")
+        except sqlite3.IntegrityError:
+            pass
+
+    def _connect(self):
+        connection = sqlite3.connect(self._path, isolation_level=None, check_same_thread=False)
+        connection.row_factory = sqlite3.Row
+        connection.execute(f"PRAGMA synchronous={self._synchronous}")
+        return connection
+
+    def _reader(self):
+        # SQLite connections are per thread; WAL lets readers run beside the writer
+        connection = getattr(self._readers, "connection", None)
+        if connection is None:
+            connection = self._connect()
+            self._readers.connection = connection
+        return connection
+
+    # Group commit: one writer thread drains every queued request into a single
+    # transaction, so concurrent bookings share one fsync instead of paying one each.
+    def _write_loop(self):
+        connection = self._connect()
+        while True:
+            request = self._queue.get()
+            if request is None:
+                break
+            batch = [request]
+            stop = False
+            while len(batch) < self._batch_size:
+                try:
+                    request = self._queue.get(timeout=self._batch_wait)
+                except queue.Empty:
+                    break
+                if request is None:
+                    stop = True
+                    break
+                batch.append(request)
+            self._commit_batch(connection, batch)
+            if stop:
+                break
+        connection.close()
+
+    def _commit_batch(self, connection, batch):
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+            for request in batch:
+                self._execute(connection, request)
+            connection.execute("COMMIT")
+        except Exception:
+            if connection.in_transaction:
+                connection.execute("ROLLBACK")
+            # Replay one by one so a single bad request does not fail its neighbours
+            for request in batch:
+                try:
+                    connection.execute("BEGIN IMMEDIATE")
+                    self._execute(connection, request)
+                    connection.execute("COMMIT")
+                except Exception as e:
+                    if connection.in_transaction:
+                        connection.execute("ROLLBACK")
+                    request.error = e
+        for request in batch:
+            request.done.set()
+
+    def _execute(self, connection, request):
+        for sql, params in request.statements:
+            if isinstance(params, list):
+                connection.executemany(sql, params)
+            else:
+                connection.execute(sql, params)
+
+    def _submit(self, statements, wait=True):
+        if self._closed:
+            raise sqlite3.ProgrammingError("Storage is closed")
+        request = _WriteRequest(statements)
+        self._queue.put(request)
+        if wait:
+            request.done.wait()
+            if request.error is not None:
+                raise request.error
+        return request
+
+    def flush(self):
+        self._submit([])
+
+    def close(self):
+        if not self._closed:
+            if self._renewer is not None:
+                self._stop_renewing.set()
+                self._renewer.join()
+            if self._leases:
+                self._submit([("DELETE FROM id_workers WHERE worker_id = ? AND owner = ?",
+                               [(worker_id, owner) for worker_id, owner, _ in self._leases])])
+            self._closed = True
+            self._queue.put(None)
+            self._writer.join()
+
+    def claim_worker_id(self, worker_id, owner, on_lost):
+        # Leases an ID worker to owner, the lowest free one if worker_id is None, and
+        # returns it. Raises StorageConflict if another owner's lease is live. The lease
+        # is renewed until close; on_lost(worker_id) is called if it lapses and is taken.
+        connection = self._connect()
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+            now = time.time()
+            connection.execute("DELETE FROM id_workers WHERE expires_at < ?", (now,))
+            held = dict(connection.execute("SELECT worker_id, owner FROM id_workers").fetchall())
+            if worker_id is None:
+                worker_id = next((candidate for candidate in range(MAX_WORKER_ID + 1)
+                                  if held.get(candidate, owner) == owner), None)
+                if worker_id is None:
+                    raise StorageConflict("Every ID worker is claimed")
+            elif held.get(worker_id, owner) != owner:
+                raise StorageConflict(f"ID worker {worker_id} is claimed by {held[worker_id]}")
+            connection.execute("INSERT OR REPLACE INTO id_workers VALUES (?, ?, ?)",
+                               (worker_id, owner, now + WORKER_LEASE))
+            connection.execute("COMMIT")
+        except Exception:
+            if connection.in_transaction:
+                connection.execute("ROLLBACK")
+            raise
+        finally:
+            connection.close()
+        self._leases.append((worker_id, owner, on_lost))
+        if self._renewer is None:
+            self._renewer = threading.Thread(target=self._renew_leases, name="sqlite-leases", daemon=True)
+            self._renewer.start()
+        return worker_id
+
+    def _renew_leases(self):
+        while not self._stop_renewing.wait(WORKER_LEASE / 3):
+            leases = list(self._leases)
+            self._submit([(
+                "INSERT INTO id_workers VALUES (?, ?, ?) ON CONFLICT (worker_id) DO UPDATE "
+                "SET expires_at = excluded.expires_at WHERE owner = excluded.owner",
+                [(worker_id, owner, time.time() + WORKER_LEASE) for worker_id, owner, _ in leases])])
+            for worker_id, owner, on_lost in leases:
+                row = self._reader().execute(
+                    "SELECT owner FROM id_workers WHERE worker_id = ?", (worker_id,)).fetchone()
+                if row is None or row[0] != owner:
+                    self._leases.remove((worker_id, owner, on_lost))
+                    on_lost(worker_id)
+
+    def save_flights(self, rows):
+        # rows follow FLIGHT_COLUMNS order. All or nothing: a flight number another
+        # process added first fails the whole batch with StorageConflict.
+        try:
+            self._submit([(
+                "INSERT INTO flights (flight_number, flight_date, destination, destination_key, "
+                "departure_time, arrival_time, gate_number, aircraft_type) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [(number, date, destination, destination.lower(), departure, arrival, gate, aircraft)
+                 for number, date, destination, departure, arrival, gate, aircraft in rows],
+            )])
+        except sqlite3.IntegrityError as e:
+            raise StorageConflict(str(e)) from e
+
+    def flight_exists(self, flight_number):
+        row = self._reader().execute(
+            "SELECT 1 FROM flights WHERE flight_number = ?", (flight_number,)).fetchone()
+        return row is not None
+
+    def existing_flight_numbers(self, flight_numbers):
+        connection = self._reader()
+        existing = set()
+        for start in range(0, len(flight_numbers), _IN_CHUNK):
+            chunk = flight_numbers[start:start + _IN_CHUNK]
+            marks = ", ".join("?" * len(chunk))
+            existing.update(row[0] for row in connection.execute(
+                f"SELECT flight_number FROM flights WHERE flight_number IN ({marks})", chunk))
+        return existing
+
+    def count_flights(self):
+        return self._reader().execute("SELECT COUNT(*) FROM flights").fetchone()[0]
+
+    def load_flights(self, flight_numbers):
+        # Returns (flight row, occupied seat numbers) pairs
+        connection = self._reader()
+        loaded = []
+        for start in range(0, len(flight_numbers), _IN_CHUNK):
+            chunk = flight_numbers[start:start + _IN_CHUNK]
+            marks = ", ".join("?" * len(chunk))
+            rows = connection.execute(
+                f"SELECT {', '.join(FLIGHT_COLUMNS)} FROM flights WHERE flight_number IN ({marks})",
+                chunk).fetchall()
+            occupied = {}
+            for seat in connection.execute(
+                    f"SELECT flight_number, seat_number FROM reservations "
+                    f"WHERE flight_number IN ({marks}) AND status = 'Confirmed'", chunk):
+                occupied.setdefault(seat["flight_number"], []).append(seat["seat_number"])
+            for row in rows:
+                loaded.append((dict(row), occupied.get(row["flight_number"], [])))
+        return loaded
+
+    def _flight_filter(self, destination, date, date_to, prefix=False):
+        # With date_to the dates are an inclusive range, otherwise date must match exactly.
+        # A prefix match is a key range, so it still uses the flights_route index.
+        clauses = []
+        params = []
+        if destination and prefix:
+            clauses.append("destination_key >= ? AND destination_key < ?")
+            params.extend((destination.lower(), destination.lower() + _KEY_END))
+        elif destination:
+            clauses.append("destination_key = ?")
+            params.append(destination.lower())
+        if date and date_to:
+            clauses.append("flight_date BETWEEN ? AND ?")
+            params.extend((date, date_to))
+        elif date:
+            clauses.append("flight_date = ?")
+            params.append(date)
+        return (f"WHERE {' AND '.join(clauses)}" if clauses else ""), params
+
+    def find_flight_numbers(self, destination=None, date=None, date_to=None, prefix=False):
+        where, params = self._flight_filter(destination, date, date_to, prefix)
+        rows = self._reader().execute(
+            f"SELECT flight_number FROM flights {where} ORDER BY rowid", params)
+        return [row[0] for row in rows]
+
+    def find_flight_page(self, destination=None, date=None, sort="departure", descending=False,
+                         offset=0, limit=20, capacities=None, prefix=False):
+        # Returns (number of matches, flight numbers on the page). Sorting by free seats
+        # needs each aircraft type's seat count, passed in as capacities.
+        where, params = self._flight_filter(destination, date, None, prefix)
+        connection = self._reader()
+        total = connection.execute(f"SELECT COUNT(*) FROM flights {where}", params).fetchone()[0]
+        columns = "flight_number, flight_date, departure_time, destination_key"
+        page_params = []
+        if sort == "free_seats":
+            capacity = " ".join("WHEN ? THEN ?" for _ in capacities)
+            page_params.extend(value for item in capacities.items() for value in item)
+            columns += (f", CASE aircraft_type {capacity} ELSE 0 END - "
+                        "(SELECT COUNT(*) FROM reservations WHERE reservations.flight_number = "
+                        "flights.flight_number AND status = 'Confirmed') AS free_seats")
+        order = [f"{column} DESC" if descending else column for column in FLIGHT_SORTS[sort]]
+        order.extend(column for column in _FLIGHT_TIEBREAK if column not in FLIGHT_SORTS[sort])
+        rows = connection.execute(
+            f"SELECT {columns} FROM flights {where} ORDER BY {', '.join(order)} LIMIT ? OFFSET ?",
+            page_params + params + [limit, offset])
+        return total, [row[0] for row in rows]
+
+    def destination_names(self):
+        # One display spelling per destination key
+        rows = self._reader().execute(
+            "SELECT MIN(destination) FROM flights GROUP BY destination_key ORDER BY destination_key")
+        return [row[0] for row in rows]
+
+    def save_reservation(self, reservation):
+        try:
+            self._insert_reservation(reservation)
+        except sqlite3.IntegrityError as e:
+            raise StorageConflict(str(e)) from e
+
+    def _insert_reservation(self, reservation):
+        passenger = reservation._passenger
+        payment = reservation._payment
+        self._submit([(
+            "INSERT INTO reservations (reservation_id, flight_number, seat_number, status, "
+            "reservation_date, passenger_id, passport_number, first_name, last_name, age, email, "
+            "phone, payment_id, amount, payment_method, payment_status, payment_date) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                reservation._reservation_id,
+                reservation._flight.get_flight_number(),
+                reservation._seat_number,
+                reservation.status,
+                reservation.get_reservation_date().isoformat(),
+                str(passenger._passenger_id),
+                passenger._passport_number,
+                passenger._first_name,
+                passenger._last_name,
+                passenger._age,
+                passenger._email,
+                passenger._phone,
+                payment._payment_id if payment else None,
+                payment.get_amount() if payment else None,
+                payment.get_payment() if payment else None,
+                payment.get_status() if payment else None,
+                payment.get_timestamp().isoformat() if payment else None,
+            ),
+        )])
+
+    def save_cancellation(self, reservation):
+        payment = reservation._payment
+        self._submit([(
+            "UPDATE reservations SET status = ?, payment_status = ? WHERE reservation_id = ?",
+            (
+                reservation.status,
+                payment.get_status() if payment else None,
+                reservation._reservation_id,
+            ),
+        )])
+
+    def load_reservations(self, reservation_ids):
+        connection = self._reader()
+        rows = []
+        for start in range(0, len(reservation_ids), _IN_CHUNK):
+            chunk = reservation_ids[start:start + _IN_CHUNK]
+            marks = ", ".join("?" * len(chunk))
+            rows.extend(dict(row) for row in connection.execute(
+                f"SELECT * FROM reservations WHERE reservation_id IN ({marks})", chunk))
+        return rows
+
+    def _iter_batches(self, sql, batch_size):
+        # A dedicated connection keeps the long scan off the thread's shared reader
+        connection = self._connect()
+        try:
+            cursor = connection.execute(sql)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield [tuple(row) for row in rows]
+        finally:
+            connection.close()
+
+    def iter_flight_rows(self, batch_size=50000):
+        return self._iter_batches(
+            f"SELECT {', '.join(FLIGHT_COLUMNS)} FROM flights ORDER BY rowid", batch_size)
+
+    def iter_reservation_rows(self, batch_size=50000):
+        return self._iter_batches(
+            "SELECT reservation_id, flight_number, seat_number, status, amount, payment_method, "
+            "payment_status FROM reservations ORDER BY rowid", batch_size)
+
+    def load_manifest(self, flight_number):
+        # Seat number -> stored MANIFEST_COLUMNS values of its confirmed booking, read
+        # straight from the rows so no reservation objects are built or cached
+        rows = self._reader().execute(
+            f"SELECT seat_number, {', '.join(_MANIFEST_STORED)} FROM reservations "
+            "WHERE flight_number = ? AND status = 'Confirmed'", (flight_number,))
+        return {row[0]: tuple(row[1:]) for row in rows}
+
+    def find_reservation_ids(self, passport_number=None, flight_number=None, include_cancelled=False,
+                             first_id=None, last_id=None, limit=None):
+        # An ID range is read newest first off the primary key, stopping after limit IDs;
+        # reservation IDs are time-ordered, so it doubles as a creation-time range.
+        # Bookings from before time-ordered IDs have shorter random ones, which would
+        # sort into any range.
+        clauses = []
+        params = []
+        if first_id is not None or last_id is not None:
+            clauses.append("length(reservation_id) = ?")
+            params.append(ID_DIGITS)
+        if first_id is not None:
+            clauses.append("reservation_id >= ?")
+            params.append(first_id)
+        if last_id is not None:
+            clauses.append("reservation_id <= ?")
+            params.append(last_id)
+        if passport_number is not None:
+            clauses.append("passport_number = ?")
+            params.append(passport_number)
+        if flight_number is not None:
+            clauses.append("flight_number = ?")
+            params.append(flight_number)
+        if not include_cancelled:
+            clauses.append("status = 'Confirmed'")
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        order = "reservation_id DESC" if first_id is not None or last_id is not None else "rowid"
+        if limit is not None:
+            order += " LIMIT ?"
+            params.append(limit)
+        rows = self._reader().execute(
+            f"SELECT reservation_id FROM reservations {where} ORDER BY {order}", params)
+        return [row[0] for row in rows]
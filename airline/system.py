@@ -0,0 +1,562 @@
+import threading
+
+from . import ids, timestamps
+from .aircraft import AIRCRAFT_LAYOUTS
+from .flight import Flight, HoldScheduler
+from .metrics import OPERATION_SECONDS, timed
+from .payment import Payment
+from .reservation import Passenger, Reservation, ReservationStore
+from .search_index import SortedKeyIndex
+from .seats import RevisionClock
+from .storage import FLIGHT_COLUMNS, FLIGHT_SORTS, StorageBackend, StorageConflict
+from .waitlist import Waitlist, WaitlistEntry
+
+
+def _flight_row(flight):
+    return (
+        flight.get_flight_number(),
+        flight.get_flight_date(),
+        flight.get_destination(),
+        flight.get_departure_time(),
+        flight.get_arrival_time(),
+        flight.get_gate_number(),
+        flight.get_aircraft_type(),
+    )
+
+def sort_flights(flights, sort="departure", descending=False):
+    # In-place sort matching SQLiteStorage.find_flight_page: departure order first, then
+    # a stable sort on the primary key so ties keep it
+    flights.sort(key=lambda flight: (flight.get_flight_date(), flight.get_departure_time(),
+                                     flight.get_flight_number()))
+    if sort == "destination":
+        flights.sort(key=lambda flight: flight.get_destination().lower(), reverse=descending)
+    elif sort == "free_seats":
+        flights.sort(key=lambda flight: flight.count_available_seats(), reverse=descending)
+    elif descending:
+        flights.sort(key=lambda flight: (flight.get_flight_date(), flight.get_departure_time()),
+                     reverse=True)
+    return flights
+
+def availability_frame(records):
+    import pandas as pd
+
+    results = pd.DataFrame.from_records(records, columns=AVAILABILITY_COLUMNS)
+    return results.sort_values(["Date", "Departure", "Flight"], ignore_index=True)
+
+# Seconds a seat stays held between choosing it and paying
+SEAT_HOLD_TTL = 600
+
+AVAILABILITY_COLUMNS = ["Flight", "Destination", "Date", "Departure", "Arrival", "Gate",
+                        "Aircraft", "Free Seats", "First", "Business", "Economy"]
+
+class AirlineSystem:
+    def __init__(self, storage=None, clock=None):
+        # Flights and reservations are loaded from storage lazily, on first access
+        self._storage = storage or StorageBackend()
+        # No other process may issue IDs into this storage as this process's worker
+        ids.claim(self._storage)
+        # Objects with flights_added(rows), reservation_created(reservation) and
+        # reservation_cancelled(reservation) callbacks, e.g. FleetAnalytics
+        self._listeners = []
+        self.flights = []
+        self.reservations = ReservationStore(self._storage, self._listeners)
+        # Seats freed by an expired hold go to the cabin's waitlist
+        self.holds = HoldScheduler(self._hold_released)
+        # Shared by every indexed flight; moves on any schedule or seat change
+        self._clock = clock or RevisionClock()
+        # Only index writers take this lock; readers rely on atomic dict lookups
+        self._lock = threading.Lock()
+        # Flight indexes, kept in step with self.flights by add_flight
+        self._flights_by_number = {}
+        self._flights_by_route = {}
+        self._flights_by_destination = SortedKeyIndex()
+        self._flights_by_date = SortedKeyIndex()
+        # Destination key -> display name, for type-ahead. Covers stored flights too,
+        # which a persistent backend lists once on first use.
+        self._destinations = SortedKeyIndex()
+        self._destinations_loaded = False
+        # Flight number -> Waitlist, created on the first join
+        self._waitlists = {}
+    
+    @timed(OPERATION_SECONDS, "add_flight")
+    def add_flight(self, flight):
+        with self._lock:
+            # Check if flight number already exists
+            flight_number = flight.get_flight_number()
+            if flight_number in self._flights_by_number or self._storage.flight_exists(flight_number):
+                return False
+            row = _flight_row(flight)
+            try:
+                self._storage.save_flights([row])
+            except StorageConflict:
+                # Another process added it since the check
+                return False
+            self.flights.append(flight)
+            self._index_flight(flight)
+            self._note_destination(flight.get_destination())
+            self._clock.tick()
+        for listener in self._listeners:
+            listener.flights_added([row])
+        return True
+
+    @timed(OPERATION_SECONDS, "add_flights")
+    def add_flights(self, rows):
+        # Bulk insert of rows in FLIGHT_COLUMNS order; returns the flight numbers
+        # rejected because they already exist
+        with self._lock:
+            flight_numbers = [row[0] for row in rows]
+            taken = {number for number in flight_numbers if number in self._flights_by_number}
+            taken |= self._storage.existing_flight_numbers(flight_numbers)
+            fresh = []
+            rejected = []
+            for row in rows:
+                if row[0] in taken:
+                    rejected.append(row[0])
+                else:
+                    taken.add(row[0])
+                    fresh.append(row)
+            while True:
+                try:
+                    self._storage.save_flights(fresh)
+                    break
+                except StorageConflict:
+                    # Another process added some of these since the check: they are
+                    # rejected too and the rest saved again, so only committed rows
+                    # are indexed and announced
+                    raced = self._storage.existing_flight_numbers([row[0] for row in fresh])
+                    if not raced:
+                        raise
+                    rejected.extend(row[0] for row in fresh if row[0] in raced)
+                    fresh = [row for row in fresh if row[0] not in raced]
+            for row in fresh:
+                self._note_destination(row[2])
+            # A persistent backend loads these lazily, so large imports stay out of memory
+            if not self._storage.persistent:
+                for row in fresh:
+                    flight = Flight(*row)
+                    self.flights.append(flight)
+                    self._index_flight(flight)
+            if fresh:
+                self._clock.tick()
+        for listener in self._listeners:
+            listener.flights_added(fresh)
+        return rejected
+
+    def add_listener(self, listener):
+        self._listeners.append(listener)
+
+    def _index_flight(self, flight):
+        destination = flight.get_destination().lower()
+        date = flight.get_flight_date()
+        self._flights_by_number[flight.get_flight_number()] = flight
+        self._flights_by_route.setdefault((destination, date), []).append(flight)
+        self._flights_by_destination.add(destination, flight)
+        self._flights_by_date.add(date, flight)
+        flight._inventory.attach_clock(self._clock)
+
+    def _note_destination(self, destination):
+        if destination.lower() not in self._destinations:
+            self._destinations.add(destination.lower(), destination)
+
+    def _load_flights(self, flight_numbers):
+        missing = [number for number in flight_numbers if number not in self._flights_by_number]
+        if not missing:
+            return
+        loaded = self._storage.load_flights(missing)
+        with self._lock:
+            for row, occupied_seats in loaded:
+                if row["flight_number"] in self._flights_by_number:
+                    continue
+                flight = Flight(*(row[column] for column in FLIGHT_COLUMNS))
+                for seat_number in occupied_seats:
+                    flight._inventory.occupy(seat_number)
+                self.flights.append(flight)
+                self._index_flight(flight)
+
+    def get_revision(self):
+        return self._clock.value
+
+    def has_flights(self):
+        return bool(self.flights) or self._storage.count_flights() > 0
+
+    @timed(OPERATION_SECONDS, "get_flight")
+    def get_flight(self, flight_number):
+        flight = self._flights_by_number.get(flight_number)
+        if flight is None:
+            self._load_flights([flight_number])
+            flight = self._flights_by_number.get(flight_number)
+        return flight
+    
+    def _load_found_flights(self, flight_numbers):
+        self._load_flights(flight_numbers)
+        return [self._flights_by_number[number] for number in flight_numbers
+                if number in self._flights_by_number]
+
+    @timed(OPERATION_SECONDS, "find_flights")
+    def find_flights(self, destination=None, date=None, prefix=False):
+        # With prefix, destination matches every destination starting with it
+        if self._storage.persistent:
+            return self._load_found_flights(
+                self._storage.find_flight_numbers(destination, date, None, prefix))
+        if destination and prefix:
+            matches = []
+            for key in self._flights_by_destination.keys_with_prefix(destination.lower()):
+                if date:
+                    matches.extend(self._flights_by_route.get((key, date), []))
+                else:
+                    matches.extend(self._flights_by_destination.get(key))
+        elif destination and date:
+            matches = self._flights_by_route.get((destination.lower(), date), [])
+        elif destination:
+            matches = self._flights_by_destination.get(destination.lower(), [])
+        elif date:
+            matches = self._flights_by_date.get(date, [])
+        else:
+            matches = self.flights
+        return list(matches)
+    
+    @timed(OPERATION_SECONDS, "find_flights_page")
+    def find_flights_page(self, destination=None, date=None, sort="departure", descending=False,
+                          offset=0, limit=20, prefix=False):
+        # One page of matches in the requested order: returns (number of matches, flights).
+        # A persistent backend sorts and slices in SQL, so only the page is loaded.
+        if sort not in FLIGHT_SORTS:
+            raise ValueError(f"sort must be one of {', '.join(FLIGHT_SORTS)}")
+        if self._storage.persistent:
+            capacities = {aircraft_type: layout.get_seat_count()
+                          for aircraft_type, layout in AIRCRAFT_LAYOUTS.items()}
+            total, flight_numbers = self._storage.find_flight_page(
+                destination, date, sort, descending, offset, limit, capacities, prefix)
+            return total, self._load_found_flights(flight_numbers)
+        matches = sort_flights(self.find_flights(destination, date, prefix), sort, descending)
+        return len(matches), matches[offset:offset + limit]
+
+    @timed(OPERATION_SECONDS, "find_flights_between")
+    def find_flights_between(self, destination=None, date_from=None, date_to=None):
+        # Inclusive YYYY-MM-DD range; either end may be left open
+        date_from = date_from or "0000-01-01"
+        date_to = date_to or "9999-12-31"
+        if self._storage.persistent:
+            return self._load_found_flights(
+                self._storage.find_flight_numbers(destination, date_from, date_to))
+        flights = []
+        for date in self._flights_by_date.keys_between(date_from, date_to):
+            if destination:
+                flights.extend(self._flights_by_route.get((destination.lower(), date), []))
+            else:
+                flights.extend(self._flights_by_date.get(date))
+        return flights
+
+    def suggest_destinations(self, text, limit=8):
+        # Destinations starting with text; failing that, the closest spellings of it
+        if not self._destinations_loaded:
+            names = self._storage.destination_names()
+            with self._lock:
+                for name in names:
+                    self._note_destination(name)
+                self._destinations_loaded = True
+        key = text.strip().lower()
+        keys = self._destinations.keys_with_prefix(key, limit)
+        if not keys and key:
+            keys = self._destinations.close_keys(key, limit)
+        return [self._destinations.get(key)[0] for key in keys]
+
+    @timed(OPERATION_SECONDS, "search_availability")
+    def search_availability(self, destination=None, date_from=None, date_to=None,
+                            cabin=None, min_free=1):
+        # pandas is only loaded by callers that ask for a table
+        return availability_frame(self.availability_records(destination, date_from, date_to,
+                                                            cabin, min_free))
+
+    def availability_records(self, destination=None, date_from=None, date_to=None,
+                             cabin=None, min_free=1):
+        # Answered from each flight's free-seat counters, no seat objects are built
+        records = []
+        for flight in self.find_flights_between(destination, date_from, date_to):
+            free_seats = flight.count_available_seats(cabin)
+            if free_seats < min_free:
+                continue
+            record = {
+                "Flight": flight.get_flight_number(),
+                "Destination": flight.get_destination(),
+                "Date": flight.get_flight_date(),
+                "Departure": flight.get_departure_time(),
+                "Arrival": flight.get_arrival_time(),
+                "Gate": flight.get_gate_number(),
+                "Aircraft": flight.get_aircraft_type(),
+                "Free Seats": free_seats,
+            }
+            for layout_cabin in flight.get_layout().cabins:
+                record[layout_cabin.seat_class] = flight.count_available_seats(layout_cabin.seat_class)
+            records.append(record)
+        return records
+
+    @timed(OPERATION_SECONDS, "hold_seat")
+    def hold_seat(self, flight, seat_number, ttl=SEAT_HOLD_TTL):
+        hold = flight.hold_seat(seat_number, ttl)
+        if hold is not None:
+            self.holds.schedule(hold)
+        return hold
+
+    def release_hold(self, hold):
+        if not hold.flight.release_hold(hold):
+            return False
+        self._hold_released(hold)
+        return True
+
+    def _hold_released(self, hold):
+        self.promote_waitlist(hold.flight, hold.flight.get_layout().get_seat_class(hold.seat_number))
+
+    def is_hold_active(self, hold):
+        return hold.is_active()
+
+    @timed(OPERATION_SECONDS, "create_reservation")
+    def create_reservation(self, passenger, flight, seat_number, payment_method, hold=None):
+        reservation = Reservation(passenger, flight, seat_number)
+        if reservation.confirm_reservation(payment_method, hold):
+            try:
+                self.reservations.add(reservation)
+            except StorageConflict:
+                reservation._roll_back()
+                return None
+            return reservation
+        return None
+
+    @timed(OPERATION_SECONDS, "create_group_reservation")
+    def create_group_reservation(self, passengers, flight, seat_class, payment_method):
+        # All or nothing: the seats are taken together, every passenger is charged in
+        # parallel, and if any charge fails the others are refunded and the seats freed
+        seat_numbers = flight.assign_seat_block(passengers, seat_class)
+        if seat_numbers is None:
+            return None
+        reservations = [Reservation(passenger, flight, seat_number)
+                        for passenger, seat_number in zip(passengers, seat_numbers)]
+        charges = []
+        for reservation in reservations:
+            reservation._payment = reservation._new_payment(payment_method)
+            charges.append(reservation._payment.process_payment_async())
+        import concurrent.futures
+
+        concurrent.futures.wait(charges)
+        settled = [reservation._payment._settle(charge)
+                   for reservation, charge in zip(reservations, charges)]
+        if all(settled):
+            for reservation in reservations:
+                reservation.status = "Confirmed"
+            for added, reservation in enumerate(reservations):
+                try:
+                    self.reservations.add(reservation)
+                except StorageConflict:
+                    for recorded in reservations[:added]:
+                        recorded.cancel_reservation()
+                    for unrecorded in reservations[added:]:
+                        unrecorded._roll_back()
+                    self.promote_waitlist(flight, seat_class)
+                    return None
+            return reservations
+        # The block is freed in one go and, as on a cancellation, offered to anyone who
+        # joined the cabin's waitlist while the group was being charged
+        waitlist = self._waitlists.get(flight.get_flight_number())
+        with flight._lock:
+            for reservation in reservations:
+                flight.release_seat(reservation._seat_number, reservation._passenger)
+            offers = waitlist.offer_free_seats(flight, seat_class) if waitlist else []
+        for reservation in reservations:
+            reservation._payment.refund_payment()
+        self._promote(flight, waitlist, seat_class, offers)
+        return None
+
+    @timed(OPERATION_SECONDS, "cancel_reservation")
+    def cancel_reservation(self, reservation_id):
+        # Returns the cancelled reservation, or None if it is unknown or not confirmed
+        reservation = self.get_reservation(reservation_id)
+        if reservation is None:
+            return None
+        flight = reservation._flight
+        waitlist = self._waitlists.get(flight.get_flight_number())
+        if not waitlist:
+            return reservation if reservation.cancel_reservation() else None
+        # The flight stays locked from freeing the seat to offering it, so the head of
+        # the cabin's waitlist gets it before any other booking can
+        seat_class = flight.get_layout().get_seat_class(reservation._seat_number)
+        if not reservation._begin_cancellation():
+            return None
+        with flight._lock:
+            reservation._release()
+            offers = waitlist.offer_free_seats(flight, seat_class)
+        reservation._settle_cancellation()
+        self._promote(flight, waitlist, seat_class, offers)
+        return reservation
+
+    @timed(OPERATION_SECONDS, "join_waitlist")
+    def join_waitlist(self, passenger, flight, seat_class, payment_method, fare_class="Standard",
+                      loyalty_tier="Member"):
+        # Only a full cabin has a waitlist: returns None while seats are free to book
+        if flight.count_available_seats(seat_class) > 0:
+            return None
+        flight_number = flight.get_flight_number()
+        entry = WaitlistEntry(passenger, flight_number, seat_class, payment_method, fare_class, loyalty_tier)
+        with self._lock:
+            waitlist = self._waitlists.setdefault(flight_number, Waitlist(flight_number))
+        waitlist.join(entry)
+        # A seat freed since the check above goes to the queue rather than sitting empty
+        self.promote_waitlist(flight, seat_class)
+        return entry
+
+    def leave_waitlist(self, flight_number, entry_id):
+        waitlist = self._waitlists.get(flight_number)
+        return waitlist is not None and waitlist.leave(entry_id)
+
+    def get_waitlist(self, flight_number, seat_class=None):
+        # Entries still waiting, best placed first
+        waitlist = self._waitlists.get(flight_number)
+        return [] if waitlist is None else waitlist.waiting(seat_class)
+
+    @timed(OPERATION_SECONDS, "find_waitlist_entries")
+    def find_waitlist_entries(self, passport_number):
+        # [(entry, place in its cabin's queue or None)] for every waitlist the passenger joined
+        return [(entry, waitlist.position(entry)) for waitlist in list(self._waitlists.values())
+                for entry in waitlist.find_by_passport(passport_number)]
+
+    @timed(OPERATION_SECONDS, "promote_waitlist")
+    def promote_waitlist(self, flight, seat_class=None):
+        # Bulk promotion: every free seat in the cabin, or in all cabins, goes to the
+        # waitlist at once and the promoted passengers are charged in parallel
+        waitlist = self._waitlists.get(flight.get_flight_number())
+        if not waitlist:
+            return []
+        return self._promote(flight, waitlist, seat_class, waitlist.offer_free_seats(flight, seat_class))
+
+    def _promote(self, flight, waitlist, seat_class, offers):
+        promoted = []
+        while offers:
+            confirmed, declined = self._confirm_promotions(flight, waitlist, offers)
+            promoted.extend(confirmed)
+            # Seats whose charge was declined are offered to the next in line
+            offers = waitlist.offer_free_seats(flight, seat_class) if declined else []
+        return promoted
+
+    def _confirm_promotions(self, flight, waitlist, offers):
+        # The seats are already taken for the offered entries; charge them together and
+        # book the ones that paid. Returns (reservations, number of declined charges).
+        import concurrent.futures
+
+        reservations = [Reservation(entry._passenger, flight, seat_number) for entry, seat_number in offers]
+        charges = []
+        for (entry, _), reservation in zip(offers, reservations):
+            reservation._payment = reservation._new_payment(entry._payment_method)
+            charges.append(reservation._payment.process_payment_async())
+        concurrent.futures.wait(charges)
+        promoted = []
+        declined = 0
+        for (entry, seat_number), reservation, charge in zip(offers, reservations, charges):
+            if not reservation._payment._settle(charge):
+                flight.release_seat(seat_number, entry._passenger)
+                waitlist.finish(entry, "Payment Failed")
+                declined += 1
+                continue
+            reservation.status = "Confirmed"
+            try:
+                self.reservations.add(reservation)
+            except StorageConflict:
+                # Another process sold the seat; the entry keeps its place in the queue
+                reservation._roll_back()
+                waitlist.requeue(entry)
+                continue
+            entry._reservation = reservation
+            waitlist.finish(entry, "Promoted")
+            promoted.append(reservation)
+        return promoted, declined
+
+    def _load_reservations(self, reservation_ids):
+        missing = [rid for rid in reservation_ids if self.reservations.get(rid) is None]
+        if not missing:
+            return
+        for row in self._storage.load_reservations(missing):
+            if self.reservations.get(row["reservation_id"]) is not None:
+                continue
+            flight = self.get_flight(row["flight_number"])
+            if flight is None:
+                continue
+            # Built with their stored IDs, so reloading draws nothing from the ID generator
+            passenger = Passenger(row["passport_number"], row["first_name"], row["last_name"],
+                                  row["age"], row["email"], row["phone"], int(row["passenger_id"]))
+            reservation = Reservation(passenger, flight, row["seat_number"], row["reservation_id"],
+                                      timestamps.from_isoformat(row["reservation_date"]), row["status"])
+            if row["payment_id"] is not None:
+                reservation._payment = Payment(row["amount"], row["payment_method"], row["payment_id"],
+                                               row["payment_status"],
+                                               timestamps.from_isoformat(row["payment_date"]))
+            self.reservations.add(reservation, persist=False)
+
+    @timed(OPERATION_SECONDS, "get_reservation")
+    def get_reservation(self, reservation_id):
+        reservation = self.reservations.get(reservation_id)
+        if reservation is None:
+            self._load_reservations([reservation_id])
+            reservation = self.reservations.get(reservation_id)
+        return reservation
+
+    @timed(OPERATION_SECONDS, "find_bookings")
+    def find_bookings(self, passport_number, include_cancelled=False):
+        self._load_reservations(self._storage.find_reservation_ids(
+            passport_number=passport_number, include_cancelled=include_cancelled))
+        return self.reservations.find_by_passport(passport_number, include_cancelled)
+
+    @timed(OPERATION_SECONDS, "find_reservations_between")
+    def find_reservations_between(self, start=None, end=None, include_cancelled=False, limit=None,
+                                  before=None):
+        # Up to limit bookings made from datetime start up to end, newest first; either end
+        # may be left open. Passing the last reservation ID returned as before continues
+        # below it. Reservation IDs are time-ordered, so this is a range scan of the ID index.
+        first_id, last_id = ids.id_range(start, end)
+        if before is not None:
+            last_id = min(last_id, ids.id_text(max(int(before) - 1, 0)))
+        if not self._storage.persistent:
+            return self.reservations.find_between(first_id, last_id, include_cancelled, limit)
+        reservation_ids = self._storage.find_reservation_ids(
+            include_cancelled=include_cancelled, first_id=first_id, last_id=last_id, limit=limit)
+        self._load_reservations(reservation_ids)
+        found = (self.reservations.get(reservation_id) for reservation_id in reservation_ids)
+        return [reservation for reservation in found if reservation is not None]
+
+    @timed(OPERATION_SECONDS, "get_flight_reservations")
+    def get_flight_reservations(self, flight_number, include_cancelled=False):
+        self._load_reservations(self._storage.find_reservation_ids(
+            flight_number=flight_number, include_cancelled=include_cancelled))
+        return self.reservations.find_by_flight(flight_number, include_cancelled)
+
+    @timed(OPERATION_SECONDS, "get_manifest")
+    def get_manifest(self, flight_number):
+        # Confirmed passengers as MANIFEST_COLUMNS rows in seat order, or None for an
+        # unknown flight. A flight's manifest is bounded by its seat count.
+        flight = self.get_flight(flight_number)
+        if flight is None:
+            return None
+        if self._storage.persistent:
+            seated = self._storage.load_manifest(flight_number)
+        else:
+            seated = {}
+            for seat_number, reservation in self.reservations.seat_map(flight_number).items():
+                passenger = reservation._passenger
+                seated[seat_number] = (reservation._reservation_id, passenger._first_name,
+                                       passenger._last_name, passenger._passport_number, passenger._age,
+                                       passenger._email, passenger._phone)
+        layout = flight.get_layout()
+        flight_date = flight.get_flight_date()
+        return [(flight_number, flight_date, seat_number, seat_class) + seated[seat_number]
+                for seat_number, seat_class in zip(layout.seat_numbers, layout.seat_classes)
+                if seat_number in seated]
+
+    def index_sizes(self):
+        return {
+            "flights": len(self._flights_by_number),
+            "routes": len(self._flights_by_route),
+            "dates": len(self._flights_by_date),
+            "reservations": len(self.reservations),
+            "seat_holds": len(self.holds),
+            "waitlist": sum(len(waitlist) for waitlist in list(self._waitlists.values())),
+        }
+
+    def close(self):
+        self._storage.close()
@@ -0,0 +1,22 @@
+import datetime
+import time
+
+# Records keep times as integer microseconds since the epoch: an int is smaller than
+# a datetime and converts back exactly
+
+
+def now():
+    return time.time_ns() // 1000
+
+
+def to_datetime(timestamp):
+    seconds, microseconds = divmod(timestamp, 1000000)
+    return datetime.datetime.fromtimestamp(seconds) + datetime.timedelta(microseconds=microseconds)
+
+
+def from_datetime(value):
+    return int(value.timestamp()) * 1000000 + value.microsecond
+
+
+def from_isoformat(text):
+    return from_datetime(datetime.datetime.fromisoformat(text))
@@ -0,0 +1,127 @@
+import collections
+import threading
+
+# Read-only snapshots handed to the UI. They are cached, so callers must not mutate them.
+FlightSummary = collections.namedtuple("FlightSummary", [
+    "flight_number", "destination", "flight_date", "departure_time", "arrival_time",
+    "gate_number", "aircraft_type", "available_seats"])
+CabinSummary = collections.namedtuple("CabinSummary", [
+    "seat_class", "price", "amenities", "available_seats", "capacity"])
+
+
+class ViewCache:
+    # Bounded LRU of derived data. Keys include the revision the value was computed
+    # at, so a change never invalidates anything: it just produces new keys, and the
+    # stale entries age out of the LRU.
+    def __init__(self, maxsize=2048):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, compute):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+        value = compute()
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def summarize_flight(flight):
+    return FlightSummary(
+        flight.get_flight_number(),
+        flight.get_destination(),
+        flight.get_flight_date(),
+        flight.get_departure_time(),
+        flight.get_arrival_time(),
+        flight.get_gate_number(),
+        flight.get_aircraft_type(),
+        flight.count_available_seats(),
+    )
+
+
+class FlightViews:
+    # View models for the pages, memoised per flight revision (seat data) or per
+    # system revision (anything spanning flights). A rerun that changed nothing
+    # is answered from the cache without touching the flights.
+    def __init__(self, airline_system, maxsize=2048):
+        self._system = airline_system
+        self.cache = ViewCache(maxsize)
+
+    def has_flights(self):
+        return self.cache.get(("has_flights", self._system.get_revision()), self._system.has_flights)
+
+    def available_seat_numbers(self, flight, seat_class=None):
+        key = ("seats", flight.get_flight_number(), flight.get_revision(), seat_class)
+        return self.cache.get(key, lambda: tuple(flight.get_available_seat_numbers(seat_class)))
+
+    def cabin_summaries(self, flight):
+        def compute():
+            layout = flight.get_layout()
+            return tuple(
+                CabinSummary(cabin.seat_class, cabin.price, cabin.amenities,
+                             flight.count_available_seats(cabin.seat_class),
+                             layout.seats_per_class[cabin.seat_class])
+                for cabin in layout.cabins)
+
+        return self.cache.get(("cabins", flight.get_flight_number(), flight.get_revision()), compute)
+
+    def seat_map(self, flight):
+        # (seat number, cabin, state name) for every seat, in layout order
+        def compute():
+            inventory = flight._inventory
+            layout = flight.get_layout()
+            names = {inventory.FREE: "free", inventory.OCCUPIED: "occupied", inventory.HELD: "held"}
+            return tuple((seat_number, seat_class, names[state]) for seat_number, seat_class, state
+                         in zip(layout.seat_numbers, layout.seat_classes, bytes(inventory._states)))
+
+        return self.cache.get(("seat_map", flight.get_flight_number(), flight.get_revision()), compute)
+
+    def find_flights(self, destination=None, date=None, prefix=False):
+        key = ("find", self._system.get_revision(), destination.lower() if destination else None, date,
+               prefix)
+        return self.cache.get(key, lambda: tuple(
+            summarize_flight(flight) for flight in self._system.find_flights(destination, date, prefix)))
+
+    def flights_on(self, date):
+        return self.find_flights(date=date)
+
+    def flight_page(self, destination=None, date=None, sort="departure", descending=False, page=0,
+                    page_size=20, prefix=False):
+        # (number of matches, summaries on the page); only the page's flights are summarised
+        key = ("page", self._system.get_revision(), destination.lower() if destination else None, date,
+               sort, descending, page, page_size, prefix)
+
+        def compute():
+            total, flights = self._system.find_flights_page(
+                destination, date, sort, descending, page * page_size, page_size, prefix)
+            return total, tuple(summarize_flight(flight) for flight in flights)
+
+        return self.cache.get(key, compute)
+
+    def suggest_destinations(self, text, limit=8):
+        key = ("suggest", self._system.get_revision(), text.strip().lower(), limit)
+        return self.cache.get(key, lambda: tuple(self._system.suggest_destinations(text, limit)))
+
+    def search_availability(self, destination=None, date_from=None, date_to=None, cabin=None,
+                            min_free=1):
+        key = ("availability", self._system.get_revision(),
+               destination.lower() if destination else None, date_from, date_to, cabin, min_free)
+        return self.cache.get(key, lambda: self._system.search_availability(
+            destination, date_from, date_to, cabin, min_free))
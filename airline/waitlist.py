@@ -0,0 +1,143 @@
+import bisect
+import itertools
+import threading
+
+from . import ids, timestamps
+
+# Priority order, best first: a waitlisted passenger on a flexible fare is offered a
+# seat before a saver fare, then by loyalty tier, then by who joined first
+FARE_CLASSES = ("Flex", "Standard", "Saver")
+LOYALTY_TIERS = ("Diamond", "Platinum", "Gold", "Silver", "Member")
+
+
+class WaitlistEntry:
+    def __init__(self, passenger, flight_number, seat_class, payment_method, fare_class="Standard",
+                 loyalty_tier="Member"):
+        if fare_class not in FARE_CLASSES:
+            raise ValueError(f"fare_class must be one of {', '.join(FARE_CLASSES)}")
+        if loyalty_tier not in LOYALTY_TIERS:
+            raise ValueError(f"loyalty_tier must be one of {', '.join(LOYALTY_TIERS)}")
+        self._entry_id = ids.next_text_id()
+        self._passenger = passenger
+        self._flight_number = flight_number
+        self._seat_class = seat_class
+        self._payment_method = payment_method
+        self._fare_class = fare_class
+        self._loyalty_tier = loyalty_tier
+        # Integer microseconds, see timestamps
+        self._joined_at = timestamps.now()
+        self._sequence = None
+        # Waiting -> Offered -> Promoted, or Left / Payment Failed; the reservation is set
+        # on promotion
+        self.status = "Waiting"
+        self._reservation = None
+
+    def get_joined_at(self):
+        return timestamps.to_datetime(self._joined_at)
+
+    def get_priority(self):
+        return (FARE_CLASSES.index(self._fare_class), LOYALTY_TIERS.index(self._loyalty_tier),
+                self._sequence)
+
+class Waitlist:
+    # One flight's waitlist: per cabin, the waiting entries sorted on priority, so a
+    # place in line is a bisect and the head is the first item. Entries are dropped as
+    # soon as they stop waiting; only waiting and offered ones are kept.
+    def __init__(self, flight_number):
+        self._flight_number = flight_number
+        self._queues = {}
+        self._entries = {}
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        with self._lock:
+            return sum(len(queue) for queue in self._queues.values())
+
+    def _queue(self, entry):
+        return self._queues.setdefault(entry._seat_class, [])
+
+    def _index(self, entry):
+        # Where the entry is, or would go, in its cabin's queue; priorities are unique
+        return bisect.bisect_left(self._queue(entry), (entry.get_priority(),))
+
+    def _enqueue(self, entry):
+        self._queue(entry).insert(self._index(entry), (entry.get_priority(), entry))
+
+    def join(self, entry):
+        with self._lock:
+            entry._sequence = next(self._sequence)
+            self._enqueue(entry)
+            self._entries[entry._entry_id] = entry
+        return entry
+
+    def requeue(self, entry):
+        # Puts an offered entry back at its original place
+        with self._lock:
+            entry.status = "Waiting"
+            self._enqueue(entry)
+
+    def finish(self, entry, status):
+        # An offered entry was promoted or its charge declined; either way it is done
+        with self._lock:
+            entry.status = status
+            self._entries.pop(entry._entry_id, None)
+
+    def leave(self, entry_id):
+        with self._lock:
+            entry = self._entries.get(entry_id)
+            if entry is None or entry.status != "Waiting":
+                return False
+            del self._queue(entry)[self._index(entry)]
+            del self._entries[entry_id]
+            entry.status = "Left"
+            return True
+
+    def get(self, entry_id):
+        return self._entries.get(entry_id)
+
+    def find_by_passport(self, passport_number):
+        return [entry for entry in list(self._entries.values())
+                if entry._passenger._passport_number == passport_number]
+
+    def waiting(self, seat_class=None):
+        # Entries still waiting, best placed first
+        with self._lock:
+            queues = [self._queues.get(seat_class, [])] if seat_class else list(self._queues.values())
+            entries = [entry for queue in queues for _, entry in queue]
+        if not seat_class:
+            entries.sort(key=WaitlistEntry.get_priority)
+        return entries
+
+    def position(self, entry):
+        # 1-based place in the entry's cabin queue, or None once it stopped waiting
+        with self._lock:
+            if entry.status != "Waiting":
+                return None
+            return 1 + self._index(entry)
+
+    def _pop(self, queue):
+        if not queue:
+            return None
+        _, entry = queue.pop(0)
+        return entry
+
+    def offer_free_seats(self, flight, seat_class=None):
+        # Gives every free seat in the cabin (or all cabins) to the best-placed entry
+        # waiting for it and takes the seat on their behalf, so nobody else can book
+        # it while they are charged. Returns [(entry, seat number)].
+        offers = []
+        with flight._lock, self._lock:
+            cabins = [seat_class] if seat_class else list(self._queues)
+            for cabin in cabins:
+                queue = self._queues.get(cabin)
+                if not queue or flight.count_available_seats(cabin) == 0:
+                    continue
+                for seat_number in flight.get_available_seat_numbers(cabin):
+                    entry = self._pop(queue)
+                    if entry is None:
+                        break
+                    flight.assign_seat(seat_number, entry._passenger)
+                    entry.status = "Offered"
+                    offers.append((entry, seat_number))
+        return offers
@@ -0,0 +1,397 @@
+import argparse
+import collections
+import datetime
+import json
+import math
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+from airline import AIRCRAFT_LAYOUTS, AirlineSystem, Passenger, SQLiteStorage, StorageBackend
+from airline.payment_gateway import PaymentDispatcher, StubGateway, set_default_dispatcher
+from airline.sharding import ShardedAirlineSystem
+
+DESTINATIONS = ("Tokyo", "Osaka", "Seoul", "Bangkok", "Singapore", "Hanoi", "Da Nang", "Taipei",
+                "Hong Kong", "Manila", "Jakarta", "Kuala Lumpur", "Sydney", "Melbourne", "Paris",
+                "London", "Frankfurt", "Dubai", "Doha", "San Francisco")
+FIRST_NAMES = ("An", "Binh", "Chi", "Dung", "Hana", "Kenji", "Linh", "Minh", "Sakura", "Yuki")
+LAST_NAMES = ("Nguyen", "Tran", "Le", "Pham", "Sato", "Suzuki", "Takahashi", "Tanaka", "Kim", "Lee")
+
+DEFAULT_MIX = {"search": 50, "details": 30, "book": 15, "cancel": 5}
+START_DATE = datetime.date(2026, 1, 1)
+
+
+def synthetic_schedule(count, days=30, seed=0, aircraft_types=None):
+    # Rows in FLIGHT_COLUMNS order, spread over the given number of days
+    aircraft_types = aircraft_types or tuple(AIRCRAFT_LAYOUTS)
+    rng = random.Random(seed)
+    for i in range(count):
+        departure = rng.randrange(0, 19 * 60, 5)
+        arrival = departure + rng.randrange(60, 5 * 60, 5)
+        yield (
+            f"SB{i:07d}",
+            (START_DATE + datetime.timedelta(days=i % days)).isoformat(),
+            rng.choice(DESTINATIONS),
+            f"{departure // 60:02d}:{departure % 60:02d}",
+            f"{arrival // 60:02d}:{arrival % 60:02d}",
+            f"G{rng.randint(1, 40)}",
+            rng.choice(aircraft_types),
+        )
+
+
+def synthetic_passengers(count, seed=0):
+    rng = random.Random(seed)
+    return [Passenger(f"BP{i:08d}", rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES),
+                      rng.randint(1, 90), f"passenger{i}@example.com")
+            for i in range(count)]
+
+
+def install_stub_payments(seed=0):
+    # Payments never leave the machine; shard processes run this too
+    set_default_dispatcher(PaymentDispatcher(default_gateway=StubGateway(seed=seed)))
+
+
+def build_system(flights, days=30, db_path=None, chunk_size=50000, shards=0, seed=0):
+    if shards > 1:
+        system = ShardedAirlineSystem(shards, db_path, initializer=install_stub_payments, initargs=(seed,))
+    else:
+        system = AirlineSystem(SQLiteStorage(db_path) if db_path else StorageBackend())
+    chunk = []
+    for row in synthetic_schedule(flights, days):
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            system.add_flights(chunk)
+            chunk = []
+    if chunk:
+        system.add_flights(chunk)
+    return system
+
+
+def percentile(ordered, fraction):
+    # Nearest-rank percentile of an already sorted list
+    if not ordered:
+        return None
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+class Workload:
+    # Mixed search/details/book/cancel traffic against one AirlineSystem. Each thread
+    # draws operations from the mix and records per-operation latencies.
+    def __init__(self, system, flights, days, passengers, mix=None, seed=0):
+        self._system = system
+        self._flights = flights
+        self._days = days
+        self._passengers = passengers
+        self._mix = dict(mix or DEFAULT_MIX)
+        self._seed = seed
+        self._booked = collections.deque()
+
+    def _flight_number(self, rng):
+        return f"SB{rng.randrange(self._flights):07d}"
+
+    def search(self, rng):
+        date = (START_DATE + datetime.timedelta(days=rng.randrange(self._days))).isoformat()
+        return bool(self._system.find_flights(rng.choice(DESTINATIONS), date))
+
+    def details(self, rng):
+        flight = self._system.get_flight(self._flight_number(rng))
+        if flight is None:
+            return False
+        for cabin in flight.get_layout().cabins:
+            flight.count_available_seats(cabin.seat_class)
+        flight.get_available_seat_numbers()
+        return True
+
+    def book(self, rng):
+        flight = self._system.get_flight(self._flight_number(rng))
+        if flight is None:
+            return False
+        seat_numbers = flight.get_available_seat_numbers()
+        if not seat_numbers:
+            return False
+        reservation = self._system.create_reservation(
+            rng.choice(self._passengers), flight, rng.choice(seat_numbers), "momo")
+        if reservation is None:
+            return False
+        self._booked.append(reservation._reservation_id)
+        return True
+
+    def cancel(self, rng):
+        try:
+            reservation_id = self._booked.popleft()
+        except IndexError:
+            return False
+        return self._system.cancel_reservation(reservation_id) is not None
+
+    def _worker(self, index, operations, results):
+        rng = random.Random(self._seed * 1000 + index)
+        names = list(self._mix)
+        weights = [self._mix[name] for name in names]
+        latencies = {name: [] for name in names}
+        failures = dict.fromkeys(names, 0)
+        for name in rng.choices(names, weights, k=operations):
+            operation = getattr(self, name)
+            started = time.perf_counter()
+            ok = operation(rng)
+            latencies[name].append(time.perf_counter() - started)
+            if not ok:
+                failures[name] += 1
+        results[index] = (latencies, failures)
+
+    def run(self, threads, operations):
+        results = [None] * threads
+        workers = [threading.Thread(target=self._worker, args=(i, operations // threads, results))
+                   for i in range(threads)]
+        started = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - started
+
+        report = {"threads": threads, "seconds": elapsed, "operations": {}}
+        total = 0
+        for name in self._mix:
+            latencies = sorted(latency for thread_latencies, _ in results
+                               for latency in thread_latencies[name])
+            failed = sum(failures[name] for _, failures in results)
+            total += len(latencies)
+            report["operations"][name] = {
+                "count": len(latencies),
+                "failed": failed,
+                "throughput": len(latencies) / elapsed if elapsed else None,
+                "p50_ms": _ms(percentile(latencies, 0.50)),
+                "p95_ms": _ms(percentile(latencies, 0.95)),
+                "p99_ms": _ms(percentile(latencies, 0.99)),
+                "max_ms": _ms(latencies[-1] if latencies else None),
+            }
+        report["throughput"] = total / elapsed if elapsed else None
+        return report
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 4)
+
+
+def measure_memory(flights=10000, reservations=10000):
+    # Traced allocation per in-memory flight and per confirmed reservation
+    # (reservation, passenger, payment and store indexes)
+    rows = list(synthetic_schedule(flights))
+    tracemalloc.start()
+    try:
+        system = AirlineSystem()
+        before = tracemalloc.get_traced_memory()[0]
+        system.add_flights(rows)
+        per_flight = (tracemalloc.get_traced_memory()[0] - before) / flights
+
+        targets = [(system.get_flight(row[0]), seat) for row in rows
+                   for seat in system.get_flight(row[0]).get_available_seat_numbers()[:2]]
+        targets = targets[:reservations]
+        before = tracemalloc.get_traced_memory()[0]
+        for i, (flight, seat_number) in enumerate(targets):
+            passenger = Passenger(f"MP{i:08d}", "Mem", "Probe", 30)
+            system.create_reservation(passenger, flight, seat_number, "momo")
+        per_reservation = (tracemalloc.get_traced_memory()[0] - before) / max(1, len(targets))
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {
+        "sample_flights": flights,
+        "sample_reservations": len(targets),
+        "bytes_per_flight": round(per_flight, 1),
+        "bytes_per_reservation": round(per_reservation, 1),
+        "bytes_per_loaded_reservation": round(measure_loaded_reservations(reservations), 1),
+        "traced_peak_bytes": peak,
+    }
+
+
+def measure_loaded_reservations(count=10000, seed=0):
+    # Traced allocation per reservation read back from SQLite, the way a restarted server
+    # holds its booking history: passenger, reservation, payment and store indexes, with
+    # every string arriving from the database as a new object
+    import concurrent.futures
+
+    from airline import Payment, Reservation
+
+    rng = random.Random(seed)
+    rows = list(synthetic_schedule(max(1, count // 50), seed=seed))
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "memory.db")
+        system = AirlineSystem(SQLiteStorage(path, synchronous="OFF"))
+        system.add_flights(rows)
+        reservations = []
+        for i, row in enumerate(rows):
+            for seat_number in AIRCRAFT_LAYOUTS[row[6]].seat_numbers[:50]:
+                passenger = Passenger(f"LP{len(reservations):08d}", rng.choice(FIRST_NAMES),
+                                      rng.choice(LAST_NAMES), rng.randint(1, 90),
+                                      f"passenger{len(reservations)}@example.com")
+                reservation = Reservation(passenger, system.get_flight(row[0]), seat_number)
+                reservation.status = "Confirmed"
+                reservation._payment = Payment(1500000.0, rng.choice(("momo", "vnpay", "credit card")))
+                reservation._payment._status = "Completed"
+                reservations.append(reservation)
+        reservations = reservations[:count]
+
+        # Concurrent saves share the writer's group commits
+        with concurrent.futures.ThreadPoolExecutor(32) as executor:
+            list(executor.map(system._storage.save_reservation, reservations))
+        system.close()
+        del reservations
+
+        system = AirlineSystem(SQLiteStorage(path))
+        system.find_flights()
+        reservation_ids = system._storage.find_reservation_ids()
+        tracemalloc.start()
+        try:
+            before = tracemalloc.get_traced_memory()[0]
+            system._load_reservations(reservation_ids)
+            loaded = tracemalloc.get_traced_memory()[0] - before
+        finally:
+            tracemalloc.stop()
+        system.close()
+    return loaded / max(1, len(reservation_ids))
+
+
+HEAVY_MODULES = ("streamlit", "pandas", "numpy", "PIL", "asyncio", "http.server")
+
+
+def measure_import(module="airline", runs=5):
+    # Cold import in fresh interpreters: best wall time of several runs, plus any heavy
+    # dependency the import dragged in. Bytecode is cached first so compiling is not counted.
+    code = (f"import sys, time; started = time.perf_counter(); import {module}; "
+            f"elapsed = time.perf_counter() - started; "
+            f"print(elapsed, *[m for m in {HEAVY_MODULES!r} if m in sys.modules])")
+    environment = {key: value for key, value in os.environ.items() if key != "PYTHONDONTWRITEBYTECODE"}
+    cwd = os.path.dirname(os.path.abspath(__file__))
+    timings = []
+    for _ in range(runs + 1):
+        output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                                check=True, cwd=cwd, env=environment).stdout.split()
+        timings.append(float(output[0]))
+    return {
+        "module": module,
+        "best_ms": round(min(timings[1:]) * 1000, 3),
+        "median_ms": round(sorted(timings[1:])[len(timings[1:]) // 2] * 1000, 3),
+        "heavy_modules_loaded": output[1:],
+    }
+
+
+def _peak_rss_bytes():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_scenario(flights, args):
+    with tempfile.TemporaryDirectory() as directory:
+        db_path = os.path.join(directory, "bench.db") if args.storage == "sqlite" else None
+        started = time.perf_counter()
+        system = build_system(flights, args.days, db_path, shards=args.shards, seed=args.seed)
+        load_seconds = time.perf_counter() - started
+        passengers = synthetic_passengers(args.passengers, args.seed)
+        mix = dict(zip(DEFAULT_MIX, args.mix)) if args.mix else DEFAULT_MIX
+        report = Workload(system, flights, args.days, passengers, mix, args.seed).run(
+            args.threads, args.operations)
+        report.update(flights=flights, storage=args.storage, shards=args.shards,
+                      load_seconds=load_seconds, peak_rss_bytes=_peak_rss_bytes())
+        system.close()
+    return report
+
+
+def compare(results, baseline):
+    # Prints throughput and p95 changes against a previous results file
+    previous = {scenario["flights"]: scenario for scenario in baseline["scenarios"]}
+    for scenario in results["scenarios"]:
+        old = previous.get(scenario["flights"])
+        if old is None:
+            continue
+        print(f"{scenario['flights']} flights vs {baseline.get('revision') or 'baseline'}:")
+        for name, current in scenario["operations"].items():
+            before = old["operations"].get(name)
+            if not before or not before["throughput"] or not before["p95_ms"] or not current["p95_ms"]:
+                continue
+            print(f"  {name:8} throughput {current['throughput'] / before['throughput'] - 1:+7.1%}"
+                  f"  p95 {current['p95_ms'] / before['p95_ms'] - 1:+7.1%}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the booking core without the UI")
+    parser.add_argument("--flights", type=int, nargs="+", default=[10, 1000, 100000],
+                        help="schedule sizes to run, one scenario each (default: 10 1000 100000)")
+    parser.add_argument("--days", type=int, default=30, help="days the schedule is spread over")
+    parser.add_argument("--passengers", type=int, default=10000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--operations", type=int, default=20000, help="operations per scenario")
+    parser.add_argument("--mix", type=int, nargs=4, metavar=("SEARCH", "DETAILS", "BOOK", "CANCEL"),
+                        help="relative operation weights (default: 50 30 15 5)")
+    parser.add_argument("--storage", choices=["memory", "sqlite"], default="memory",
+                        help="in-memory backend or a temporary SQLite database")
+    parser.add_argument("--shards", type=int, default=0,
+                        help="run the booking core in this many worker processes (default: in process)")
+    parser.add_argument("--memory-sample", type=int, default=10000,
+                        help="flights and reservations used to measure memory (0 to skip)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="bench_output.json", help="JSON results file")
+    parser.add_argument("--compare", help="previous JSON results to compare against")
+    args = parser.parse_args(argv)
+
+    install_stub_payments(args.seed)
+
+    results = {
+        "revision": _git_revision(),
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+        "scenarios": [],
+    }
+    results["import"] = measure_import()
+    print(f"Cold import of airline: {results['import']['best_ms']:.1f} ms"
+          + (f" (loads {', '.join(results['import']['heavy_modules_loaded'])})"
+             if results["import"]["heavy_modules_loaded"] else ""))
+    if args.memory_sample:
+        results["memory"] = measure_memory(args.memory_sample, args.memory_sample)
+        print(f"Memory: {results['memory']['bytes_per_flight']:.0f} B/flight, "
+              f"{results['memory']['bytes_per_reservation']:.0f} B/reservation, "
+              f"{results['memory']['bytes_per_loaded_reservation']:.0f} B/reservation loaded from storage")
+
+    for flights in args.flights:
+        scenario = run_scenario(flights, args)
+        results["scenarios"].append(scenario)
+        engine = f", {args.shards} shards" if args.shards > 1 else ""
+        print(f"{flights} flights ({args.storage}{engine}): loaded in {scenario['load_seconds']:.2f}s, "
+              f"{scenario['throughput']:.0f} ops/s on {args.threads} threads")
+        for name, stats in scenario["operations"].items():
+            if stats["count"]:
+                print(f"  {name:8} {stats['count']:7d} ops  p50 {stats['p50_ms']:8.3f} ms  "
+                      f"p95 {stats['p95_ms']:8.3f} ms  p99 {stats['p99_ms']:8.3f} ms")
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
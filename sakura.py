@@ -1,284 +1,174 @@
-import streamlit as st
 import datetime
-import random
-from PIL import Image
-import pandas as pd
-
-# Initialize session state variables if they don't exist
-if 'airline_system' not in st.session_state:
-    st.session_state.airline_system = None
-if 'current_page' not in st.session_state:
-    st.session_state.current_page = 'home'
-
-class Seat:
-    def __init__(self, seat_number):
-        self.seat_number = seat_number
-        self.is_occupied = False
-        self.seat_class = self.get_seat_class()
-
-    def get_seat_class(self):
-        row = int(self.seat_number[:-1])
-        if row <= 2:
-            return 'First'
-        elif row <= 7:
-            return 'Business'
-        else:
-            return 'Economy'
+import io
+import os
 
-    def occupy(self):
-        self.is_occupied = True
-        
-    def empty(self):
-        self.is_occupied = False
-
-class FirstClass(Seat):
-    def __init__(self, seat_number):
-        super().__init__(seat_number)
-        self._price = 10000000.0
-        self._amenities = ["15kg Luggage", "Premium Meals", "Private Line", "Private Restroom"]
-    
-    def get_price(self):
-        return self._price
-    
-    def get_amenities(self):
-        return self._amenities
-
-class BusinessClassSeat(Seat):
-    def __init__(self, seat_number):
-        super().__init__(seat_number)
-        self._price = 5000000.0
-        self._amenities = ["10kg Luggage", "Business Meals", "Priority Boarding"]
-    
-    def get_price(self):
-        return self._price
-    
-    def get_amenities(self):
-        return self._amenities
-
-class EconomyClassSeat(Seat):
-    def __init__(self, seat_number):
-        super().__init__(seat_number)
-        self._price = 1000000.0
-        self._amenities = ["2kg Luggage", "Standard Seat", "Basic Meal"]
-    
-    def get_price(self):
-        return self._price
-    
-    def get_amenities(self):
-        return self._amenities
-
-class Payment:
-    def __init__(self, amount, payment_method):
-        self._payment_id = str(random.randint(10000000, 99999999))
-        self._amount = amount
-        self._payment_method = payment_method
-        self._status = "Pending"  
-        self._timestamp = datetime.datetime.now()
-
-    def get_amount(self):
-        return self._amount
-    
-    def get_payment(self):
-        return self._payment_method
-    
-    def get_status(self):
-        return self._status
-    
-    def process_payment(self):
-        self._status = "Completed"
-        return True
-    
-    def refund_payment(self):
-        if self.get_status() == "Completed":
-            self._status = "Refunded"
-            return True
-        return False
-
-class Flight:
-    def __init__(self, flight_number, flight_date, destination, 
-                 departure_time, arrival_time, gate_number):
-        self._flight_number = flight_number
-        self._flight_date = flight_date
-        self._destination = destination
-        self._departure_time = departure_time
-        self._arrival_time = arrival_time
-        self._gate_number = gate_number
-        self._seats = {}
-        self._passengers = []
-        self._initialize_seats()
-
-    def get_flight_number(self):
-        return self._flight_number
-    
-    def get_flight_date(self):
-        return self._flight_date
-    
-    def get_destination(self):
-        return self._destination
-    
-    def get_departure_time(self):
-        return self._departure_time
-    
-    def get_arrival_time(self):
-        return self._arrival_time
-    
-    def get_gate_number(self):
-        return self._gate_number
-    
-    def get_seats(self):
-        return self._seats
-
-    def _initialize_seats(self):
-        # First Class (Rows 1-2)
-        for row in range(1, 3):
-            for col in ['A', 'B', 'E', 'F']:
-                seat_number = f"{row}{col}"
-                self._seats[seat_number] = FirstClass(seat_number)
-            
-        # Business Class (Rows 3-7)
-        for row in range(3, 8):
-            for col in ['A', 'B', 'E', 'F']:
-                seat_number = f"{row}{col}"
-                self._seats[seat_number] = BusinessClassSeat(seat_number)
-        
-        # Economy Class (Rows 8-30)
-        for row in range(8, 31):
-            for col in ['A', 'B', 'C', 'D', 'E', 'F']:
-                seat_number = f"{row}{col}"
-                self._seats[seat_number] = EconomyClassSeat(seat_number)
-
-    def get_available_seats(self):
-        return [seat for seat in self._seats.values() if not seat.is_occupied]
-
-    def assign_seat(self, seat_number, passenger):
-        if seat_number in self._seats and not self._seats[seat_number].is_occupied:
-            self._seats[seat_number].occupy()
-            self._passengers.append(passenger)
-            return True
-        return False
-
-class Passenger:
-    def __init__(self, passport_number, first_name, last_name, age, email=None, phone=None):
-        self._passenger_id = str(random.randint(10000, 99999))
-        self._passport_number = passport_number
-        self._first_name = first_name
-        self._last_name = last_name
-        self._age = age
-        self._email = email
-        self._phone = phone
-
-    def get_full_name(self):
-        return f"{self._first_name} {self._last_name}"
-
-class Reservation:
-    def __init__(self, passenger, flight, seat_number):
-        self._reservation_id = str(random.randint(10000000, 99999999))
-        self._passenger = passenger
-        self._flight = flight
-        self._seat_number = seat_number
-        self._reservation_date = datetime.datetime.now()
-        self.status = "Pending"
-        self._payment = None
-    
-    def confirm_reservation(self, payment_method):
-        seat = self._flight._seats[self._seat_number]
-        payment = Payment(seat.get_price(), payment_method)
-        
-        if payment.process_payment():
-            self._payment = payment
-            self.status = "Confirmed"
-            self._flight.assign_seat(self._seat_number, self._passenger)
-            return True
-        return False
-    
-    def cancel_reservation(self):
-        if self.status == "Confirmed":
-            self.status = "Cancelled"
-            self._flight._seats[self._seat_number].empty()
-            if self._payment:
-                self._payment.refund_payment()
-            return True
-        return False
-
-class AirlineSystem:
-    def __init__(self):
-        self.flights = []
-        self.reservations = []
-    
-    def add_flight(self, flight):
-        # Check if flight number already exists
-        if any(f.get_flight_number() == flight.get_flight_number() for f in self.flights):
-            return False
-        self.flights.append(flight)
-        return True
-    
-    def find_flights(self, destination=None, date=None):
-        filtered_flights = []
-        for flight in self.flights:
-            if destination and date:
-                if flight.get_destination().lower() == destination.lower() and flight.get_flight_date() == date:
-                    filtered_flights.append(flight)
-            elif destination:
-                if flight.get_destination().lower() == destination.lower():
-                    filtered_flights.append(flight)
-            elif date:
-                if flight.get_flight_date() == date:
-                    filtered_flights.append(flight)
-            else:
-                filtered_flights.append(flight)
-        return filtered_flights
-    
-    def create_reservation(self, passenger, flight, seat_number, payment_method):
-        reservation = Reservation(passenger, flight, seat_number)
-        if reservation.confirm_reservation(payment_method):
-            self.reservations.append(reservation)
-            return reservation
-        return None
+import streamlit as st
 
+from airline import (AIRCRAFT_LAYOUTS, FARE_CLASSES, FLIGHT_COLUMNS, LOYALTY_TIERS, MANIFEST_COLUMNS,
+                     SEAT_HOLD_TTL, AirlineSystem, Flight, FlightViews, Passenger, SeatInventory,
+                     SQLiteStorage)
+from airline import metrics
+from airline.manifest import EXPORT_FORMATS, departure_flight_numbers, export_manifest
+from airline.metrics import (API_SECONDS, OPERATION_SECONDS, PAGE_SECONDS, REGISTRY, SCRIPT_SECONDS,
+                             get_profiler, serve, timed, watch_system)
+
+# Streamlit front end. The domain model lives in the airline package, which imports
+# nothing from here, so workers and scripts can use it without a script-run context.
+
+def init_session_state():
+    if 'airline_system' not in st.session_state:
+        st.session_state.airline_system = None
+    if 'current_page' not in st.session_state:
+        st.session_state.current_page = 'home'
+
+@st.cache_resource
+def get_airline_system():
+    # One AirlineSystem per server process, shared by every browser session
+    db_path = os.environ.get("SAKURA_DB", "sakura.db")
+    shards = int(os.environ.get("SAKURA_SHARDS", 0))
+    if shards > 1:
+        # Flights spread over worker processes, each with its own database file
+        from airline.sharding import ShardedAirlineSystem
+        system = ShardedAirlineSystem(shards, db_path)
+    else:
+        system = AirlineSystem(SQLiteStorage(db_path))
+    watch_system(system)
+    # Prometheus scrapes GET /metrics on this port
+    metrics_port = os.environ.get("SAKURA_METRICS_PORT")
+    if metrics_port:
+        serve(int(metrics_port))
+    # The JSON API can share this process (and its seat state) instead of running on its own
+    api_port = os.environ.get("SAKURA_API_PORT")
+    if api_port:
+        from airline.api import ApiServer
+        ApiServer(system, "0.0.0.0", int(api_port))
+    return system
+
+@st.cache_resource
+def get_views():
+    # Derived page data memoised by revision, shared by every session
+    return FlightViews(get_airline_system())
+
+@st.cache_resource
+def get_fleet_analytics():
+    # numpy/pandas are only loaded once someone opens the dashboard
+    from airline.analytics import FleetAnalytics
+    
+    # Built once from storage, then kept current by AirlineSystem callbacks
+    return FleetAnalytics.from_system(get_airline_system())
+
+SEAT_MAP_LEGEND = """
+#### Legend:
+🟦 Available &nbsp;&nbsp; 🟥 Occupied &nbsp;&nbsp; 🟨 Held &nbsp;&nbsp; ⬛ Not Available
+"""
+
+SEAT_MAP_STYLE = """
+<style>
+.seat-map { border-collapse: collapse; text-align: center; }
+.seat-map th, .seat-map td { padding: 2px 10px; border: none; }
+.seat-map .cabin-First { background-color: #FFE4F1; }
+.seat-map .cabin-Business { background-color: #FFF4E0; }
+.seat-map .cabin-Economy { background-color: #F4F8FF; }
+</style>
+"""
+
+_SEAT_SYMBOLS = {SeatInventory.FREE: "🟦", SeatInventory.OCCUPIED: "🟥", SeatInventory.HELD: "🟨"}
+
+def seat_class_legend(layout):
+    return " &nbsp;&nbsp; ".join(
+        f"{cabin.seat_class[0]} - {cabin.seat_class} Class (Rows {cabin.first_row}-{cabin.last_row})"
+        for cabin in layout.cabins
+    )
+
+def render_seat_map(layout, states):
+    # Whole grid as one HTML table
+    parts = [SEAT_MAP_STYLE, '<table class="seat-map"><tr><th>Row</th>']
+    parts.extend(f"<th>{col}</th>" for col in layout.columns)
+    parts.append("</tr>")
+    for row in range(1, layout.rows + 1):
+        row_class = None
+        cells = []
+        for col in layout.columns:
+            index = layout.seat_index.get(f"{row}{col}")
+            if index is None:
+                cells.append("<td>⬛</td>")
+            else:
+                row_class = layout.seat_classes[index]
+                cells.append(f"<td>{_SEAT_SYMBOLS[states[index]]}</td>")
+        label = f"{row} {row_class[0]}" if row_class else f"{row}"
+        parts.append(f'<tr class="cabin-{row_class}"><td>{label}</td>{"".join(cells)}</tr>')
+    parts.append("</table>")
+    return "".join(parts)
+
+@timed(OPERATION_SECONDS, "create_seat_map")
 def create_seat_map(flight):
     st.markdown("### Seat Map")
-    st.markdown("#### Legend:")
-    col1, col2, col3 = st.columns(3)
-    with col1:
-        st.markdown("🟦 Available")
-    with col2:
-        st.markdown("🟥 Occupied")
-    with col3:
-        st.markdown("⬛ Not Available")
-
+    st.markdown(SEAT_MAP_LEGEND, unsafe_allow_html=True)
     st.markdown("#### Seat Classes:")
-    col1, col2, col3 = st.columns(3)
-    with col1:
-        st.markdown("F - First Class (Rows 1-2)")
-    with col2:
-        st.markdown("B - Business Class (Rows 3-7)")
-    with col3:
-        st.markdown("E - Economy Class (Rows 8-30)")
-
-    # Header row with column letters
-    cols = st.columns(7)
-    cols[0].markdown("Row")
-    for i, col in enumerate(['A', 'B', 'C', 'D', 'E', 'F']):
-        cols[i+1].markdown(col)
-
-    # Create seat map
-    for row in range(1, 31):
-        cols = st.columns(7)
-        cols[0].markdown(f"{row}")
-        
-        for i, col in enumerate(['A', 'B', 'C', 'D', 'E', 'F']):
-            seat_num = f"{row}{col}"
-            
-            # Check if seat exists and get its status
-            if seat_num in flight._seats:
-                seat = flight._seats[seat_num]
-                if seat.is_occupied:
-                    cols[i+1].markdown("🟥")
-                else:
-                    cols[i+1].markdown("🟦")
-            else:
-                cols[i+1].markdown("⬛")
-
+    st.markdown(seat_class_legend(flight.get_layout()), unsafe_allow_html=True)
+    # Cached by flight number and revision, so any seat change on the flight produces a
+    # fresh entry; in sharded mode each rerun brings a new copy of the flight
+    key = ("seat_map_html", flight.get_flight_number(), flight.get_revision())
+    html = get_views().cache.get(
+        key, lambda: render_seat_map(flight.get_layout(), bytes(flight._inventory._states)))
+    st.markdown(html, unsafe_allow_html=True)
+
+FLIGHT_SORT_LABELS = {"Departure": "departure", "Destination": "destination", "Free Seats": "free_seats"}
+RESULT_PAGE_SIZES = [10, 25, 50, 100]
+RESULT_COLUMNS = {
+    "flight_number": "Flight", "destination": "Destination", "flight_date": "Date",
+    "departure_time": "Departure", "arrival_time": "Arrival", "gate_number": "Gate",
+    "aircraft_type": "Aircraft", "available_seats": "Free Seats",
+}
+
+def pick_destination(destination):
+    # Copies the chosen suggestion into the destination box
+    st.session_state.search_destination = destination
+
+def open_flight_details(flight_number):
+    st.session_state.details_flight_number = flight_number
+    st.session_state.current_page = 'view_details'
+    st.rerun()
+
+def show_flight_results(key, destination=None, date=None, prefix=False):
+    # One page of matches at a time, sorted and sliced by the index layer, so a page
+    # costs the same whether ten or a million flights match. Selecting a row opens
+    # that flight's details. Returns the number of matches.
+    import pandas as pd
+    
+    # The controls are drawn below the query, so read their values from the session first
+    state = st.session_state
+    sort = FLIGHT_SORT_LABELS[state.get(f"{key}_sort", "Departure")]
+    descending = state.get(f"{key}_order", "Ascending") == "Descending"
+    page_size = state.get(f"{key}_page_size", RESULT_PAGE_SIZES[1])
+    page = state.get(f"{key}_page", 1)
+    
+    views = get_views()
+    total, flights = views.flight_page(destination, date, sort, descending, page - 1, page_size, prefix)
+    if not total:
+        return 0
+    pages = -(-total // page_size)
+    if page > pages:
+        page = state[f"{key}_page"] = pages
+        total, flights = views.flight_page(destination, date, sort, descending, page - 1, page_size, prefix)
+    
+    col1, col2, col3, col4 = st.columns(4)
+    col1.selectbox("Sort by", list(FLIGHT_SORT_LABELS), key=f"{key}_sort")
+    col2.selectbox("Order", ["Ascending", "Descending"], key=f"{key}_order")
+    col3.selectbox("Per page", RESULT_PAGE_SIZES, index=1, key=f"{key}_page_size")
+    col4.number_input("Page", min_value=1, max_value=pages, step=1, key=f"{key}_page")
+    
+    first = (page - 1) * page_size + 1
+    st.caption(f"Flights {first}–{first + len(flights) - 1} of {total} · page {page} of {pages} · "
+               "select a row to view its details")
+    frame = pd.DataFrame.from_records(flights, columns=list(RESULT_COLUMNS)).rename(columns=RESULT_COLUMNS)
+    event = st.dataframe(frame, hide_index=True, use_container_width=True, on_select="rerun",
+                         selection_mode="single-row", key=f"{key}_table")
+    if event.selection.rows:
+        open_flight_details(flights[event.selection.rows[0]].flight_number)
+    return total
+
+@timed(PAGE_SECONDS, "home")
 def show_home_page():
     st.markdown("### 🌸 Welcome to Sakura Airlines!")
     
@@ -301,22 +191,14 @@ def show_home_page():
         """)
 
     # Display current flights overview
-    if st.session_state.airline_system.flights:
+    views = get_views()
+    if views.has_flights():
         st.markdown("### Today's Flights")
         today = datetime.datetime.now().strftime("%Y-%m-%d")
-        today_flights = st.session_state.airline_system.find_flights(date=today)
-        
-        if today_flights:
-            for flight in today_flights:
-                with st.expander(f"Flight {flight.get_flight_number()} to {flight.get_destination()}"):
-                    col1, col2 = st.columns(2)
-                    with col1:
-                        st.write(f"Departure: {flight.get_departure_time()}")
-                        st.write(f"Gate: {flight.get_gate_number()}")
-                    with col2:
-                        available_seats = flight.get_available_seats()
-                        st.write(f"Available Seats: {len(available_seats)}")
+        if not show_flight_results("today", date=today):
+            st.write("No flights depart today.")
 
+@timed(PAGE_SECONDS, "add_flight")
 def show_add_flight_page():
     st.markdown("### ✈️ Add New Flight")
     
@@ -327,6 +209,7 @@ def show_add_flight_page():
         departure_time = st.time_input("Departure Time")
         arrival_time = st.time_input("Arrival Time")
         gate_number = st.text_input("Gate Number")
+        aircraft_type = st.selectbox("Aircraft", list(AIRCRAFT_LAYOUTS))
         
         submit = st.form_submit_button("Add Flight")
         
@@ -347,7 +230,8 @@ def show_add_flight_page():
                     destination.capitalize(),
                     departure_time.strftime("%H:%M"),
                     arrival_time.strftime("%H:%M"),
-                    gate_number
+                    gate_number,
+                    aircraft_type
                 )
                 
                 if st.session_state.airline_system.add_flight(flight):
@@ -357,48 +241,99 @@ def show_add_flight_page():
             except Exception as e:
                 st.error(f"Error adding flight: {str(e)}")
 
+    st.markdown("### 📥 Import Schedule")
+    schedule_file = st.file_uploader(
+        "Schedule file (CSV or Parquet) with columns: " + ", ".join(FLIGHT_COLUMNS) + " (optional)",
+        type=["csv", "parquet"]
+    )
+    
+    if schedule_file is not None and st.button("Import Schedule"):
+        from airline.schedule_import import import_schedule
+        
+        try:
+            with st.spinner("Importing schedule..."):
+                report = import_schedule(st.session_state.airline_system, schedule_file)
+        except Exception as e:
+            st.error(f"Error importing schedule: {str(e)}")
+            return
+        
+        st.success(f"Imported {report.accepted} flights")
+        if report.rejected:
+            rejected_rows = report.get_rejected_rows()
+            st.warning(f"Rejected {report.rejected} rows")
+            st.dataframe(rejected_rows, hide_index=True)
+            st.download_button(
+                "Download rejected rows",
+                rejected_rows.to_csv(index=False),
+                file_name="rejected_rows.csv",
+                mime="text/csv"
+            )
+
+@timed(PAGE_SECONDS, "search_flights")
 def show_search_flights_page():
     st.markdown("### 🔍 Search Flights")
     
-    destination = st.text_input("Destination (optional)")
+    destination = st.text_input("Destination (optional)", key="search_destination")
+    text = destination.strip().lower()
+    suggestions = get_views().suggest_destinations(text) if text else ()
+    # Nothing to suggest once the box holds a whole destination
+    if suggestions and [name.lower() for name in suggestions] != [text]:
+        # Near spellings only come back when no destination starts with the text
+        st.caption("Suggestions" if suggestions[0].lower().startswith(text) else "Did you mean")
+        for column, name in zip(st.columns(len(suggestions)), suggestions):
+            column.button(name, key=f"suggest_{name}", on_click=pick_destination, args=(name,))
     date = st.date_input("Date (optional)", None)
     
     if st.button("Search"):
-        date_str = date.strftime("%Y-%m-%d") if date else None
-        flights = st.session_state.airline_system.find_flights(
-            destination if destination else None,
-            date_str
-        )
+        # Kept in the session so paging and sorting rerun the same search
+        st.session_state.flight_search = (destination.strip() or None,
+                                          date.strftime("%Y-%m-%d") if date else None)
+        st.session_state.search_page = 1
+    
+    if st.session_state.get("flight_search"):
+        search_destination, search_date = st.session_state.flight_search
+        # A partial destination matches every destination starting with it
+        if not show_flight_results("search", search_destination, search_date, prefix=True):
+            st.warning("No flights found matching your criteria.")
+
+    st.markdown("### 💺 Seat Availability")
+    
+    with st.form("availability_form"):
+        col1, col2 = st.columns(2)
+        with col1:
+            availability_destination = st.text_input("Destination")
+            today = datetime.date.today()
+            date_range = st.date_input("Travel dates", (today, today + datetime.timedelta(days=7)))
+        with col2:
+            cabin = st.selectbox("Cabin", ["Any", "First", "Business", "Economy"])
+            min_free = st.number_input("Seats needed", min_value=1, max_value=50, value=1)
         
-        if flights:
-            st.success(f"Found {len(flights)} flights matching your criteria")
+        if st.form_submit_button("Find Seats"):
+            date_range = list(date_range) if isinstance(date_range, (list, tuple)) else [date_range]
+            date_from = date_range[0].strftime("%Y-%m-%d") if date_range else None
+            date_to = date_range[-1].strftime("%Y-%m-%d") if date_range else None
+            results = get_views().search_availability(
+                availability_destination or None,
+                date_from,
+                date_to,
+                None if cabin == "Any" else cabin,
+                int(min_free)
+            )
             
-            for flight in flights:
-                with st.expander(f"Flight {flight.get_flight_number()} to {flight.get_destination()}"):
-                    col1, col2 = st.columns(2)
-                    with col1:
-                        st.write(f"Date: {flight.get_flight_date()}")
-                        st.write(f"Time: {flight.get_departure_time()} - {flight.get_arrival_time()}")
-                        st.write(f"Gate: {flight.get_gate_number()}")
-                    with col2:
-                        available_seats = flight.get_available_seats()
-                        st.write(f"Available Seats: {len(available_seats)}")
-                        if len(available_seats) == 0:
-                            st.warning("FULLY BOOKED")
-        else:
-            st.warning("No flights found matching your criteria.")
+            if results.empty:
+                st.warning("No flights have enough free seats for this search.")
+            else:
+                st.success(f"Found {len(results)} flights with free seats")
+                st.dataframe(results, hide_index=True)
 
+@timed(PAGE_SECONDS, "view_details")
 def show_flight_details_page():
     st.markdown("### 📋 View Flight Details")
     
-    flight_number = st.text_input("Enter Flight Number")
+    flight_number = st.text_input("Enter Flight Number", key="details_flight_number")
     
     if flight_number:
-        flight = None
-        for f in st.session_state.airline_system.flights:
-            if f.get_flight_number() == flight_number:
-                flight = f
-                break
+        flight = st.session_state.airline_system.get_flight(flight_number)
         
         if flight:
             st.success(f"Flight {flight_number} Details")
@@ -411,62 +346,75 @@ def show_flight_details_page():
                 st.write(f"Arrival Time: {flight.get_arrival_time()}")
             with col2:
                 st.write(f"Gate: {flight.get_gate_number()}")
-                available_seats = flight.get_available_seats()
-                st.write(f"Available Seats: {len(available_seats)}")
+                st.write(f"Aircraft: {flight.get_aircraft_type()}")
+                st.write(f"Available Seats: {flight.count_available_seats()}")
             
             # Display seat class information
             st.markdown("### Seat Class Information")
-            class_cols = st.columns(3)
+            cabins = get_views().cabin_summaries(flight)
+            class_cols = st.columns(len(cabins))
             
-            # First Class
-            with class_cols[0]:
-                st.markdown("#### First Class")
-                first_class_seat = next((seat for seat in flight.get_seats().values() 
-                                      if isinstance(seat, FirstClass)), None)
-                if first_class_seat:
-                    st.write(f"Price: VND {first_class_seat.get_price():,.0f}")
+            for class_col, cabin in zip(class_cols, cabins):
+                with class_col:
+                    st.markdown(f"#### {cabin.seat_class} Class")
+                    st.write(f"Price: VND {cabin.price:,.0f}")
+                    st.write(f"Available: {cabin.available_seats} of {cabin.capacity}")
                     st.write("Amenities:")
-                    for amenity in first_class_seat.get_amenities():
-                        st.write(f"- {amenity}")
-            
-            # Business Class
-            with class_cols[1]:
-                st.markdown("#### Business Class")
-                business_class_seat = next((seat for seat in flight.get_seats().values() 
-                                         if isinstance(seat, BusinessClassSeat)), None)
-                if business_class_seat:
-                    st.write(f"Price: VND {business_class_seat.get_price():,.0f}")
-                    st.write("Amenities:")
-                    for amenity in business_class_seat.get_amenities():
-                        st.write(f"- {amenity}")
-            
-            # Economy Class
-            with class_cols[2]:
-                st.markdown("#### Economy Class")
-                economy_class_seat = next((seat for seat in flight.get_seats().values() 
-                                        if isinstance(seat, EconomyClassSeat)), None)
-                if economy_class_seat:
-                    st.write(f"Price: VND {economy_class_seat.get_price():,.0f}")
-                    st.write("Amenities:")
-                    for amenity in economy_class_seat.get_amenities():
+                    for amenity in cabin.amenities:
                         st.write(f"- {amenity}")
             
             # Display seat map
             create_seat_map(flight)
+            
+            with st.expander("Passenger Manifest"):
+                show_manifest(flight)
         else:
             st.error("Flight not found. Please check the flight number.")
 
+EXPORT_MIME_TYPES = {"csv": "text/csv", "jsonl": "application/x-ndjson",
+                     "parquet": "application/vnd.apache.parquet"}
+
+def export_bytes(flight_numbers, fmt, boarding=False):
+    # Downloads need the whole file, but rows still stream into it one flight at a time
+    buffer = io.BytesIO()
+    system = st.session_state.airline_system
+    if fmt == "parquet":
+        export_manifest(system, flight_numbers, fmt, buffer, boarding)
+    else:
+        text = io.TextIOWrapper(buffer, encoding="utf-8", newline="")
+        export_manifest(system, flight_numbers, fmt, text, boarding)
+        text.flush()
+        text.detach()
+    return buffer.getvalue()
+
+def show_manifest(flight):
+    import pandas as pd
+    
+    flight_number = flight.get_flight_number()
+    rows = st.session_state.airline_system.get_manifest(flight_number)
+    st.caption(f"{len(rows)} confirmed passengers")
+    if rows:
+        st.dataframe(pd.DataFrame(rows, columns=MANIFEST_COLUMNS), hide_index=True)
+    fmt = st.selectbox("Export format", EXPORT_FORMATS, key="manifest_format")
+    col1, col2 = st.columns(2)
+    col1.download_button("Download Manifest", export_bytes([flight_number], fmt),
+                         file_name=f"{flight_number}-manifest.{fmt}", mime=EXPORT_MIME_TYPES[fmt])
+    col2.download_button("Download Boarding List", export_bytes([flight_number], fmt, boarding=True),
+                         file_name=f"{flight_number}-boarding.{fmt}", mime=EXPORT_MIME_TYPES[fmt])
+
+def release_session_hold():
+    hold = st.session_state.pop('seat_hold', None)
+    if hold is not None:
+        st.session_state.airline_system.release_hold(hold)
+
+@timed(PAGE_SECONDS, "book_flight")
 def show_booking_page():
     st.markdown("### 🎫 Book a Flight")
     
     flight_number = st.text_input("Enter Flight Number")
     
     if flight_number:
-        flight = None
-        for f in st.session_state.airline_system.flights:
-            if f.get_flight_number() == flight_number:
-                flight = f
-                break
+        flight = st.session_state.airline_system.get_flight(flight_number)
         
         if flight:
             st.success(f"Booking for Flight {flight_number}")
@@ -480,12 +428,52 @@ def show_booking_page():
                 st.write(f"Time: {flight.get_departure_time()} - {flight.get_arrival_time()}")
             with col2:
                 st.write(f"Gate: {flight.get_gate_number()}")
-                available_seats = flight.get_available_seats()
-                st.write(f"Available Seats: {len(available_seats)}")
+                st.write(f"Available Seats: {flight.count_available_seats()}")
             
             # Display seat map
             create_seat_map(flight)
             
+            booking_type = st.radio("Booking Type", ["Single Passenger", "Group", "Waitlist"], horizontal=True)
+            if booking_type == "Group":
+                release_session_hold()
+                show_group_booking_form(flight)
+                return
+            if booking_type == "Waitlist":
+                release_session_hold()
+                show_waitlist_form(flight)
+                return
+            
+            # Seat selection: the chosen seat is held while the passenger fills in the form
+            st.markdown("#### Seat Selection")
+            hold = st.session_state.get('seat_hold')
+            if hold is not None and (hold.flight.get_flight_number() != flight.get_flight_number()
+                                     or not st.session_state.airline_system.is_hold_active(hold)):
+                release_session_hold()
+                hold = None
+            
+            if hold is None:
+                available_seat_numbers = get_views().available_seat_numbers(flight)
+                if not available_seat_numbers:
+                    st.error("No seats available on this flight. Choose Waitlist to be booked "
+                             "automatically when a seat frees up.")
+                    return
+                seat_number = st.selectbox("Choose a seat", available_seat_numbers)
+                if st.button("Hold Seat"):
+                    hold = st.session_state.airline_system.hold_seat(flight, seat_number)
+                    if hold is None:
+                        st.error("That seat was just taken, please choose another")
+                    else:
+                        st.session_state.seat_hold = hold
+                        st.rerun()
+                st.info(f"Hold a seat to continue. Held seats are kept for {SEAT_HOLD_TTL // 60} minutes.")
+                return
+            
+            minutes, seconds = divmod(int(hold.remaining()), 60)
+            st.info(f"Seat {hold.seat_number} is held for you for {minutes}:{seconds:02d} more minutes")
+            if st.button("Release Seat"):
+                release_session_hold()
+                st.rerun()
+            
             # Booking form
             with st.form("booking_form"):
                 st.markdown("#### Passenger Information")
@@ -500,14 +488,6 @@ def show_booking_page():
                     email = st.text_input("Email (optional)")
                     phone = st.text_input("Phone (optional)")
                 
-                st.markdown("#### Seat Selection")
-                available_seat_numbers = [seat.seat_number for seat in available_seats]
-                if available_seat_numbers:
-                    seat_number = st.selectbox("Choose a seat", available_seat_numbers)
-                else:
-                    st.error("No seats available on this flight")
-                    return
-                
                 st.markdown("#### Payment")
                 payment_methods = ["Credit Card", "Momo", "VNPay", "ZaloPay", "Banking Transfer"]
                 payment_method = st.selectbox("Payment Method", payment_methods)
@@ -525,11 +505,13 @@ def show_booking_page():
                             age, email, phone
                         )
                         
-                        reservation = st.session_state.airline_system.create_reservation(
-                            passenger, flight, seat_number, payment_method.lower()
-                        )
+                        with st.spinner("Processing payment..."):
+                            reservation = st.session_state.airline_system.create_reservation(
+                                passenger, flight, hold.seat_number, payment_method.lower(), hold
+                            )
                         
                         if reservation:
+                            del st.session_state.seat_hold
                             st.success(f"""
                                 Reservation confirmed!
                                 Reservation ID: {reservation._reservation_id}
@@ -542,42 +524,401 @@ def show_booking_page():
         else:
             st.error("Flight not found. Please check the flight number.")
 
+MAX_GROUP_SIZE = 9
+
+def show_group_booking_form(flight):
+    import pandas as pd
+    
+    st.markdown("#### Group Seating")
+    cabins = [cabin.seat_class for cabin in flight.get_layout().cabins]
+    col1, col2 = st.columns(2)
+    with col1:
+        seat_class = st.selectbox("Cabin", cabins)
+        st.caption(f"{flight.count_available_seats(seat_class)} {seat_class} seats free")
+    with col2:
+        group_size = st.number_input("Passengers", min_value=2, max_value=MAX_GROUP_SIZE, value=2)
+    st.info("Seats are assigned together, side by side where possible, and the whole group "
+            "is booked or none of it is.")
+    
+    with st.form("group_booking_form"):
+        st.markdown("#### Passenger Information")
+        details = []
+        for i in range(int(group_size)):
+            with st.expander(f"Passenger {i + 1}", expanded=True):
+                col1, col2 = st.columns(2)
+                with col1:
+                    first_name = st.text_input("First Name", key=f"group_first_name_{i}")
+                    last_name = st.text_input("Last Name", key=f"group_last_name_{i}")
+                    passport_number = st.text_input("Passport Number", key=f"group_passport_{i}")
+                with col2:
+                    age = st.number_input("Age", min_value=0, max_value=150, key=f"group_age_{i}")
+                    email = st.text_input("Email (optional)", key=f"group_email_{i}")
+                    phone = st.text_input("Phone (optional)", key=f"group_phone_{i}")
+                details.append((passport_number, first_name, last_name, age, email, phone))
+        
+        st.markdown("#### Payment")
+        payment_methods = ["Credit Card", "Momo", "VNPay", "ZaloPay", "Banking Transfer"]
+        payment_method = st.selectbox("Payment Method", payment_methods)
+        
+        submit = st.form_submit_button("Book Group")
+        
+        if submit:
+            if not all(passport and first and last for passport, first, last, *_ in details):
+                st.error("Please fill in all required fields for every passenger")
+                return
+            if flight.count_available_seats(seat_class) < len(details):
+                st.error(f"Not enough free {seat_class} seats for {len(details)} passengers")
+                return
+            
+            try:
+                passengers = [Passenger(*passenger) for passenger in details]
+                with st.spinner("Processing payments..."):
+                    reservations = st.session_state.airline_system.create_group_reservation(
+                        passengers, flight, seat_class, payment_method.lower()
+                    )
+                
+                if reservations:
+                    st.success("Group reservation confirmed! Please save these IDs for future reference.")
+                    st.dataframe(pd.DataFrame({
+                        "Passenger": [r._passenger.get_full_name() for r in reservations],
+                        "Seat": [r._seat_number for r in reservations],
+                        "Reservation ID": [r._reservation_id for r in reservations],
+                    }), hide_index=True)
+                else:
+                    st.error("Failed to create group reservation. No seats were booked.")
+            except Exception as e:
+                st.error(f"Error creating reservation: {str(e)}")
+
+def show_waitlist_form(flight):
+    import pandas as pd
+    
+    st.markdown("#### Waitlist")
+    system = st.session_state.airline_system
+    cabins = [cabin.seat_class for cabin in flight.get_layout().cabins]
+    waiting = system.get_waitlist(flight.get_flight_number())
+    st.dataframe(pd.DataFrame({
+        "Cabin": cabins,
+        "Free Seats": [flight.count_available_seats(cabin) for cabin in cabins],
+        "Waiting": [sum(1 for entry in waiting if entry._seat_class == cabin) for cabin in cabins],
+    }), hide_index=True)
+    full_cabins = [cabin for cabin in cabins if flight.count_available_seats(cabin) == 0]
+    if not full_cabins:
+        st.info("Every cabin still has free seats, so there is no waitlist. Book a seat instead.")
+        return
+    st.info("When a seat in your cabin is cancelled or released it goes to the first passenger in line, "
+            "who is charged and booked automatically. Flex fares come first, then higher loyalty tiers, "
+            "then whoever joined earliest.")
+    
+    with st.form("waitlist_form"):
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            seat_class = st.selectbox("Cabin", full_cabins)
+        with col2:
+            fare_class = st.selectbox("Fare", FARE_CLASSES, index=FARE_CLASSES.index("Standard"))
+        with col3:
+            loyalty_tier = st.selectbox("Loyalty Tier", LOYALTY_TIERS, index=len(LOYALTY_TIERS) - 1)
+        
+        st.markdown("#### Passenger Information")
+        col1, col2 = st.columns(2)
+        with col1:
+            first_name = st.text_input("First Name", key="waitlist_first_name")
+            last_name = st.text_input("Last Name", key="waitlist_last_name")
+            passport_number = st.text_input("Passport Number", key="waitlist_passport")
+        with col2:
+            age = st.number_input("Age", min_value=0, max_value=150, key="waitlist_age")
+            email = st.text_input("Email (optional)", key="waitlist_email")
+            phone = st.text_input("Phone (optional)", key="waitlist_phone")
+        
+        st.markdown("#### Payment")
+        payment_methods = ["Credit Card", "Momo", "VNPay", "ZaloPay", "Banking Transfer"]
+        payment_method = st.selectbox("Payment Method", payment_methods, key="waitlist_payment_method")
+        st.caption("You are only charged if you are promoted into a seat.")
+        
+        submit = st.form_submit_button("Join Waitlist")
+        
+        if submit:
+            if not all([first_name, last_name, passport_number]):
+                st.error("Please fill in all required fields")
+                return
+            
+            try:
+                passenger = Passenger(passport_number, first_name, last_name, age, email, phone)
+                entry = system.join_waitlist(passenger, flight, seat_class, payment_method.lower(),
+                                             fare_class, loyalty_tier)
+                
+                if entry is None:
+                    st.error(f"A {seat_class} seat has just freed up. Please book it instead.")
+                elif entry.status == "Promoted":
+                    st.success(f"A seat freed up straight away! Seat {entry._reservation._seat_number} is "
+                               f"booked, reservation ID {entry._reservation._reservation_id}.")
+                elif entry.status == "Payment Failed":
+                    st.error("A seat freed up but the payment failed, so you were not booked.")
+                else:
+                    st.success(f"You are on the {seat_class} waitlist. Entry ID: {entry._entry_id}. "
+                               "Check your place in line on the My Bookings page.")
+            except Exception as e:
+                st.error(f"Error joining the waitlist: {str(e)}")
+
+@timed(PAGE_SECONDS, "cancel")
 def show_cancel_page():
     st.markdown("### ❌ Cancel Reservation")
     
     reservation_id = st.text_input("Enter Reservation ID")
     
     if reservation_id:
-        found = False
-        for reservation in st.session_state.airline_system.reservations:
-            if reservation._reservation_id == reservation_id:
-                found = True
-                
-                if reservation.status == "Confirmed":
-                    st.write("#### Reservation Details")
-                    st.write(f"Passenger: {reservation._passenger.get_full_name()}")
-                    st.write(f"Flight: {reservation._flight.get_flight_number()}")
-                    st.write(f"Seat: {reservation._seat_number}")
-                    
-                    if st.button("Cancel Reservation"):
-                        if reservation.cancel_reservation():
-                            refund_amount = reservation._payment.get_amount()
-                            refund_method = reservation._payment.get_payment()
-                            
-                            st.success("Reservation cancelled successfully")
-                            st.write(f"Refund Amount: VND {refund_amount:,.0f}")
-                            st.write(f"Refund Method: {refund_method.capitalize()}")
-                        else:
-                            st.error("Failed to cancel reservation")
-                else:
-                    st.warning("This reservation is already cancelled or pending")
-                break
+        reservation = st.session_state.airline_system.get_reservation(reservation_id)
         
-        if not found:
+        if reservation is None:
             st.error("Reservation not found. Please check the reservation ID.")
+        elif reservation.status == "Confirmed":
+            st.write("#### Reservation Details")
+            st.write(f"Passenger: {reservation._passenger.get_full_name()}")
+            st.write(f"Flight: {reservation._flight.get_flight_number()}")
+            st.write(f"Seat: {reservation._seat_number}")
+            
+            if st.button("Cancel Reservation"):
+                cancelled = st.session_state.airline_system.cancel_reservation(reservation_id)
+                if cancelled is not None:
+                    refund_amount = cancelled._payment.get_amount()
+                    refund_method = cancelled._payment.get_payment()
+                    
+                    st.success("Reservation cancelled successfully")
+                    if cancelled._payment.get_status() == "Refund Failed":
+                        st.warning("The refund could not be processed. Please contact support "
+                                   f"with your reservation ID {reservation_id}.")
+                    st.write(f"Refund Amount: VND {refund_amount:,.0f}")
+                    st.write(f"Refund Method: {refund_method.capitalize()}")
+                else:
+                    st.error("Failed to cancel reservation")
+        else:
+            st.warning("This reservation is already cancelled or pending")
 
+@timed(PAGE_SECONDS, "my_bookings")
+def show_my_bookings_page():
+    import pandas as pd
+    
+    st.markdown("### 🧾 My Bookings")
+    
+    passport_number = st.text_input("Enter Passport Number")
+    include_cancelled = st.checkbox("Include cancelled bookings")
+    
+    if passport_number:
+        system = st.session_state.airline_system
+        bookings = system.find_bookings(passport_number, include_cancelled)
+        # Only entries still in line are kept; promoted ones show up among the bookings
+        entries = system.find_waitlist_entries(passport_number)
+        
+        if bookings:
+            st.dataframe(pd.DataFrame([{
+                "Reservation ID": reservation._reservation_id,
+                "Passenger": reservation._passenger.get_full_name(),
+                "Flight": reservation._flight.get_flight_number(),
+                "Destination": reservation._flight.get_destination(),
+                "Date": reservation._flight.get_flight_date(),
+                "Seat": reservation._seat_number,
+                "Status": reservation.status,
+                "Payment": reservation._payment.get_status() if reservation._payment else "",
+            } for reservation in bookings]), hide_index=True)
+        elif not entries:
+            st.warning("No bookings found for this passport number.")
+        
+        if entries:
+            st.markdown("#### Waitlist")
+            st.dataframe(pd.DataFrame([{
+                "Entry ID": entry._entry_id,
+                "Flight": entry._flight_number,
+                "Cabin": entry._seat_class,
+                "Fare": entry._fare_class,
+                "Loyalty Tier": entry._loyalty_tier,
+                "Status": entry.status,
+                "Place in Line": position,
+                "Reservation ID": entry._reservation._reservation_id if entry._reservation else None,
+            } for entry, position in entries]), hide_index=True)
+            waiting = [entry for entry, _ in entries if entry.status == "Waiting"]
+            if waiting:
+                entry = st.selectbox("Waitlist entry", waiting,
+                                     format_func=lambda entry: f"{entry._entry_id} · Flight {entry._flight_number} "
+                                                               f"{entry._seat_class}")
+                if st.button("Leave Waitlist"):
+                    system.leave_waitlist(entry._flight_number, entry._entry_id)
+                    st.rerun()
+
+@timed(PAGE_SECONDS, "dashboard")
+def show_dashboard_page():
+    st.markdown("### 📊 Fleet Dashboard")
+    
+    analytics = get_fleet_analytics()
+    summary = analytics.summary()
+    
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Load Factor", f"{summary['load_factor']:.1%}")
+    col2.metric("Revenue", f"VND {summary['revenue']:,.0f}")
+    col3.metric("Refunds", f"VND {summary['refunds']:,.0f}")
+    col4.metric("Cancellation Rate", f"{summary['cancellation_rate']:.1%}")
+    
+    if summary["flights"] == 0:
+        st.info("No flights scheduled yet.")
+        return
+    
+    st.markdown("#### Load Factor by Date")
+    st.line_chart(analytics.load_factor("Date"), x="Date", y="Load Factor")
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        st.markdown("#### Load Factor by Cabin")
+        st.bar_chart(analytics.load_factor("Cabin"), x="Cabin", y="Load Factor")
+    with col2:
+        st.markdown("#### Revenue by Payment Method")
+        revenue = analytics.revenue_by_payment_method()
+        if revenue.empty:
+            st.write("No confirmed bookings yet.")
+        else:
+            st.bar_chart(revenue, x="Method", y="Revenue")
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        st.markdown("#### Refunds by Payment Method")
+        st.dataframe(analytics.refund_totals(), hide_index=True)
+    with col2:
+        st.markdown("#### Cancellation Rate by Date")
+        st.dataframe(analytics.cancellation_rate("Date"), hide_index=True)
+    
+    st.markdown("#### Busiest Flights")
+    by_flight = analytics.load_factor("Flight")
+    st.dataframe(by_flight.nlargest(20, "Load Factor"), hide_index=True)
+
+def _latency_frame(family):
+    import pandas as pd
+    
+    # Bucket upper bounds stand in for the quantiles, as Prometheus' histogram_quantile does
+    def ms(seconds):
+        return None if seconds is None or seconds == float("inf") else seconds * 1000
+    
+    records = []
+    for labels, child in family.children():
+        if not child.count:
+            continue
+        records.append({
+            family.labelnames[0].capitalize() if family.labelnames else "Name": " ".join(labels) if labels else family.name,
+            "Calls": child.count,
+            "Mean (ms)": child.sum / child.count * 1000,
+            "p50 ≤ (ms)": ms(child.quantile(0.50)),
+            "p95 ≤ (ms)": ms(child.quantile(0.95)),
+            "p99 ≤ (ms)": ms(child.quantile(0.99)),
+            "Total (s)": child.sum,
+        })
+    return pd.DataFrame.from_records(records).sort_values("Total (s)", ascending=False) if records else None
+
+RECENT_BOOKING_WINDOWS = {"hour": datetime.timedelta(hours=1), "day": datetime.timedelta(days=1),
+                          "week": datetime.timedelta(days=7)}
+RECENT_BOOKING_ROWS = 500
+
+@timed(PAGE_SECONDS, "admin")
+def show_admin_page():
+    import pandas as pd
+    
+    st.markdown("### 🛠️ Admin")
+    
+    if not metrics.ENABLED:
+        st.warning("Instrumentation is disabled (SAKURA_METRICS=0); only index sizes are shown.")
+    
+    st.markdown("#### Counters")
+    counters = {family.name: sum(child.value for _, child in family.children())
+                for family in REGISTRY.families() if family.kind == "counter"}
+    columns = st.columns(len(counters) or 1)
+    for column, (name, value) in zip(columns, counters.items()):
+        column.metric(name.replace("sakura_", "").replace("_", " ").capitalize(), f"{value:,}")
+    
+    st.markdown("#### Index Sizes")
+    system = st.session_state.airline_system
+    view_cache = get_views().cache
+    sizes = system.index_sizes()
+    sizes.update(view_cache=len(view_cache))
+    st.dataframe(pd.DataFrame({"Index": list(sizes), "Entries": list(sizes.values())}), hide_index=True)
+    lookups = view_cache.hits + view_cache.misses
+    st.caption(f"System revision {system.get_revision():,} · view cache hit rate "
+               f"{view_cache.hits / lookups if lookups else 0:.1%} over {lookups:,} lookups")
+    
+    for title, family in (("Core Operations", OPERATION_SECONDS), ("Page Renders", PAGE_SECONDS),
+                          ("Script Reruns", SCRIPT_SECONDS), ("API Requests", API_SECONDS)):
+        st.markdown(f"#### {title}")
+        frame = _latency_frame(family)
+        if frame is None:
+            st.write("No calls recorded yet.")
+        else:
+            st.dataframe(frame, hide_index=True)
+    
+    with st.expander("Prometheus metrics"):
+        exposition = REGISTRY.exposition()
+        port = os.environ.get("SAKURA_METRICS_PORT")
+        st.caption(f"Scraped from http://<host>:{port}/metrics" if port
+                   else "Set SAKURA_METRICS_PORT to serve these at /metrics")
+        st.code(exposition, language="text")
+        st.download_button("Download", exposition, file_name="metrics.txt", mime="text/plain")
+    
+    st.markdown("#### Recent Bookings")
+    window = st.selectbox("Booked in the last", list(RECENT_BOOKING_WINDOWS), key="recent_window")
+    # One row past the page says whether there are more
+    recent = system.find_reservations_between(
+        datetime.datetime.now() - RECENT_BOOKING_WINDOWS[window], include_cancelled=True,
+        limit=RECENT_BOOKING_ROWS + 1)
+    if recent:
+        st.caption("Newest first" + (f"; only the latest {RECENT_BOOKING_ROWS} are listed"
+                                     if len(recent) > RECENT_BOOKING_ROWS else ""))
+        st.dataframe(pd.DataFrame([{
+            "Booked": reservation.get_reservation_date().strftime("%Y-%m-%d %H:%M:%S"),
+            "Reservation ID": reservation._reservation_id,
+            "Passenger": reservation._passenger.get_full_name(),
+            "Flight": reservation._flight.get_flight_number(),
+            "Seat": reservation._seat_number,
+            "Status": reservation.status,
+        } for reservation in recent[:RECENT_BOOKING_ROWS]]), hide_index=True)
+    else:
+        st.write("No bookings in this window.")
+    
+    st.markdown("#### Departure Exports")
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        export_date = st.date_input("Departure date", key="export_date")
+    with col2:
+        export_kind = st.selectbox("Export", ["Manifests", "Boarding Lists"], key="export_kind")
+    with col3:
+        export_format = st.selectbox("Format", EXPORT_FORMATS, key="export_format")
+    if st.button("Prepare Export"):
+        date = export_date.strftime("%Y-%m-%d")
+        with st.spinner(f"Exporting every flight departing {date}..."):
+            st.session_state.departure_export = (
+                f"{date}-{export_kind.lower().replace(' ', '-')}.{export_format}",
+                export_bytes(departure_flight_numbers(system, date), export_format,
+                             boarding=export_kind == "Boarding Lists"))
+    if 'departure_export' in st.session_state:
+        file_name, data = st.session_state.departure_export
+        st.download_button(f"Download {file_name}", data, file_name=file_name,
+                           mime=EXPORT_MIME_TYPES[file_name.rsplit(".", 1)[1]])
+    
+    st.markdown("#### Sampling Profiler")
+    profiler = get_profiler()
+    col1, col2, col3 = st.columns(3)
+    if profiler.is_running():
+        if col1.button("Stop Profiler"):
+            profiler.stop()
+    elif col1.button("Start Profiler"):
+        profiler.start()
+    if col2.button("Reset Samples"):
+        profiler.reset()
+    col3.write(f"{'Running' if profiler.is_running() else 'Stopped'} · {profiler.samples:,} samples "
+               f"every {profiler.interval * 1000:g} ms")
+    top = profiler.top(25)
+    if top:
+        st.dataframe(pd.DataFrame(top, columns=["Function", "Self Samples", "Total Samples"]),
+                     hide_index=True)
+        st.download_button("Download folded stacks", profiler.collapsed(),
+                           file_name="profile.folded", mime="text/plain")
+
+@timed(SCRIPT_SECONDS)
 def main():
     st.set_page_config(page_title="Sakura Airlines", layout="wide")
+    init_session_state()
     
     # Custom CSS
     st.markdown("""
@@ -597,9 +938,8 @@ def main():
     # Header
     st.markdown('<p class="big-font">🌸 Sakura Airlines Reservation System</p>', unsafe_allow_html=True)
 
-    # Initialize AirlineSystem if not already initialized
-    if st.session_state.airline_system is None:
-        st.session_state.airline_system = AirlineSystem()
+    # Every session works on the shared, process-wide AirlineSystem
+    st.session_state.airline_system = get_airline_system()
 
     # Sidebar navigation
     with st.sidebar:
@@ -617,6 +957,16 @@ def main():
             st.session_state.current_page = 'book_flight'
         if st.button("❌ Cancel Reservation"):
             st.session_state.current_page = 'cancel'
+        if st.button("🧾 My Bookings"):
+            st.session_state.current_page = 'my_bookings'
+        if st.button("📊 Dashboard"):
+            st.session_state.current_page = 'dashboard'
+        if st.button("🛠️ Admin"):
+            st.session_state.current_page = 'admin'
+
+    # Leaving the booking page abandons any seat this session was holding
+    if st.session_state.current_page != 'book_flight':
+        release_session_hold()
 
     # Page content
     if st.session_state.current_page == 'home':
@@ -631,6 +981,12 @@ def main():
         show_booking_page()
     elif st.session_state.current_page == 'cancel':
         show_cancel_page()
+    elif st.session_state.current_page == 'my_bookings':
+        show_my_bookings_page()
+    elif st.session_state.current_page == 'dashboard':
+        show_dashboard_page()
+    elif st.session_state.current_page == 'admin':
+        show_admin_page()
 
 if __name__ == "__main__":
     main()
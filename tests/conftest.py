@@ -0,0 +1,52 @@
+import pytest
+
+from airline import AirlineSystem, SQLiteStorage
+from airline.payment_gateway import get_default_dispatcher, set_default_dispatcher
+
+from .support import make_flight, use_stub_payments
+
+
+@pytest.fixture(autouse=True)
+def payments():
+    # Every test pays through a local stub gateway; DECLINED cards never go through
+    previous = get_default_dispatcher()
+    dispatcher = use_stub_payments()
+    yield dispatcher
+    set_default_dispatcher(previous)
+    dispatcher.close()
+
+
+@pytest.fixture
+def system():
+    system = AirlineSystem()
+    system.add_flight(make_flight())
+    yield system
+    system.close()
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def any_system(request, tmp_path):
+    # An empty AirlineSystem, once in memory and once on SQLite
+    system = AirlineSystem(SQLiteStorage(str(tmp_path / "any.db")) if request.param == "sqlite" else None)
+    yield system
+    system.close()
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "sakura.db")
+
+
+@pytest.fixture
+def open_system(db_path):
+    # Opens AirlineSystems on one database file, closing them all at the end
+    systems = []
+
+    def open_():
+        system = AirlineSystem(SQLiteStorage(db_path))
+        systems.append(system)
+        return system
+
+    yield open_
+    for system in systems:
+        system.close()
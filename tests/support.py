@@ -0,0 +1,21 @@
+from airline import Flight, Passenger
+from airline.payment_gateway import PaymentDispatcher, StubGateway, set_default_dispatcher
+
+# Charges made with this payment method are always declined
+DECLINED = "declined card"
+
+
+def use_stub_payments():
+    # Also the initializer of shard processes, which pay through their own dispatcher
+    dispatcher = PaymentDispatcher(gateways={DECLINED: StubGateway(decline_rate=1.0)},
+                                   default_gateway=StubGateway())
+    set_default_dispatcher(dispatcher)
+    return dispatcher
+
+
+def make_flight(flight_number="SK100", aircraft_type="A321"):
+    return Flight(flight_number, "2026-12-01", "Tokyo", "08:00", "14:00", "G1", aircraft_type)
+
+
+def make_passengers(count, prefix="P"):
+    return [Passenger(f"{prefix}{i}", "Hana", f"Sato{i}", 30) for i in range(count)]
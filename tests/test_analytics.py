@@ -0,0 +1,60 @@
+import pytest
+
+from airline import AIRCRAFT_LAYOUTS, AirlineSystem, SQLiteStorage
+from airline.analytics import FleetAnalytics
+
+from .support import make_flight, make_passengers
+
+A321 = AIRCRAFT_LAYOUTS["A321"]
+
+
+def book(system, flight_number, seat_numbers, payment_method="credit card"):
+    flight = system.get_flight(flight_number)
+    return [system.create_reservation(passenger, flight, seat_number, payment_method)
+            for passenger, seat_number in zip(make_passengers(len(seat_numbers), flight_number), seat_numbers)]
+
+
+def test_load_factor_follows_bookings_made_after_the_snapshot(system):
+    analytics = FleetAnalytics.from_system(system)
+    book(system, "SK100", ["1A", "8A", "8B"])
+    by_cabin = analytics.load_factor("Cabin").set_index("Cabin")
+    assert by_cabin.loc["First", "Sold"] == 1
+    assert by_cabin.loc["Economy", "Sold"] == 2
+    assert by_cabin.loc["Economy", "Load Factor"] == pytest.approx(2 / 138)
+    by_flight = analytics.load_factor()
+    assert by_flight[["Flight", "Capacity", "Sold"]].values.tolist() == [["SK100", 166, 3]]
+
+
+def test_revenue_and_refunds_by_payment_method(system):
+    analytics = FleetAnalytics.from_system(system)
+    first, economy = book(system, "SK100", ["1A", "8A"])
+    cash = book(system, "SK100", ["8B"], "momo")[0]
+    system.cancel_reservation(cash._reservation_id)
+
+    first_price = A321.get_cabin("First").price
+    economy_price = A321.get_cabin("Economy").price
+    revenue = analytics.revenue_by_payment_method()
+    assert revenue.values.tolist() == [["credit card", first_price + economy_price, 2]]
+    assert analytics.refund_totals().values.tolist() == [["momo", economy_price, 1]]
+    assert analytics.cancellation_rate() == pytest.approx(1 / 3)
+    summary = analytics.summary()
+    assert (summary["bookings"], summary["revenue"], summary["refunds"]) == (
+        2, first_price + economy_price, economy_price)
+
+
+def test_a_snapshot_of_a_database_matches_the_live_one(tmp_path):
+    system = AirlineSystem(SQLiteStorage(str(tmp_path / "sakura.db")))
+    try:
+        system.add_flight(make_flight())
+        system.add_flight(make_flight("SK200", "B787"))
+        live = FleetAnalytics.from_system(system)
+        book(system, "SK100", ["1A", "8A"])
+        dropped = book(system, "SK200", ["10A"])[0]
+        system.cancel_reservation(dropped._reservation_id)
+
+        loaded = FleetAnalytics.from_system(system)
+        assert loaded.summary() == live.summary()
+        rates = loaded.cancellation_rate("Flight").set_index("Flight")["Cancellation Rate"]
+        assert rates.to_dict() == {"SK100": 0.0, "SK200": 1.0}
+    finally:
+        system.close()
@@ -0,0 +1,142 @@
+import asyncio
+import json
+import socket
+import threading
+
+import pytest
+
+from airline import Flight
+from airline.api import AirlineApi, ApiServer
+
+from .support import DECLINED
+
+
+@pytest.fixture
+def api(system):
+    for i in range(30):
+        system.add_flight(Flight(f"SK{200 + i}", "2026-12-02", "Osaka", "09:00", "10:30", "G2"))
+    api = AirlineApi(system)
+    yield api
+    api.close()
+
+
+def call(api, method, path, body=None):
+    status, payload = asyncio.run(api.dispatch(method, path, json.dumps(body).encode() if body else b""))
+    return status, json.loads(payload) if isinstance(payload, bytes) else payload
+
+
+def test_flight_search_is_always_paged(api):
+    status, found = call(api, "GET", "/flights")
+    assert status == 200
+    assert (found["total"], found["page"], found["page_size"], len(found["flights"])) == (31, 0, 25, 25)
+    status, found = call(api, "GET", "/flights?destination=osaka&page=1&page_size=20")
+    assert (found["total"], len(found["flights"])) == (30, 10)
+    status, found = call(api, "GET", "/flights?date_from=2026-12-01&date_to=2026-12-02&page_size=5")
+    assert (found["total"], len(found["flights"])) == (31, 5)
+    assert call(api, "GET", "/flights?page_size=0")[0] == 400
+
+
+def test_searches_and_lookups_run_on_the_thread_pool(api):
+    threads = []
+    for route in api._routes:
+        handler = route[2]
+        if handler in (api.search_flights, api.suggest_destinations, api.flight_details):
+            def record(params, query, body, handler=handler):
+                threads.append(threading.current_thread().name)
+                return handler(params, query, body)
+            api._routes[api._routes.index(route)] = route[:2] + (record, route[3])
+    for path in ("/flights", "/destinations?prefix=os", "/flights/SK100"):
+        assert call(api, "GET", path)[0] == 200
+    assert len(threads) == 3 and all(name.startswith("api") for name in threads)
+
+
+@pytest.mark.parametrize("length", ["abc", "-5", "1e3"])
+def test_a_malformed_content_length_is_answered_with_400(system, length):
+    server = ApiServer(system)
+    try:
+        with socket.create_connection(("127.0.0.1", server.port), timeout=5) as client:
+            client.sendall(f"POST /availability HTTP/1.1\r\nContent-Length: {length}\r\n\r\n".encode())
+            response = client.recv(4096).decode()
+        assert response.startswith("HTTP/1.1 400 ")
+        assert "Malformed Content-Length" in response
+    finally:
+        server.close()
+
+
+def passenger(i):
+    return {"passport_number": f"P{i}", "first_name": "Hana", "last_name": f"Sato{i}", "age": 30}
+
+
+def test_a_booking_can_be_read_back_and_cancelled(api):
+    status, booked = call(api, "POST", "/bookings", {"flight_number": "SK100", "seat_number": "10A",
+                                                     "passenger": passenger(1)})
+    assert status == 201 and booked["status"] == "Confirmed" and booked["payment_status"] == "Completed"
+    assert call(api, "GET", f"/bookings/{booked['reservation_id']}") == (200, booked)
+    assert call(api, "POST", "/bookings", {"flight_number": "SK100", "seat_number": "10A",
+                                           "passenger": passenger(2)})[0] == 409
+
+    status, cancelled = call(api, "DELETE", f"/bookings/{booked['reservation_id']}")
+    assert status == 200 and cancelled["status"] == "Cancelled" and cancelled["payment_status"] == "Refunded"
+    assert call(api, "DELETE", f"/bookings/{booked['reservation_id']}")[0] == 409
+    assert call(api, "GET", "/bookings/12345")[0] == 404
+
+
+@pytest.mark.parametrize("method, path, body, status", [
+    ("POST", "/bookings", {"flight_number": "SK999", "seat_number": "10A", "passenger": passenger(1)}, 404),
+    ("POST", "/bookings", {"flight_number": "SK100", "seat_number": "99Z", "passenger": passenger(1)}, 400),
+    ("POST", "/bookings", {"flight_number": "SK100", "seat_number": "10A", "passenger": {"age": 3}}, 400),
+    ("POST", "/bookings", {"flight_number": "SK100", "seat_number": "10A", "passenger": passenger(1),
+                           "payment_method": DECLINED}, 402),
+    ("DELETE", "/flights", None, 405),
+    ("GET", "/nowhere", None, 404),
+])
+def test_bad_requests_get_the_matching_status(api, method, path, body, status):
+    assert call(api, method, path, body)[0] == status
+
+
+def test_recent_bookings_page_newest_first(api):
+    booked = [call(api, "POST", "/bookings", {"flight_number": "SK100", "seat_number": f"{10 + i}A",
+                                              "passenger": passenger(i)})[1]["reservation_id"]
+              for i in range(5)]
+    pages = []
+    path = "/bookings?page_size=2"
+    while path:
+        status, page = call(api, "GET", path)
+        assert status == 200
+        pages.append([reservation["reservation_id"] for reservation in page["reservations"]])
+        path = page["next_before"] and f"/bookings?page_size=2&before={page['next_before']}"
+    assert [reservation_id for page in pages for reservation_id in page] == booked[::-1]
+    assert call(api, "GET", "/bookings?before=abc")[0] == 400
+
+
+def test_a_batch_answers_its_requests_in_order(api):
+    status, batch = call(api, "POST", "/batch", {"requests": [
+        {"method": "POST", "path": "/bookings",
+         "body": {"flight_number": "SK100", "seat_number": "10A", "passenger": passenger(1)}},
+        {"method": "POST", "path": "/availability", "body": {"flights": ["SK100", "SK999"]}},
+        {"method": "POST", "path": "/batch", "body": {"requests": []}},
+        "not a request",
+    ]})
+    assert status == 200
+    assert [response["status"] for response in batch["responses"]] == [201, 200, 400, 400]
+    results = batch["responses"][1]["body"]["results"]
+    assert results["SK999"] is None
+    assert results["SK100"]["cabins"]["Economy"] in (137, 138)
+
+
+def test_requests_share_a_kept_alive_connection(system):
+    server = ApiServer(system)
+    try:
+        with socket.create_connection(("127.0.0.1", server.port), timeout=5) as client:
+            stream = client.makefile("rb")
+            for _ in range(2):
+                client.sendall(b"GET /flights/SK100 HTTP/1.1\r\nHost: test\r\n\r\n")
+                assert stream.readline().startswith(b"HTTP/1.1 200 ")
+                headers = {}
+                for line in iter(stream.readline, b"\r\n"):
+                    name, _, value = line.decode().partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                document = json.loads(stream.read(int(headers["content-length"])))
+                assert document["flight_number"] == "SK100"
+    finally:
+        server.close()
@@ -0,0 +1,41 @@
+from airline import Flight
+
+from .support import make_passengers
+
+
+def schedule(system):
+    for row in [
+        ("SK1", "2026-12-01", "Tokyo", "08:00", "14:00", "G1", "A321"),
+        ("SK2", "2026-12-02", "Tokyo", "07:00", "13:00", "G2", "B787"),
+        ("SK3", "2026-12-03", "Tokyo", "09:00", "15:00", "G3", "A321"),
+        ("SK4", "2026-12-02", "Osaka", "09:00", "15:00", "G4", "A321"),
+    ]:
+        system.add_flight(Flight(*row))
+
+
+def test_availability_covers_a_date_range_in_departure_order(any_system):
+    schedule(any_system)
+    frame = any_system.search_availability("tokyo", "2026-12-01", "2026-12-02")
+    assert frame["Flight"].tolist() == ["SK1", "SK2"]
+    assert frame.loc[0, ["Free Seats", "First", "Business", "Economy"]].tolist() == [166, 8, 20, 138]
+    assert frame.loc[1, "Aircraft"] == "B787"
+    assert any_system.search_availability(date_from="2026-12-02")["Flight"].tolist() == ["SK2", "SK4", "SK3"]
+
+
+def test_a_cabin_search_counts_only_that_cabin(any_system):
+    schedule(any_system)
+    flight = any_system.get_flight("SK1")
+    assert len(any_system.create_group_reservation(make_passengers(8), flight, "First", "credit card")) == 8
+    booked = any_system.search_availability("Tokyo", cabin="First")
+    assert booked["Flight"].tolist() == ["SK2", "SK3"]
+    assert booked["Free Seats"].tolist() == [8, 8]
+    assert any_system.search_availability("Tokyo", cabin="First", min_free=0)["Flight"].tolist() == [
+        "SK1", "SK2", "SK3"]
+    assert any_system.search_availability("Tokyo", cabin="Economy", min_free=139)["Flight"].tolist() == ["SK2"]
+
+
+def test_no_matches_give_an_empty_table_with_every_column(any_system):
+    frame = any_system.search_availability("Nagoya")
+    assert frame.empty
+    assert list(frame.columns) == ["Flight", "Destination", "Date", "Departure", "Arrival", "Gate",
+                                   "Aircraft", "Free Seats", "First", "Business", "Economy"]
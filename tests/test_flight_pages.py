@@ -0,0 +1,54 @@
+import pytest
+
+from airline import Flight, Passenger
+
+SCHEDULE = [
+    ("SK1", "2026-12-01", "Tokyo", "08:00", "14:00", "G1", "A321"),
+    ("SK2", "2026-12-01", "Osaka", "09:00", "15:00", "G2", "A321"),
+    ("SK3", "2026-12-02", "Tokyo", "07:00", "13:00", "G3", "B787"),
+    ("SK4", "2026-12-02", "Nagoya", "10:00", "16:00", "G4", "A321"),
+    ("SK5", "2026-12-01", "Tokyo", "08:00", "14:00", "G5", "A321"),
+]
+
+
+@pytest.fixture
+def scheduled(any_system):
+    for row in SCHEDULE:
+        any_system.add_flight(Flight(*row))
+    # Two seats gone on SK2 and one on SK4, so free-seat order differs from departure order
+    for seat_number, flight_number in (("10A", "SK2"), ("10B", "SK2"), ("10A", "SK4")):
+        any_system.create_reservation(Passenger(f"{flight_number}-{seat_number}", "Ken", "Ito", 40),
+                                      any_system.get_flight(flight_number), seat_number, "credit card")
+    return any_system
+
+
+def page(system, *args, **kwargs):
+    total, flights = system.find_flights_page(*args, **kwargs)
+    return total, [flight.get_flight_number() for flight in flights]
+
+
+@pytest.mark.parametrize("sort, descending, expected", [
+    ("departure", False, ["SK1", "SK5", "SK2", "SK3", "SK4"]),
+    ("departure", True, ["SK4", "SK3", "SK2", "SK1", "SK5"]),
+    ("destination", False, ["SK4", "SK2", "SK1", "SK5", "SK3"]),
+    ("destination", True, ["SK1", "SK5", "SK3", "SK2", "SK4"]),
+    ("free_seats", False, ["SK2", "SK4", "SK1", "SK5", "SK3"]),
+    ("free_seats", True, ["SK3", "SK1", "SK5", "SK4", "SK2"]),
+])
+def test_both_backends_sort_the_same_way(scheduled, sort, descending, expected):
+    assert page(scheduled, sort=sort, descending=descending, limit=10) == (5, expected)
+
+
+def test_pages_slice_the_sorted_matches(scheduled):
+    assert page(scheduled, limit=2) == (5, ["SK1", "SK5"])
+    assert page(scheduled, offset=2, limit=2) == (5, ["SK2", "SK3"])
+    assert page(scheduled, offset=4, limit=2) == (5, ["SK4"])
+    assert page(scheduled, offset=6, limit=2) == (5, [])
+
+
+def test_pages_apply_the_destination_and_date_filters(scheduled):
+    assert page(scheduled, "tokyo", sort="free_seats", descending=True) == (3, ["SK3", "SK1", "SK5"])
+    assert page(scheduled, "to", prefix=True, limit=1) == (3, ["SK1"])
+    assert page(scheduled, date="2026-12-02") == (2, ["SK3", "SK4"])
+    with pytest.raises(ValueError):
+        scheduled.find_flights_page(sort="gate")
@@ -0,0 +1,49 @@
+from airline import AirlineSystem, Flight, SQLiteStorage
+
+SCHEDULE = [
+    ("SK1", "2026-12-01", "Tokyo", "08:00", "14:00", "G1", "A321"),
+    ("SK2", "2026-12-01", "Osaka", "09:00", "15:00", "G2", "A321"),
+    ("SK3", "2026-12-02", "Tokyo", "07:00", "13:00", "G3", "B787"),
+    ("SK4", "2026-12-02", "tokyo", "10:00", "16:00", "G4", "A321"),
+]
+
+
+def add_schedule(system):
+    for row in SCHEDULE:
+        assert system.add_flight(Flight(*row))
+
+
+def numbers(flights):
+    return sorted(flight.get_flight_number() for flight in flights)
+
+
+def test_flights_are_found_by_number_route_destination_and_date(any_system):
+    add_schedule(any_system)
+    assert any_system.get_flight("SK3").get_aircraft_type() == "B787"
+    assert any_system.get_flight("SK9") is None
+    assert numbers(any_system.find_flights("TOKYO")) == ["SK1", "SK3", "SK4"]
+    assert numbers(any_system.find_flights("tokyo", "2026-12-02")) == ["SK3", "SK4"]
+    assert numbers(any_system.find_flights(date="2026-12-01")) == ["SK1", "SK2"]
+    assert numbers(any_system.find_flights()) == ["SK1", "SK2", "SK3", "SK4"]
+    assert any_system.find_flights("Nagoya") == []
+
+
+def test_a_flight_number_is_added_once(any_system):
+    add_schedule(any_system)
+    assert not any_system.add_flight(Flight("SK1", "2026-12-09", "Sapporo", "08:00", "10:00", "G9"))
+    assert any_system.get_flight("SK1").get_destination() == "Tokyo"
+    assert any_system.find_flights("Sapporo") == []
+
+
+def test_stored_flights_are_found_after_a_restart(db_path):
+    system = AirlineSystem(SQLiteStorage(db_path))
+    add_schedule(system)
+    system.close()
+
+    system = AirlineSystem(SQLiteStorage(db_path))
+    try:
+        assert system.has_flights()
+        assert numbers(system.find_flights("Tokyo", "2026-12-02")) == ["SK3", "SK4"]
+        assert not system.add_flight(Flight(*SCHEDULE[0]))
+    finally:
+        system.close()
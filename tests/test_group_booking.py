@@ -0,0 +1,96 @@
+from airline import Passenger, Payment, SeatInventory
+
+from .support import DECLINED, make_flight, make_passengers
+
+
+def occupy(inventory, *seat_numbers):
+    for seat_number in seat_numbers:
+        assert inventory.occupy(seat_number)
+
+
+def test_find_block_takes_the_tightest_run_that_fits():
+    inventory = SeatInventory()
+    occupy(inventory, "8A", "8B", "8C")
+    assert inventory.find_block(3, "Economy") == ["8D", "8E", "8F"]
+
+
+def test_find_block_keeps_a_group_in_one_row():
+    inventory = SeatInventory()
+    occupy(inventory, "8B")
+    assert inventory.find_block(4, "Economy") == ["8C", "8D", "8E", "8F"]
+    assert inventory.find_block(1, "Economy") == ["8A"]
+
+
+def test_find_block_spans_the_fewest_adjacent_rows():
+    inventory = SeatInventory()
+    assert inventory.find_block(8, "Economy") == ["8A", "8B", "8C", "8D", "8E", "8F", "9A", "9B"]
+
+
+def test_find_block_fills_scattered_seats_when_no_run_fits():
+    inventory = SeatInventory()
+    occupy(inventory, "1A", "1E", "2B", "2F")
+    assert sorted(inventory.find_block(4, "First")) == ["1B", "1F", "2A", "2E"]
+
+
+def test_find_block_sees_seats_released_later():
+    inventory = SeatInventory()
+    occupy(inventory, "8A", "8B", "8C", "8D", "8E", "8F")
+    assert inventory.release("8C") and inventory.release("8D")
+    assert inventory.find_block(2, "Economy") == ["8C", "8D"]
+
+
+def test_find_block_returns_none_when_the_group_does_not_fit():
+    inventory = SeatInventory()
+    assert inventory.find_block(9, "First") is None
+    assert inventory.find_block(0, "First") is None
+    assert inventory.find_block(1, "Galley") is None
+    occupy(inventory, *inventory.available_seat_numbers("First")[:5])
+    assert inventory.find_block(4, "First") is None
+
+
+def test_assign_seat_block_seats_everyone_or_nobody():
+    flight = make_flight()
+    assert flight.assign_seat_block(make_passengers(9), "First") is None
+    assert flight.count_available_seats("First") == 8
+    seat_numbers = flight.assign_seat_block(make_passengers(3), "First")
+    assert len(seat_numbers) == 3
+    assert all(flight._inventory.is_occupied(seat_number) for seat_number in seat_numbers)
+    assert flight.count_available_seats("First") == 5
+
+
+def test_a_declined_group_books_nobody(system):
+    flight = system.get_flight("SK100")
+    assert system.create_group_reservation(make_passengers(4), flight, "Business", DECLINED) is None
+    assert flight.count_available_seats("Business") == 20
+    assert system.find_bookings("P0") == []
+
+
+def test_a_group_is_booked_side_by_side(system):
+    flight = system.get_flight("SK100")
+    reservations = system.create_group_reservation(make_passengers(3), flight, "Economy", "credit card")
+    assert [reservation._seat_number for reservation in reservations] == ["8A", "8B", "8C"]
+    assert all(reservation.status == "Confirmed" for reservation in reservations)
+    assert [booking._seat_number for booking in system.find_bookings("P1")] == ["8B"]
+    assert flight.count_available_seats("Economy") == 135
+
+
+def test_a_declined_group_offers_its_seats_to_the_waitlist(system, monkeypatch):
+    flight = system.get_flight("SK100")
+    for passenger, seat_number in zip(make_passengers(17, "S"), flight.get_available_seat_numbers("Business")):
+        system.create_reservation(passenger, flight, seat_number, "credit card")
+    waiting = []
+    charge = Payment.process_payment_async
+
+    def join_then_charge(payment):
+        # The group holds the cabin's last seats, so a latecomer has to join the waitlist
+        if not waiting:
+            waiting.append(system.join_waitlist(Passenger("W1", "Rin", "Abe", 35), flight, "Business",
+                                                "credit card"))
+        return charge(payment)
+
+    monkeypatch.setattr(Payment, "process_payment_async", join_then_charge)
+    assert system.create_group_reservation(make_passengers(3), flight, "Business", DECLINED) is None
+    entry = waiting[0]
+    assert entry.status == "Promoted" and entry._reservation.status == "Confirmed"
+    assert flight.count_available_seats("Business") == 2
+    assert [booking._seat_number for booking in system.find_bookings("W1")] == [entry._reservation._seat_number]
@@ -0,0 +1,83 @@
+import time
+
+from airline import HoldScheduler, Passenger, SeatInventory
+
+from .support import make_flight
+
+
+def test_held_seats_count_as_taken():
+    inventory = SeatInventory()
+    assert inventory.hold("1A")
+    assert inventory.count_available("First") == 7
+    assert "1A" not in inventory.available_seat_numbers("First")
+    assert not inventory.occupy("1A")
+    assert inventory.convert_hold("1A") and not inventory.is_held("1A")
+    assert inventory.release("1A") and inventory.count_available("First") == 8
+
+
+def test_a_held_seat_is_only_booked_by_its_holder(system):
+    flight = system.get_flight("SK100")
+    hold = system.hold_seat(flight, "10A")
+    assert hold is not None and system.is_hold_active(hold)
+    assert system.hold_seat(flight, "10A") is None
+    assert system.create_reservation(Passenger("P1", "Ken", "Ito", 40), flight, "10A", "credit card") is None
+    reservation = system.create_reservation(Passenger("P2", "Yui", "Mori", 28), flight, "10A", "credit card",
+                                            hold)
+    assert reservation.status == "Confirmed"
+    assert not system.is_hold_active(hold)
+
+
+def test_released_and_expired_holds_free_the_seat(system):
+    flight = system.get_flight("SK100")
+    hold = system.hold_seat(flight, "10A")
+    assert system.release_hold(hold)
+    assert not flight._inventory.is_occupied("10A")
+    assert not system.release_hold(hold)
+
+    hold = system.hold_seat(flight, "10B", ttl=60)
+    assert system.holds.reap(time.monotonic() + 61) == 1
+    assert not flight._inventory.is_occupied("10B")
+    assert not system.is_hold_active(hold)
+
+
+def test_an_expired_hold_cannot_be_converted(system):
+    flight = system.get_flight("SK100")
+    hold = system.hold_seat(flight, "10A", ttl=0)
+    assert system.create_reservation(Passenger("P1", "Ken", "Ito", 40), flight, "10A", "credit card",
+                                     hold) is None
+
+
+def test_the_scheduler_releases_holds_in_deadline_order():
+    flight = make_flight()
+    released = []
+    scheduler = HoldScheduler(released.append)
+    late = flight.hold_seat("10A", 60)
+    early = flight.hold_seat("10B", 30)
+    scheduler.schedule(late)
+    scheduler.schedule(early)
+    assert len(scheduler) == 2
+    assert scheduler.reap(time.monotonic()) == 0
+    assert scheduler.reap(early.expires_at) == 1 and released == [early]
+    assert scheduler.reap(late.expires_at) == 1 and released == [early, late]
+    assert flight.count_available_seats() == 166
+
+
+def test_a_hold_confirmed_before_its_deadline_is_skipped():
+    flight = make_flight()
+    released = []
+    scheduler = HoldScheduler(released.append)
+    hold = flight.hold_seat("10A", 60)
+    scheduler.schedule(hold)
+    assert flight.assign_seat("10A", Passenger("P1", "Ken", "Ito", 40), hold)
+    assert scheduler.reap(hold.expires_at) == 0 and released == []
+    assert flight._inventory.is_occupied("10A")
+
+
+def test_the_timer_thread_expires_holds_on_its_own(system):
+    flight = system.get_flight("SK100")
+    hold = system.hold_seat(flight, "10A", ttl=0.05)
+    deadline = time.monotonic() + 5
+    while flight._inventory.is_occupied("10A") and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert not flight._inventory.is_occupied("10A")
+    assert not hold.is_active()
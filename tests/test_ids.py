@@ -0,0 +1,156 @@
+import datetime
+import threading
+import time
+
+import pytest
+
+from airline import AirlineSystem, IdGenerator, Passenger, Reservation, SQLiteStorage, StorageConflict, ids
+
+from .support import make_flight
+
+
+def test_ids_are_unique_and_increasing_across_threads():
+    generator = IdGenerator(5)
+    issued = []
+
+    def issue():
+        issued.append([generator.next_id() for _ in range(20000)])
+
+    threads = [threading.Thread(target=issue) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert all(batch == sorted(batch) for batch in issued)
+    assert len({value for batch in issued for value in batch}) == 80000
+
+
+def test_an_id_carries_its_worker_and_time():
+    before = time.time_ns() // 1000
+    value = IdGenerator(7).next_id()
+    assert ids.worker_of(value) == 7
+    assert before - 1000 <= ids.id_timestamp(value) <= time.time_ns() // 1000
+    assert len(ids.id_text(value)) == ids.ID_DIGITS
+
+
+def test_worker_ids_out_of_range_are_refused():
+    with pytest.raises(ValueError):
+        IdGenerator(ids.MAX_WORKER_ID + 1)
+    with pytest.raises(ValueError):
+        IdGenerator(-1)
+
+
+def test_id_range_covers_ids_issued_inside_it():
+    start = datetime.datetime.now()
+    time.sleep(0.002)
+    value = ids.id_text(ids.next_id())
+    time.sleep(0.002)
+    end = datetime.datetime.now()
+    first, last = ids.id_range(start, end)
+    assert first <= value <= last
+    assert ids.id_range(end)[0] > value
+    assert ids.id_range(None, start)[1] < value
+
+
+def test_a_worker_is_claimed_by_one_process_at_a_time(db_path):
+    storage = SQLiteStorage(db_path)
+    other = SQLiteStorage(db_path)
+    try:
+        claimed = storage.claim_worker_id(None, "host:1:a", lambda worker_id: None)
+        with pytest.raises(StorageConflict):
+            other.claim_worker_id(claimed, "host:2:b", lambda worker_id: None)
+        assert other.claim_worker_id(None, "host:2:b", lambda worker_id: None) != claimed
+        storage.close()
+        assert other.claim_worker_id(claimed, "host:3:c", lambda worker_id: None) == claimed
+    finally:
+        storage.close()
+        other.close()
+
+
+def book_over_time(system, count):
+    # Reservations a few milliseconds apart, oldest first, with the time before each
+    flight = system.get_flight("SK100")
+    times = []
+    reservations = []
+    for i in range(count):
+        times.append(datetime.datetime.now())
+        time.sleep(0.002)
+        reservations.append(system.create_reservation(Passenger(f"P{i}", "Ken", f"Ito{i}", 40), flight,
+                                                      flight.get_available_seat_numbers("Economy")[0],
+                                                      "credit card"))
+        time.sleep(0.002)
+    return times, reservations
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def booking_system(request, db_path):
+    system = AirlineSystem(SQLiteStorage(db_path) if request.param == "sqlite" else None)
+    system.add_flight(make_flight())
+    yield system
+    system.close()
+
+
+def test_range_scans_return_bookings_newest_first(booking_system):
+    times, reservations = book_over_time(booking_system, 5)
+    booking_system.cancel_reservation(reservations[3]._reservation_id)
+
+    def scan(*args, **kwargs):
+        return [reservation._reservation_id
+                for reservation in booking_system.find_reservations_between(*args, **kwargs)]
+
+    newest_first = [reservation._reservation_id for reservation in reversed(reservations)]
+    assert scan(times[0], include_cancelled=True) == newest_first
+    assert scan(times[0]) == [newest_first[0]] + newest_first[2:]
+    assert scan(times[1], times[3], include_cancelled=True) == newest_first[2:4]
+    assert scan(times[4]) == [reservations[4]._reservation_id]
+    assert scan(None, times[0]) == []
+
+
+def test_range_scans_page_with_before(booking_system):
+    times, reservations = book_over_time(booking_system, 5)
+    newest_first = [reservation._reservation_id for reservation in reversed(reservations)]
+    pages = []
+    before = None
+    while True:
+        page = booking_system.find_reservations_between(times[0], limit=2, before=before)
+        pages.append([reservation._reservation_id for reservation in page])
+        if len(page) < 2:
+            break
+        before = page[-1]._reservation_id
+    assert pages == [newest_first[0:2], newest_first[2:4], newest_first[4:]]
+
+
+def test_range_scans_skip_ids_from_before_time_ordered_ids(open_system):
+    system = open_system()
+    system.add_flight(make_flight())
+    flight = system.get_flight("SK100")
+    # A booking kept under the old eight-digit IDs sorts among the new ones as text
+    legacy = Reservation(Passenger("L1", "Rin", "Abe", 35), flight, "30F")
+    legacy._reservation_id = "00001234"
+    legacy.status = "Confirmed"
+    system._storage.save_reservation(legacy)
+    current = system.create_reservation(Passenger("P1", "Ken", "Ito", 40), flight, "10A", "credit card")
+
+    found = system.find_reservations_between(datetime.datetime(2024, 1, 1), include_cancelled=True)
+    assert [reservation._reservation_id for reservation in found] == [current._reservation_id]
+    assert system.get_reservation("00001234")._passenger._passport_number == "L1"
+
+
+def test_reloading_bookings_draws_no_new_ids(open_system, monkeypatch):
+    system = open_system()
+    system.add_flight(make_flight())
+    booked = [system.create_reservation(Passenger(f"P{i}", "Ken", f"Ito{i}", 40), system.get_flight("SK100"),
+                                        f"{10 + i}A", "credit card") for i in range(3)]
+    system.close()
+
+    def drawn():
+        raise AssertionError("A stored record drew a new ID")
+
+    system = open_system()
+    monkeypatch.setattr(ids, "next_id", drawn)
+    monkeypatch.setattr(ids, "next_text_id", drawn)
+    reloaded = system.find_reservations_between(include_cancelled=True)
+    assert [reservation._reservation_id for reservation in reloaded] == [
+        reservation._reservation_id for reservation in reversed(booked)]
+    assert reloaded[0]._payment._payment_id == booked[-1]._payment._payment_id
+    assert reloaded[0].status == "Confirmed" and reloaded[0]._payment.get_status() == "Completed"
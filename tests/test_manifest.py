@@ -0,0 +1,85 @@
+import csv
+import io
+import json
+
+import pyarrow.parquet as pq
+import pytest
+
+from airline import MANIFEST_COLUMNS, Flight, Passenger
+from airline.manifest import (BOARDING_COLUMNS, boarding_group, departure_flight_numbers, export_departures,
+                              export_manifest, main)
+
+from .support import make_flight
+
+# Seat -> passport on SK100, booked out of seat order
+SEATED = {"30F": "P1", "8A": "P2", "1A": "P3", "3B": "P4"}
+
+
+@pytest.fixture
+def booked(any_system):
+    any_system.add_flight(make_flight())
+    any_system.add_flight(Flight("SK050", "2026-12-01", "Osaka", "06:00", "07:30", "G5"))
+    any_system.add_flight(Flight("SK200", "2026-12-02", "Osaka", "06:00", "07:30", "G5"))
+    flight = any_system.get_flight("SK100")
+    for seat_number, passport_number in SEATED.items():
+        any_system.create_reservation(Passenger(passport_number, "Hana", f"Sato{seat_number}", 30,
+                                                f"{passport_number}@example.com"),
+                                      flight, seat_number, "credit card")
+    return any_system
+
+
+def test_csv_manifests_list_confirmed_passengers_in_seat_order(booked):
+    cancelled = booked.find_bookings("P2")[0]
+    booked.cancel_reservation(cancelled._reservation_id)
+    out = io.StringIO()
+    assert export_manifest(booked, ["SK100", "SK999"], "csv", out) == 3
+    rows = list(csv.reader(io.StringIO(out.getvalue())))
+    assert tuple(rows[0]) == MANIFEST_COLUMNS
+    assert [(row[2], row[7]) for row in rows[1:]] == [("1A", "P3"), ("3B", "P4"), ("30F", "P1")]
+    assert rows[1][8:] == ["30", "P3@example.com", ""]
+
+
+def test_jsonl_and_parquet_carry_the_same_rows(booked):
+    out = io.StringIO()
+    assert export_manifest(booked, ["SK100"], "jsonl", out) == 4
+    documents = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert [document["seat_number"] for document in documents] == ["1A", "3B", "8A", "30F"]
+
+    parquet = io.BytesIO()
+    assert export_manifest(booked, ["SK100"], "parquet", parquet) == 4
+    table = pq.read_table(io.BytesIO(parquet.getvalue()))
+    assert table.column_names == list(MANIFEST_COLUMNS)
+    assert table.to_pylist() == documents
+    with pytest.raises(ValueError):
+        export_manifest(booked, ["SK100"], "xml", io.StringIO())
+
+
+def test_boarding_lists_board_premium_cabins_then_economy_back_to_front(booked):
+    layout = booked.get_flight("SK100").get_layout()
+    assert [boarding_group(layout, seat) for seat in ("1A", "3B", "30F", "8A")] == [1, 2, 3, 5]
+    out = io.StringIO()
+    assert export_manifest(booked, ["SK100"], "csv", out, boarding=True) == 4
+    rows = list(csv.reader(io.StringIO(out.getvalue())))
+    assert tuple(rows[0]) == BOARDING_COLUMNS
+    assert [(row[4], row[5], row[7]) for row in rows[1:]] == [
+        ("1", "1A", "Hana Sato1A"), ("2", "3B", "Hana Sato3B"), ("3", "30F", "Hana Sato30F"),
+        ("5", "8A", "Hana Sato8A")]
+
+
+def test_a_day_of_departures_is_exported_in_departure_order(booked):
+    assert list(departure_flight_numbers(booked, "2026-12-01")) == ["SK050", "SK100"]
+    out = io.StringIO()
+    assert export_departures(booked, "2026-12-02", "jsonl", out) == 0
+
+
+def test_the_command_line_exports_a_stored_day(open_system, db_path, tmp_path, capsys):
+    system = open_system()
+    system.add_flight(make_flight())
+    system.create_reservation(Passenger("P1", "Hana", "Sato", 30), system.get_flight("SK100"), "10A",
+                              "credit card")
+    system.close()
+
+    output = tmp_path / "boarding.csv"
+    assert main(["--db", db_path, "--date", "2026-12-01", "--boarding", "-o", str(output)]) == 0
+    assert "Exported 1 rows" in capsys.readouterr().err
+    assert output.read_text().splitlines()[1].startswith("SK100,2026-12-01,08:00,G1,")
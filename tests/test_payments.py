@@ -0,0 +1,121 @@
+import asyncio
+import concurrent.futures
+
+import pytest
+
+from airline import Payment
+from airline.payment_gateway import PaymentDispatcher, StubGateway, TransientPaymentError
+
+from .support import DECLINED
+
+
+class FlakyGateway(StubGateway):
+    # Fails the first few round trips, then behaves; records every request it sees
+    def __init__(self, failures=0, **kwargs):
+        super().__init__(**kwargs)
+        self.failures = failures
+        self.charge_keys = []
+        self.refund_batches = []
+        self.connections = 0
+        self.busy = 0
+        self.most_busy = 0
+
+    async def connect(self):
+        self.connections += 1
+        return object()
+
+    async def _round_trip(self):
+        self.busy += 1
+        self.most_busy = max(self.most_busy, self.busy)
+        try:
+            await super()._round_trip()
+            if self.failures:
+                self.failures -= 1
+                raise TransientPaymentError("Gateway unavailable")
+        finally:
+            self.busy -= 1
+
+    async def charge(self, connection, idempotency_key, amount, payment_method):
+        self.charge_keys.append(idempotency_key)
+        return await super().charge(connection, idempotency_key, amount, payment_method)
+
+    async def refund_batch(self, connection, refunds):
+        self.refund_batches.append([key for key, _ in refunds])
+        return await super().refund_batch(connection, refunds)
+
+
+@pytest.fixture
+def dispatch():
+    # Builds dispatchers with a near-zero backoff and closes them afterwards
+    dispatchers = []
+
+    def dispatch_(gateway, **kwargs):
+        kwargs.setdefault("backoff", 0.001)
+        dispatcher = PaymentDispatcher(default_gateway=gateway, **kwargs)
+        dispatchers.append(dispatcher)
+        return dispatcher
+
+    yield dispatch_
+    for dispatcher in dispatchers:
+        dispatcher.close()
+
+
+def test_a_transient_failure_is_retried_under_the_same_key(dispatch):
+    gateway = FlakyGateway(failures=2)
+    assert dispatch(gateway, retries=3).submit_charge("pay-1", 100.0, "momo").result(5)
+    assert gateway.charge_keys == ["pay-1", "pay-1", "pay-1"]
+    # A broken connection is dropped rather than handed to the next attempt
+    assert gateway.connections == 3
+
+
+def test_a_charge_gives_up_after_its_retries(dispatch):
+    gateway = FlakyGateway(failures=10)
+    with pytest.raises(TransientPaymentError):
+        dispatch(gateway, retries=2).submit_charge("pay-1", 100.0, "momo").result(5)
+    assert len(gateway.charge_keys) == 3
+
+
+def test_a_slow_gateway_times_out(dispatch):
+    gateway = FlakyGateway(latency=1.0)
+    with pytest.raises(asyncio.TimeoutError):
+        dispatch(gateway, timeout=0.01, retries=1).submit_charge("pay-1", 100.0, "momo").result(5)
+    assert len(gateway.charge_keys) == 2
+
+
+def test_replaying_a_key_never_charges_twice(dispatch):
+    gateway = FlakyGateway(decline_rate=0.5, seed=3)
+    dispatcher = dispatch(gateway)
+    first = [dispatcher.submit_charge(f"pay-{i}", 100.0, "momo").result(5) for i in range(20)]
+    again = [dispatcher.submit_charge(f"pay-{i}", 100.0, "momo").result(5) for i in range(20)]
+    assert first == again
+    assert 0 < sum(first) < 20
+
+
+def test_refunds_are_sent_in_batches(dispatch):
+    gateway = FlakyGateway()
+    dispatcher = dispatch(gateway, refund_batch_size=4, refund_batch_wait=0.05)
+    futures = [dispatcher.submit_refund(f"pay-{i}", 100.0, "momo") for i in range(10)]
+    assert all(future.result(5) for future in futures)
+    assert sorted(len(batch) for batch in gateway.refund_batches) == [2, 4, 4]
+    assert sorted(key for batch in gateway.refund_batches for key in batch) == sorted(
+        f"pay-{i}" for i in range(10))
+
+
+def test_concurrent_charges_stay_under_the_provider_cap(dispatch):
+    gateway = FlakyGateway(latency=0.01, max_connections=3)
+    dispatcher = dispatch(gateway, max_concurrency=5)
+    futures = [dispatcher.submit_charge(f"pay-{i}", 100.0, "momo") for i in range(30)]
+    concurrent.futures.wait(futures, 5)
+    assert all(future.result() for future in futures)
+    assert gateway.most_busy == 3 and gateway.connections == 3
+
+
+def test_payments_charge_and_refund_through_the_default_dispatcher():
+    payment = Payment(100.0, "credit card")
+    assert payment.process_payment() and payment.get_status() == "Completed"
+    assert payment.refund_payment() and payment.get_status() == "Refunded"
+    assert not payment.refund_payment()
+
+    declined = Payment(100.0, DECLINED)
+    assert not declined.process_payment_async().result(5)
+    assert not declined.process_payment() and declined.get_status() == "Failed"
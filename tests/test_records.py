@@ -0,0 +1,60 @@
+import datetime
+import pickle
+
+import pytest
+
+from airline import Passenger, Payment, Reservation, timestamps
+
+from .support import make_flight
+
+
+def test_records_are_slotted():
+    flight = make_flight()
+    records = (Passenger("P1", "Ken", "Ito", 40), Reservation(Passenger("P1", "Ken", "Ito", 40), flight, "10A"),
+               Payment(100.0, "credit card"))
+    for record in records:
+        assert not hasattr(record, "__dict__")
+        with pytest.raises(AttributeError):
+            record.nickname = "Ken"
+
+
+def test_shared_strings_are_interned():
+    first = Passenger("P1", "".join(["K", "en"]), "Ito", 40)
+    second = Passenger("P2", "".join(["Ke", "n"]), "Ito", 40)
+    assert first._first_name is second._first_name
+
+
+@pytest.mark.parametrize("value", [
+    datetime.datetime(2026, 12, 1, 8, 0),
+    datetime.datetime(2026, 12, 1, 8, 0, 0, 123456),
+    datetime.datetime(1999, 12, 31, 23, 59, 59, 999999),
+])
+def test_timestamps_convert_back_exactly(value):
+    assert timestamps.to_datetime(timestamps.from_datetime(value)) == value
+    assert timestamps.from_isoformat(value.isoformat()) == timestamps.from_datetime(value)
+
+
+def test_a_pickled_reservation_is_detached_from_its_store(system):
+    flight = system.get_flight("SK100")
+    reservation = system.create_reservation(Passenger("P1", "Ken", "Ito", 40), flight, "10A", "credit card")
+    copy = pickle.loads(pickle.dumps(reservation))
+    assert copy._store is None and reservation._store is not None
+    assert (copy._reservation_id, copy.status, copy._seat_number) == (
+        reservation._reservation_id, "Confirmed", "10A")
+    assert copy.get_reservation_date() == reservation.get_reservation_date()
+    assert copy._payment.get_timestamp() == reservation._payment.get_timestamp()
+
+
+def test_reloaded_records_keep_their_ids_and_times(open_system):
+    system = open_system()
+    system.add_flight(make_flight())
+    booked = system.create_reservation(Passenger("P1", "Ken", "Ito", 40), system.get_flight("SK100"), "10A",
+                                       "credit card")
+    system.close()
+
+    reloaded = open_system().get_reservation(booked._reservation_id)
+    assert reloaded is not booked
+    assert reloaded._passenger._passenger_id == booked._passenger._passenger_id
+    assert reloaded._payment._payment_id == booked._payment._payment_id
+    assert reloaded._reservation_date == booked._reservation_date
+    assert reloaded._payment._timestamp == booked._payment._timestamp
@@ -0,0 +1,69 @@
+import pytest
+
+from airline import Passenger, Reservation, ReservationStore
+
+from .support import make_flight
+
+
+def book(system, passport_number, seat_number, flight_number="SK100"):
+    return system.create_reservation(Passenger(passport_number, "Ken", "Ito", 40),
+                                     system.get_flight(flight_number), seat_number, "credit card")
+
+
+def ids_of(reservations):
+    return sorted(reservation._reservation_id for reservation in reservations)
+
+
+def test_bookings_are_found_by_passport_and_flight(any_system):
+    any_system.add_flight(make_flight("SK100"))
+    any_system.add_flight(make_flight("SK200"))
+    first = book(any_system, "P1", "10A")
+    second = book(any_system, "P1", "1A", "SK200")
+    other = book(any_system, "P2", "10B")
+
+    assert any_system.get_reservation(first._reservation_id) is first
+    assert ids_of(any_system.find_bookings("P1")) == ids_of([first, second])
+    assert ids_of(any_system.get_flight_reservations("SK100")) == ids_of([first, other])
+    assert any_system.find_bookings("P9") == []
+
+
+def test_cancelled_bookings_leave_the_active_indexes(any_system):
+    any_system.add_flight(make_flight())
+    kept = book(any_system, "P1", "10A")
+    cancelled = book(any_system, "P1", "10B")
+    assert any_system.cancel_reservation(cancelled._reservation_id) is cancelled
+    assert any_system.cancel_reservation(cancelled._reservation_id) is None
+    assert any_system.cancel_reservation("no-such-booking") is None
+
+    assert any_system.find_bookings("P1") == [kept]
+    assert ids_of(any_system.find_bookings("P1", include_cancelled=True)) == ids_of([kept, cancelled])
+    assert any_system.get_flight_reservations("SK100") == [kept]
+    assert ids_of(any_system.get_flight_reservations("SK100", include_cancelled=True)) == ids_of(
+        [kept, cancelled])
+    assert [row[2] for row in any_system.get_manifest("SK100")] == ["10A"]
+
+
+def test_a_rebooked_seat_maps_to_the_new_booking():
+    store = ReservationStore()
+    flight = make_flight()
+    first = Reservation(Passenger("P1", "Ken", "Ito", 40), flight, "10A")
+    first.status = "Confirmed"
+    store.add(first)
+    first.status = "Cancelled"
+    second = Reservation(Passenger("P2", "Yui", "Mori", 28), flight, "10A")
+    second.status = "Confirmed"
+    store.add(second)
+    store.on_cancelled(first)
+    assert store.seat_map("SK100") == {"10A": second}
+
+
+def test_a_reservation_id_is_used_once():
+    store = ReservationStore()
+    flight = make_flight()
+    first = Reservation(Passenger("P1", "Ken", "Ito", 40), flight, "10A")
+    store.add(first)
+    clash = Reservation(Passenger("P2", "Yui", "Mori", 28), flight, "10B")
+    clash._reservation_id = first._reservation_id
+    with pytest.raises(ValueError):
+        store.add(clash)
+    assert store.get(first._reservation_id) is first
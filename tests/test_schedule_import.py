@@ -0,0 +1,100 @@
+import io
+
+import pandas as pd
+import pytest
+
+from airline.schedule_import import ImportReport, import_schedule, validate_chunk
+
+SCHEDULE = """flight_number,flight_date,destination,departure_time,arrival_time,gate_number,aircraft_type
+SK1,2026-12-01,Tokyo,08:00,14:00,G1,A321
+SK2,2026-12-01,Osaka,9:05,15:00:00,G2,
+SK3,2026-13-01,Osaka,09:00,15:00,G3,A321
+SK4,2026-12-01,Osaka,09:00,08:00,G4,A321
+SK5,2026-12-01,,09:00,15:00,G5,A321
+SK6,2026-12-01,Osaka,09:00,15:00,G6,A380
+SK1,2026-12-02,Tokyo,08:00,14:00,G1,A321
+SK7,2026-12-02,Sapporo,10:00,12:00,G7,B787
+"""
+
+
+def reasons(report):
+    rejected = report.get_rejected_rows()
+    return dict(zip(rejected["flight_number"], rejected["reason"]))
+
+
+def test_valid_rows_are_imported_and_the_rest_rejected_with_a_reason(any_system):
+    report = import_schedule(any_system, io.StringIO(SCHEDULE), chunk_size=3)
+    assert (report.accepted, report.rejected) == (3, 5)
+    assert reasons(report) == {
+        "SK3": "invalid flight date",
+        "SK4": "arrival time must be after departure time",
+        "SK5": "missing required field",
+        "SK6": "unknown aircraft type",
+        "SK1": "flight number already exists",
+    }
+    flight = any_system.get_flight("SK2")
+    assert (flight.get_departure_time(), flight.get_arrival_time(), flight.get_aircraft_type()) == (
+        "09:05", "15:00", "A321")
+    assert any_system.get_flight("SK7").get_aircraft_type() == "B787"
+
+
+def test_a_second_import_rejects_flights_already_scheduled(any_system):
+    import_schedule(any_system, io.StringIO(SCHEDULE))
+    report = import_schedule(any_system, io.StringIO(SCHEDULE))
+    assert report.accepted == 0
+    assert reasons(report)["SK7"] == "flight number already exists"
+
+
+def test_duplicates_within_one_chunk_are_rejected():
+    chunk = pd.read_csv(io.StringIO(SCHEDULE), dtype=str, keep_default_na=False)
+    valid, rejected = validate_chunk(chunk)
+    assert list(valid["flight_number"]) == ["SK1", "SK2", "SK7"]
+    assert rejected.set_index("flight_number").loc["SK1", "reason"] == "duplicate flight number in file"
+
+
+def test_a_schedule_without_required_columns_is_refused():
+    with pytest.raises(ValueError, match="gate_number"):
+        validate_chunk(pd.DataFrame({"flight_number": ["SK1"]}))
+
+
+def test_parquet_nulls_are_missing_fields(any_system, tmp_path):
+    pytest.importorskip("pyarrow")
+    path = tmp_path / "schedule.parquet"
+    pd.DataFrame({
+        "flight_number": ["SK1", None], "flight_date": ["2026-12-01", "2026-12-01"],
+        "destination": ["Tokyo", "Osaka"], "departure_time": ["08:00:00", "09:00:00"],
+        "arrival_time": ["14:00:00", "15:00:00"], "gate_number": ["G1", None],
+    }).to_parquet(path)
+    report = import_schedule(any_system, str(path))
+    assert (report.accepted, report.rejected) == (1, 1)
+    assert report.get_rejected_rows()["reason"].tolist() == ["missing required field"]
+    assert any_system.get_flight("SK1").get_departure_time() == "08:00"
+
+
+def test_only_the_first_rejects_are_kept():
+    report = ImportReport(max_rejects=2)
+    report.add_rejects(pd.DataFrame({"flight_number": ["A", "B", "C"], "reason": "x"}))
+    report.add_rejects(pd.DataFrame({"flight_number": ["D"], "reason": "x"}))
+    assert report.rejected == 4
+    assert report.get_rejected_rows()["flight_number"].tolist() == ["A", "B"]
+
+
+def test_flights_another_process_adds_mid_import_are_rejected(open_system, monkeypatch):
+    importing = open_system()
+    other = open_system()
+    check = importing._storage.existing_flight_numbers
+
+    def check_then_race(flight_numbers):
+        # The other process schedules SK2 between this check and the insert
+        existing = check(flight_numbers)
+        if "SK2" in flight_numbers and not other.get_flight("SK2"):
+            other.add_flights([("SK2", "2026-12-01", "Nagoya", "07:00", "08:00", "G9", "A321")])
+        return existing
+
+    monkeypatch.setattr(importing._storage, "existing_flight_numbers", check_then_race)
+    report = import_schedule(importing, io.StringIO(SCHEDULE), chunk_size=3)
+    assert (report.accepted, report.rejected) == (2, 6)
+    assert reasons(report)["SK2"] == "flight number already exists"
+    assert importing.get_flight("SK2").get_destination() == "Nagoya"
+    assert [flight.get_flight_number() for flight in importing.find_flights(date="2026-12-02")] == ["SK7"]
+    assert importing.suggest_destinations("os") == []
@@ -0,0 +1,63 @@
+import pytest
+
+from airline import Flight, SortedKeyIndex
+
+SCHEDULE = [
+    ("SK1", "2026-12-01", "Tokyo", "08:00", "14:00", "G1"),
+    ("SK2", "2026-12-02", "Toyama", "09:00", "15:00", "G2"),
+    ("SK3", "2026-12-03", "Osaka", "07:00", "13:00", "G3"),
+    ("SK4", "2026-12-05", "tokyo", "10:00", "16:00", "G4"),
+    ("SK5", "2026-12-05", "Okinawa", "10:00", "16:00", "G5"),
+]
+
+
+@pytest.fixture
+def scheduled(any_system):
+    for row in SCHEDULE:
+        any_system.add_flight(Flight(*row))
+    return any_system
+
+
+def numbers(flights):
+    return sorted(flight.get_flight_number() for flight in flights)
+
+
+def test_the_index_answers_ranges_and_prefixes():
+    index = SortedKeyIndex()
+    for key in ("2026-12-03", "2026-12-01", "2026-12-05", "2026-12-01"):
+        index.add(key, key[-1])
+    assert list(index) == ["2026-12-01", "2026-12-03", "2026-12-05"]
+    assert index.get("2026-12-01") == ["1", "1"] and index.get("2026-12-02") == ()
+    assert index.keys_between("2026-12-02", "2026-12-05") == ["2026-12-03", "2026-12-05"]
+    assert index.keys_between(high="2026-12-03") == ["2026-12-01", "2026-12-03"]
+    assert index.keys_with_prefix("2026-12-0", limit=2) == ["2026-12-01", "2026-12-03"]
+    assert index.keys_with_prefix("2027") == []
+
+
+def test_flights_are_found_over_a_date_range(scheduled):
+    assert numbers(scheduled.find_flights_between(date_from="2026-12-02", date_to="2026-12-04")) == [
+        "SK2", "SK3"]
+    assert numbers(scheduled.find_flights_between("TOKYO", "2026-12-01")) == ["SK1", "SK4"]
+    assert numbers(scheduled.find_flights_between(date_to="2026-12-01")) == ["SK1"]
+    assert scheduled.find_flights_between(date_from="2026-12-06") == []
+
+
+def test_a_destination_prefix_matches_every_destination_starting_with_it(scheduled):
+    assert numbers(scheduled.find_flights("to", prefix=True)) == ["SK1", "SK2", "SK4"]
+    assert numbers(scheduled.find_flights("TOK", "2026-12-05", prefix=True)) == ["SK4"]
+    assert scheduled.find_flights("to") == []
+
+
+def test_suggestions_complete_a_prefix_then_fall_back_to_close_spellings(scheduled):
+    assert scheduled.suggest_destinations("o") == ["Okinawa", "Osaka"]
+    assert scheduled.suggest_destinations("  To ", limit=1) == ["Tokyo"]
+    assert scheduled.suggest_destinations("Tokio") == ["Tokyo"]
+    assert scheduled.suggest_destinations("Nagoya") == []
+
+
+def test_suggestions_are_loaded_from_storage_after_a_restart(open_system):
+    system = open_system()
+    for row in SCHEDULE:
+        system.add_flight(Flight(*row))
+    system.close()
+    assert open_system().suggest_destinations("tO") == ["Tokyo", "Toyama"]
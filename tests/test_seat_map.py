@@ -0,0 +1,63 @@
+import sys
+
+from streamlit.testing.v1 import AppTest
+
+from airline import AIRCRAFT_LAYOUTS, SeatInventory
+from sakura import render_seat_map
+
+
+def cells(html, symbol):
+    return html.count(f"<td>{symbol}</td>")
+
+
+def test_the_seat_map_is_one_table_with_a_row_per_seat_row():
+    layout = AIRCRAFT_LAYOUTS["A321"]
+    inventory = SeatInventory(layout)
+    inventory.occupy("1A")
+    inventory.hold("8C")
+    html = render_seat_map(layout, bytes(inventory._states))
+    assert html.count("<table") == 1
+    assert html.count("<tr") == layout.rows + 1
+    assert (cells(html, "🟥"), cells(html, "🟨"), cells(html, "🟦")) == (1, 1, 164)
+    # First and Business have four seats where Economy has six
+    assert cells(html, "⬛") == 7 * 2
+    assert '<tr class="cabin-First"><td>1 F</td><td>🟥</td>' in html
+
+
+def test_a_wide_body_map_covers_its_own_columns():
+    layout = AIRCRAFT_LAYOUTS["B787"]
+    html = render_seat_map(layout, bytes(layout.get_seat_count()))
+    assert html.count("<th>") == len(layout.columns) + 1
+    assert cells(html, "🟦") == layout.get_seat_count()
+
+
+def seat_map_app():
+    import sakura
+    from airline import AirlineSystem, Flight
+
+    system = AirlineSystem()
+    system.add_flight(Flight("SM1", "2026-12-01", "Osaka", "10:00", "12:00", "A1"))
+    flight = system.get_flight("SM1")
+    cache = sakura.get_views().cache
+    sakura.create_seat_map(flight)
+    misses = cache.misses
+    sakura.create_seat_map(flight)
+    repeat_misses = cache.misses - misses
+    flight._inventory.occupy("1A")
+    sakura.create_seat_map(flight)
+    st = sakura.st
+    st.text(f"{repeat_misses} {cache.misses - misses}")
+
+
+def test_rendered_maps_are_cached_per_flight_revision(monkeypatch, tmp_path):
+    monkeypatch.setenv("SAKURA_DB", str(tmp_path / "ui.db"))
+    # The script runner installs its own __main__ and leaves it behind, where spawned
+    # processes in later tests would try to import it
+    monkeypatch.setitem(sys.modules, "__main__", sys.modules["__main__"])
+    app = AppTest.from_function(seat_map_app).run(timeout=30)
+    assert not app.exception
+    maps = [block.value for block in app.markdown if '<table class="seat-map">' in block.value]
+    assert len(maps) == 3
+    assert maps[0] == maps[1] != maps[2]
+    # The repeat is a cache hit; the seat change is a miss
+    assert app.text[0].value == "0 1"
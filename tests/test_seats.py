@@ -0,0 +1,58 @@
+from airline import BusinessClassSeat, SeatInventory
+
+from .support import make_flight
+
+
+def occupy(inventory, *seat_numbers):
+    for seat_number in seat_numbers:
+        assert inventory.occupy(seat_number)
+
+
+def test_counters_follow_every_seat_change():
+    inventory = SeatInventory()
+    assert (inventory.count_available(), inventory.count_available("First")) == (166, 8)
+    occupy(inventory, "1A", "3A", "8A")
+    assert [inventory.count_available(cabin) for cabin in ("First", "Business", "Economy")] == [7, 19, 137]
+    assert inventory.count_available() == 163
+    assert not inventory.occupy("1A")
+    assert not inventory.occupy("99Z")
+    assert inventory.release("1A") and not inventory.release("1A")
+    assert inventory.count_available() == 164
+
+
+def test_free_seats_are_listed_in_layout_order():
+    inventory = SeatInventory()
+    occupy(inventory, "1B", "2E")
+    assert inventory.available_seat_numbers("First") == ["1A", "1E", "1F", "2A", "2B", "2F"]
+    assert inventory.available_seat_numbers()[:3] == ["1A", "1E", "1F"]
+
+
+def test_every_change_moves_the_revision_on():
+    inventory = SeatInventory()
+    revisions = [inventory.revision]
+    for change in (lambda: inventory.occupy("1A"), lambda: inventory.hold("1B"),
+                   lambda: inventory.convert_hold("1B"), lambda: inventory.release("1A")):
+        assert change()
+        revisions.append(inventory.revision)
+    assert revisions == sorted(set(revisions))
+
+
+def test_a_snapshot_does_not_follow_later_changes():
+    inventory = SeatInventory()
+    occupy(inventory, "1A")
+    copy = inventory.snapshot()
+    occupy(inventory, "1B")
+    assert copy.is_occupied("1A") and not copy.is_occupied("1B")
+    assert copy.count_available() == 165
+    assert copy.find_block(3, "First") == ["1B", "1E", "1F"]
+
+
+def test_seat_views_read_and_write_the_flight_inventory():
+    flight = make_flight()
+    seat = flight.get_seats()["3A"]
+    assert isinstance(seat, BusinessClassSeat)
+    assert seat.get_price() == 5000000.0
+    seat.occupy()
+    assert flight.get_seats()["3A"].is_occupied
+    assert flight.count_available_seats("Business") == 19
+    assert len(flight.get_available_seats()) == 165
@@ -0,0 +1,95 @@
+import pytest
+
+from airline import Passenger
+from airline.analytics import FleetAnalytics
+from airline.sharding import ShardedAirlineSystem, shard_of, shard_path
+
+from .support import DECLINED, make_flight, make_passengers, use_stub_payments
+
+# SK100 lives on shard 0 and SK104 on shard 1 of two
+FLIGHTS = ("SK100", "SK104")
+
+
+@pytest.fixture(params=[None, "sqlite"])
+def engine(request, tmp_path):
+    engine = ShardedAirlineSystem(2, str(tmp_path / "sakura.db") if request.param else None, threads=4,
+                                  initializer=use_stub_payments)
+    for flight_number in FLIGHTS:
+        assert engine.add_flight(make_flight(flight_number))
+    yield engine
+    engine.close()
+
+
+def book(engine, flight_number, seat_number, payment_method="credit card"):
+    return engine.create_reservation(Passenger(f"{flight_number}-{seat_number}", "Ken", "Ito", 40),
+                                     engine.get_flight(flight_number), seat_number, payment_method)
+
+
+def test_flights_are_spread_over_the_shards(engine):
+    assert [shard_of(flight_number, 2) for flight_number in FLIGHTS] == [0, 1]
+    assert sorted(flight.get_flight_number() for flight in engine.find_flights("tokyo")) == list(FLIGHTS)
+    assert engine.find_flights_page(sort="departure", limit=1)[0] == 2
+    assert not engine.add_flight(make_flight("SK104"))
+
+
+def test_bookings_on_every_shard_get_unique_ids_and_route_back(engine):
+    revision = engine.get_revision()
+    booked = [book(engine, flight_number, seat_number) for flight_number in FLIGHTS
+              for seat_number in ("10A", "10B")]
+    assert all(reservation.status == "Confirmed" for reservation in booked)
+    assert len({reservation._reservation_id for reservation in booked}) == 4
+    assert engine.get_revision() > revision
+
+    for reservation in booked:
+        found = engine.get_reservation(reservation._reservation_id)
+        assert found._flight.get_flight_number() == reservation._flight.get_flight_number()
+    assert book(engine, "SK104", "10A") is None
+    assert book(engine, "SK104", "11A", DECLINED) is None
+    assert engine.get_flight("SK104").count_available_seats() == 164
+
+
+def test_a_cancellation_frees_the_seat_on_its_shard(engine):
+    reservation = book(engine, "SK104", "10A")
+    cancelled = engine.cancel_reservation(reservation._reservation_id)
+    assert cancelled.status == "Cancelled" and cancelled._payment.get_status() == "Refunded"
+    assert engine.cancel_reservation(reservation._reservation_id) is None
+    assert book(engine, "SK104", "10A").status == "Confirmed"
+    assert [row[2] for row in engine.get_manifest("SK104")] == ["10A"]
+
+
+def test_group_bookings_and_scans_cover_every_shard(engine):
+    group = engine.create_group_reservation(make_passengers(3), engine.get_flight("SK100"), "Business",
+                                            "credit card")
+    assert len(group) == 3
+    single = book(engine, "SK104", "10A")
+    newest = engine.find_reservations_between(limit=2)
+    assert [reservation._reservation_id for reservation in newest] == [
+        single._reservation_id, max(reservation._reservation_id for reservation in group)]
+    assert [reservation._reservation_id for reservation in engine.find_bookings("SK104-10A")] == [
+        single._reservation_id]
+
+
+def test_analytics_hear_about_bookings_on_every_shard(engine):
+    analytics = FleetAnalytics.from_system(engine)
+    book(engine, "SK100", "1A")
+    # A shard forwards listener callbacks down the same pipe, ahead of the booking's reply
+    book(engine, "SK104", "10A")
+    assert analytics.summary()["bookings"] == 2
+
+
+def test_each_shard_keeps_its_own_database(tmp_path):
+    db_path = str(tmp_path / "sakura.db")
+    engine = ShardedAirlineSystem(2, db_path, threads=2, initializer=use_stub_payments)
+    try:
+        engine.add_flight(make_flight("SK100"))
+        reservation = book(engine, "SK100", "10A")
+    finally:
+        engine.close()
+    assert (tmp_path / "sakura.shard0.db").exists() and shard_path(db_path, 1).endswith("sakura.shard1.db")
+
+    engine = ShardedAirlineSystem(2, db_path, threads=2, initializer=use_stub_payments)
+    try:
+        assert engine.get_reservation(reservation._reservation_id)._seat_number == "10A"
+        assert engine.get_flight("SK100").count_available_seats() == 165
+    finally:
+        engine.close()
@@ -0,0 +1,102 @@
+import os
+import subprocess
+import sys
+
+from airline import Passenger, Payment
+from airline.payment_gateway import StubGateway
+
+from .support import make_flight
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Books seat 10A on SK100 from another process
+BOOK_IN_CHILD = """
+import sys
+from airline import AirlineSystem, Passenger, SQLiteStorage
+from airline.payment_gateway import PaymentDispatcher, StubGateway, set_default_dispatcher
+
+set_default_dispatcher(PaymentDispatcher(default_gateway=StubGateway()))
+system = AirlineSystem(SQLiteStorage(sys.argv[1]))
+flight = system.get_flight("SK100")
+reservation = system.create_reservation(Passenger("C1", "Ken", "Ito", 40), flight, "10A", "credit card")
+system.close()
+print(reservation._reservation_id)
+"""
+
+
+def test_bookings_survive_a_restart(open_system):
+    system = open_system()
+    system.add_flight(make_flight())
+    flight = system.get_flight("SK100")
+    kept = system.create_reservation(Passenger("P1", "Ken", "Ito", 40, "ken@example.com"), flight, "10A",
+                                     "credit card")
+    dropped = system.create_reservation(Passenger("P2", "Yui", "Mori", 28), flight, "10B", "momo")
+    system.cancel_reservation(dropped._reservation_id)
+    system.close()
+
+    system = open_system()
+    flight = system.get_flight("SK100")
+    assert flight.get_destination() == "Tokyo"
+    assert flight._inventory.is_occupied("10A") and not flight._inventory.is_occupied("10B")
+    assert flight.count_available_seats() == flight.get_layout().get_seat_count() - 1
+    reloaded = system.get_reservation(kept._reservation_id)
+    assert reloaded.status == "Confirmed"
+    assert reloaded._passenger._email == "ken@example.com"
+    assert reloaded._payment.get_status() == "Completed"
+    assert system.get_reservation(dropped._reservation_id)._payment.get_status() == "Refunded"
+    assert [row[2] for row in system.get_manifest("SK100")] == ["10A"]
+    assert [reservation._reservation_id for reservation in system.find_bookings("P2", True)] == [
+        dropped._reservation_id]
+
+
+def test_a_seat_booked_by_another_process_is_not_sold_twice(open_system, db_path):
+    system = open_system()
+    system.add_flight(make_flight())
+    flight = system.get_flight("SK100")
+
+    child = subprocess.run([sys.executable, "-c", BOOK_IN_CHILD, db_path], cwd=ROOT, capture_output=True,
+                           text=True, check=True)
+    booked_elsewhere = child.stdout.strip()
+
+    # This process still sees 10A free, but the database refuses the second booking
+    assert not flight._inventory.is_occupied("10A")
+    assert system.create_reservation(Passenger("P1", "Yui", "Mori", 28), flight, "10A", "credit card") is None
+    assert system.get_reservation(booked_elsewhere)._passenger._passport_number == "C1"
+    assert [row[2] for row in system.get_manifest("SK100")] == ["10A"]
+
+
+def test_a_refund_the_gateway_turns_down_is_recorded(open_system, monkeypatch):
+    async def refuse(self, connection, refunds):
+        return {}
+
+    system = open_system()
+    system.add_flight(make_flight())
+    reservation = system.create_reservation(Passenger("P1", "Ken", "Ito", 40), system.get_flight("SK100"),
+                                            "10A", "credit card")
+    monkeypatch.setattr(StubGateway, "refund_batch", refuse)
+    cancelled = system.cancel_reservation(reservation._reservation_id)
+    assert cancelled.status == "Cancelled"
+    assert cancelled._payment.get_status() == "Refund Failed"
+    system.close()
+
+    assert open_system().get_reservation(reservation._reservation_id)._payment.get_status() == "Refund Failed"
+
+
+def test_a_cancelled_seat_can_be_rebooked_before_the_refund_lands(open_system, monkeypatch):
+    system = open_system()
+    system.add_flight(make_flight())
+    flight = system.get_flight("SK100")
+    cancelled = system.create_reservation(Passenger("P1", "Ken", "Ito", 40), flight, "10A", "credit card")
+    rebooked = []
+    refund_payment = Payment.refund_payment
+
+    def rebook_then_refund(payment):
+        # The seat is free again while the refund is still on its way to the gateway
+        rebooked.append(system.create_reservation(Passenger("P2", "Yui", "Mori", 28), flight, "10A",
+                                                  "credit card"))
+        return refund_payment(payment)
+
+    monkeypatch.setattr(Payment, "refund_payment", rebook_then_refund)
+    assert system.cancel_reservation(cancelled._reservation_id) is cancelled
+    assert rebooked[0] is not None and rebooked[0].status == "Confirmed"
+    assert [row[4] for row in system.get_manifest("SK100")] == [rebooked[0]._reservation_id]
@@ -0,0 +1,55 @@
+from airline import FlightViews, Passenger, ViewCache
+
+from .support import make_flight
+
+
+def test_the_cache_evicts_the_least_recently_used_entry():
+    cache = ViewCache(maxsize=2)
+    computed = []
+
+    def compute(key):
+        return lambda: computed.append(key) or key.upper()
+
+    assert cache.get("a", compute("a")) == "A"
+    cache.get("b", compute("b"))
+    assert cache.get("a", compute("a")) == "A"
+    cache.get("c", compute("c"))
+    assert len(cache) == 2
+    cache.get("b", compute("b"))
+    assert computed == ["a", "b", "c", "b"]
+    assert (cache.hits, cache.misses) == (1, 4)
+
+
+def test_a_rerun_with_no_changes_is_served_from_the_cache(system):
+    views = FlightViews(system)
+    flight = system.get_flight("SK100")
+    first = (views.has_flights(), views.cabin_summaries(flight), views.seat_map(flight),
+             views.find_flights("tok", prefix=True))
+    misses = views.cache.misses
+    again = (views.has_flights(), views.cabin_summaries(flight), views.seat_map(flight),
+             views.find_flights("TOK", prefix=True))
+    assert again == first and all(a is b for a, b in zip(again, first))
+    assert views.cache.misses == misses and views.cache.hits == 4
+
+
+def test_a_booking_moves_the_revision_and_refreshes_the_views(system):
+    views = FlightViews(system)
+    flight = system.get_flight("SK100")
+    summaries = views.cabin_summaries(flight)
+    page = views.flight_page()
+    assert [cabin.available_seats for cabin in summaries] == [8, 20, 138]
+
+    system.create_reservation(Passenger("P1", "Ken", "Ito", 40), flight, "1A", "credit card")
+    assert [cabin.available_seats for cabin in views.cabin_summaries(flight)] == [7, 20, 138]
+    assert dict((seat, state) for seat, _, state in views.seat_map(flight))["1A"] == "occupied"
+    assert "1A" not in views.available_seat_numbers(flight, "First")
+    assert page[1][0].available_seats == 166
+    assert views.flight_page()[1][0].available_seats == 165
+
+
+def test_a_new_flight_shows_up_in_cross_flight_views(system):
+    views = FlightViews(system)
+    assert views.flights_on("2026-12-01")[0].flight_number == "SK100"
+    system.add_flight(make_flight("SK200"))
+    assert [summary.flight_number for summary in views.flights_on("2026-12-01")] == ["SK100", "SK200"]
+    assert views.flight_page()[0] == 2
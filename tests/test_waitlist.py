@@ -0,0 +1,128 @@
+import datetime
+
+from airline import Passenger
+
+from .support import DECLINED, make_passengers
+
+
+def fill_first_class(system, flight):
+    reservations = system.create_group_reservation(make_passengers(8, "F"), flight, "First", "credit card")
+    assert len(reservations) == 8
+    assert flight.count_available_seats("First") == 0
+    return reservations
+
+
+def test_joining_a_waitlist_needs_a_full_cabin(system):
+    flight = system.get_flight("SK100")
+    assert system.join_waitlist(Passenger("W1", "Ken", "Ito", 40), flight, "First", "credit card") is None
+    fill_first_class(system, flight)
+    assert system.join_waitlist(Passenger("W1", "Ken", "Ito", 40), flight, "First", "credit card") is not None
+
+
+def test_a_freed_seat_goes_to_the_best_placed_entry(system):
+    flight = system.get_flight("SK100")
+    booked = fill_first_class(system, flight)
+    saver = system.join_waitlist(Passenger("W1", "Ken", "Ito", 40), flight, "First", "credit card", "Saver")
+    gold = system.join_waitlist(Passenger("W2", "Yui", "Mori", 28), flight, "First", "credit card",
+                                loyalty_tier="Gold")
+    flex = system.join_waitlist(Passenger("W3", "Rin", "Abe", 35), flight, "First", "credit card", "Flex")
+    assert system.get_waitlist("SK100", "First") == [flex, gold, saver]
+    assert [position for _, position in system.find_waitlist_entries("W1")] == [3]
+
+    cancelled = system.cancel_reservation(booked[0]._reservation_id)
+    assert cancelled.status == "Cancelled"
+    assert flex.status == "Promoted"
+    assert flex._reservation._seat_number == booked[0]._seat_number
+    assert flex._reservation.status == "Confirmed"
+    assert flight.count_available_seats("First") == 0
+    assert system.get_waitlist("SK100") == [gold, saver]
+
+
+def test_a_declined_promotion_passes_the_seat_on(system):
+    flight = system.get_flight("SK100")
+    booked = fill_first_class(system, flight)
+    declined = system.join_waitlist(Passenger("W1", "Ken", "Ito", 40), flight, "First", DECLINED, "Flex")
+    next_in_line = system.join_waitlist(Passenger("W2", "Yui", "Mori", 28), flight, "First", "credit card")
+
+    system.cancel_reservation(booked[0]._reservation_id)
+    assert declined.status == "Payment Failed"
+    assert next_in_line.status == "Promoted"
+    assert flight.count_available_seats("First") == 0
+
+
+def test_entries_that_left_are_skipped(system):
+    flight = system.get_flight("SK100")
+    booked = fill_first_class(system, flight)
+    leaving = system.join_waitlist(Passenger("W1", "Ken", "Ito", 40), flight, "First", "credit card", "Flex")
+    staying = system.join_waitlist(Passenger("W2", "Yui", "Mori", 28), flight, "First", "credit card")
+    assert system.leave_waitlist("SK100", leaving._entry_id)
+    assert not system.leave_waitlist("SK100", leaving._entry_id)
+
+    system.cancel_reservation(booked[0]._reservation_id)
+    assert leaving.status == "Left"
+    assert staying.status == "Promoted"
+
+
+def test_an_expired_hold_frees_its_seat_for_the_waitlist(system):
+    flight = system.get_flight("SK100")
+    fill_first_class(system, flight)
+    booked = system.find_bookings("F0")[0]
+    system.cancel_reservation(booked._reservation_id)
+    hold = system.hold_seat(flight, booked._seat_number, ttl=60)
+    entry = system.join_waitlist(Passenger("W1", "Ken", "Ito", 40), flight, "First", "credit card")
+    assert entry.status == "Waiting"
+    system.holds.reap(hold.expires_at)
+    assert entry.status == "Promoted"
+
+
+def test_positions_count_within_each_cabin(system):
+    flight = system.get_flight("SK100")
+    fill_first_class(system, flight)
+    first = system.join_waitlist(Passenger("W1", "Ken", "Ito", 40), flight, "First", "credit card")
+    second = system.join_waitlist(Passenger("W2", "Yui", "Mori", 28), flight, "First", "credit card")
+    diamond = system.join_waitlist(Passenger("W3", "Rin", "Abe", 35), flight, "First", "credit card",
+                                   loyalty_tier="Diamond")
+    waitlist = system._waitlists["SK100"]
+    assert [waitlist.position(entry) for entry in (diamond, first, second)] == [1, 2, 3]
+    assert len(waitlist) == 3
+    assert system.leave_waitlist("SK100", first._entry_id)
+    assert [waitlist.position(entry) for entry in (diamond, first, second)] == [1, None, 2]
+    assert len(waitlist) == 2
+
+
+def test_a_better_fare_joining_later_goes_ahead(system):
+    flight = system.get_flight("SK100")
+    fill_first_class(system, flight)
+    member = system.join_waitlist(Passenger("W1", "Ken", "Ito", 40), flight, "First", "credit card")
+    saver = system.join_waitlist(Passenger("W2", "Yui", "Mori", 28), flight, "First", "credit card", "Saver")
+    flex = system.join_waitlist(Passenger("W3", "Rin", "Abe", 35), flight, "First", "credit card", "Flex")
+    waitlist = system._waitlists["SK100"]
+    assert [waitlist.position(entry) for entry in (flex, member, saver)] == [1, 2, 3]
+    assert waitlist.waiting("First") == [flex, member, saver]
+
+
+def test_entries_are_dropped_once_they_stop_waiting(system):
+    flight = system.get_flight("SK100")
+    booked = fill_first_class(system, flight)
+    declined = system.join_waitlist(Passenger("W1", "Ken", "Ito", 40), flight, "First", DECLINED, "Flex")
+    promoted = system.join_waitlist(Passenger("W2", "Yui", "Mori", 28), flight, "First", "credit card")
+    leaving = system.join_waitlist(Passenger("W3", "Rin", "Abe", 35), flight, "First", "credit card")
+    staying = system.join_waitlist(Passenger("W4", "Aoi", "Kato", 22), flight, "First", "credit card")
+    system.leave_waitlist("SK100", leaving._entry_id)
+    system.cancel_reservation(booked[0]._reservation_id)
+
+    assert (declined.status, promoted.status, leaving.status) == ("Payment Failed", "Promoted", "Left")
+    waitlist = system._waitlists["SK100"]
+    assert list(waitlist._entries) == [staying._entry_id] and len(waitlist) == 1
+    assert waitlist.position(promoted) is None and waitlist.position(staying) == 1
+    assert system.find_waitlist_entries("W2") == []
+    assert system.find_waitlist_entries("W4") == [(staying, 1)]
+
+
+def test_join_times_are_integer_timestamps(system):
+    flight = system.get_flight("SK100")
+    fill_first_class(system, flight)
+    before = datetime.datetime.now()
+    entry = system.join_waitlist(Passenger("W1", "Ken", "Ito", 40), flight, "First", "credit card")
+    assert isinstance(entry._joined_at, int)
+    assert before <= entry.get_joined_at() <= datetime.datetime.now()